@@ -486,10 +486,12 @@ class Audio:
     """
 
     # Global state
-    SPEECH_ENGINES = [CMUSphinx(),
-                      Houndify(client_id=HOUNDIFY_ID, client_key=HOUNDIFY_KEY),
-                      IBMWatson(api_key=IBM_WATSON_KEY, api_url=IBM_WATSON_URL),
-                      HuggingFace()]
+    # note: engines are only created when first used (see get_speech_engine)
+    SPEECH_ENGINE_SPECS = [(CMUSphinx, {}),
+                           (Houndify, {"client_id": HOUNDIFY_ID, "client_key": HOUNDIFY_KEY}),
+                           (IBMWatson, {"api_key": IBM_WATSON_KEY, "api_url": IBM_WATSON_URL}),
+                           (HuggingFace, {})]
+    SPEECH_ENGINES = {}
 
     def __init__(self, path=''):
         self._path = path
@@ -521,6 +523,19 @@ class Audio:
 
         debug.trace(7, f'SpeechEngine.get_vocals() => result saved on {output}; self={self}')
 
+    @classmethod
+    def get_speech_engine(cls, engine):
+        """Return speech engine with identifier ENGINE (or None), creating it upon first use"""
+        key = engine.lower()
+        if key not in cls.SPEECH_ENGINES:
+            for engine_class, kwargs in cls.SPEECH_ENGINE_SPECS:
+                if engine_class._IDENTIFIER.lower() == key:  # pylint: disable=protected-access
+                    cls.SPEECH_ENGINES[key] = engine_class(**kwargs)
+                    break
+        result = cls.SPEECH_ENGINES.get(key)
+        debug.trace(7, f'Audio.get_speech_engine({engine!r}) => {result}')
+        return result
+
     def speech_to_text(self, engine=''):
         """Transcribe speech from audio path using specified ENGINE"""
 
@@ -528,11 +543,7 @@ class Audio:
         ## TODO: WORK-IN-PROGRESS
 
         # Select speech engine.
-        speech_engine = None
-        for temp_engine in self.SPEECH_ENGINES:
-            if temp_engine.get_identifier().lower() == engine.lower():
-                speech_engine = temp_engine
-                break
+        speech_engine = self.get_speech_engine(engine)
 
         # Extract final speech
         result = ""
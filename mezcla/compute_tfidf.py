@@ -33,6 +33,7 @@ import sys
 from mezcla import tfidf
 from mezcla.tfidf.corpus import Corpus as tfidf_corpus
 from mezcla.tfidf.preprocess import Preprocessor as tfidf_preprocessor
+from mezcla.tfidf.stats import CorpusStats, save_corpus_stats
 
 # Local packages
 from mezcla import debug
@@ -49,6 +50,10 @@ TF_WEIGHTING = system.getenv_text("TF_WEIGHTING", "basic")
 DELIMITER = system.getenv_text("DELIMITER", ",")
 CORPUS_DUMP = system.getenv_value("CORPUS_DUMP", None,
                                   "Filename for corpus dump")
+CORPUS_STATS = system.getenv_value("CORPUS_STATS", None,
+                                   "Filename for saving compact corpus statistics (DF, etc.)")
+BACKGROUND_STATS = system.getenv_value("BACKGROUND_STATS", None,
+                                       "Filename of corpus statistics to use as frozen background for IDF")
 PRUNE_SUBSUMED_TERMS = system.getenv_bool("PRUNE_SUBSUMED_TERMS", False)
 PRUNE_OVERLAPPING_TERMS = system.getenv_bool("PRUNE_OVERLAPPING_TERMS", False)
 SKIP_STEMMING = system.getenv_bool("SKIP_STEMMING", False,
@@ -88,6 +93,8 @@ Notes:
 - By default, the document ID is the position of the file on the command line (e.g., N for fileN above). The document text is the entire file.
 - However, with {csv}, the document ID is taken from the first column, and the document text from the second columns (i.e., each row is a distinct document).
 - With {text}, the document ID is taken from the line number.
+- CORPUS_STATS saves the document frequencies for reuse via BACKGROUND_STATS, so that new
+  documents can be scored without re-reading the reference collection.
 - Use following environment options:
       DEFAULT_NUM_TOP_TERMS ({default_topn})
       MIN_NGRAM_SIZE ({min_ngram_size})
@@ -150,6 +157,51 @@ def is_subsumed(term, terms, include_overlap=PRUNE_OVERLAPPING_TERMS):
 
 #...............................................................................
 
+def stream_csv_documents(filename, is_text=False, doc_filenames=None, late_texts=None):
+    """Yield (doc_id, text) for documents in CSV FILENAME, reading the rows lazily
+    Notes:
+    - The ID is from the first column and the text from the second (or line number and entire line if IS_TEXT).
+    - Consecutive rows for the same ID are accumulated and the document finalized once (with rows joined by a space).
+    - DOC_FILENAMES is updated with the source of each document (filename and last row number).
+    - Rows for IDs already finalized (e.g., non-consecutive or from an earlier file) are instead added to LATE_TEXTS.
+    """
+    text_col = 0 if is_text else 1
+    if doc_filenames is None:
+        doc_filenames = {}
+    if late_texts is None:
+        late_texts = {}
+    current_id = None
+    current_texts = []
+    is_late = False
+    with system.open_file(filename) as fh:
+        csv_reader = csv.reader(fh, delimiter=DELIMITER, quotechar='"')
+        # TODO: skip over the header line
+        for r, row in enumerate(csv_reader):
+            debug.trace_fmt(6, "{l}: {r}", l=r, r=row)
+            doc_id = str(r + 1) if is_text else row[0]
+            try:
+                doc_text = system.from_utf8(row[text_col])
+            except:
+                debug.trace_fmt(5, "Exception processing line {l}", l=r)
+                doc_text = ""
+            if doc_id != current_id:
+                if current_id is not None:
+                    if is_late:
+                        late_texts.setdefault(current_id, []).extend(current_texts)
+                    else:
+                        yield (current_id, " ".join(current_texts))
+                current_id = doc_id
+                current_texts = []
+                is_late = (doc_id in doc_filenames)
+            current_texts.append(doc_text)
+            doc_filenames[doc_id] = f"{filename}:{r + 1}"
+    if current_id is not None:
+        if is_late:
+            late_texts.setdefault(current_id, []).extend(current_texts)
+        else:
+            yield (current_id, " ".join(current_texts))
+
+
 def main():
     """Entry point for script"""
     args = sys.argv[1:]
@@ -217,47 +269,35 @@ def main():
     # Note: disables stemming via no-op lambda by default
     stemmer_fn = None if INCLUDE_STEMMING else (lambda x: x)
     my_pp = tfidf_preprocessor(language=LANGUAGE, gramsize=max_ngram_size, min_ngram_size=MIN_NGRAM_SIZE, all_ngrams=False, stemmer=stemmer_fn)
-    corpus = tfidf_corpus(gramsize=max_ngram_size, min_ngram_size=MIN_NGRAM_SIZE, all_ngrams=False, preprocessor=my_pp)
+    background = (CorpusStats(BACKGROUND_STATS) if BACKGROUND_STATS else None)
+    corpus = tfidf_corpus(gramsize=max_ngram_size, min_ngram_size=MIN_NGRAM_SIZE, all_ngrams=False, preprocessor=my_pp,
+                          background=background)
 
     # Process each of the arguments
     doc_filenames = {}
+    late_texts = {}
     for i, filename in enumerate(args):
         # If CSS file, treat each row as separate document, using ID from first column and data from second
+        # note: rows are streamed, so the input is not held in memory (apart from the corpus documents)
         if csv_file:
-            text_col = 0 if is_text else 1
-            with system.open_file(filename) as fh:
-                csv_reader = csv.reader(iter(fh.readlines()), delimiter=DELIMITER, quotechar='"')
-                # TODO: skip over the header line
-                line = 0
-                for r, row in enumerate(csv_reader):
-                    debug.trace_fmt(6, "{l}: {r}", l=line, r=row)
-                    doc_id = str(r + 1) if is_text else row[0]
-                    try:
-                        doc_text = system.from_utf8(row[text_col])
-                    except:
-                        debug.trace_fmt(5, "Exception processing line {l}", l=line)
-                        doc_text = ""
-                    ## TODO: use defaultdict-type hash
-                    if doc_id not in corpus:
-                        corpus[doc_id] = ""
-                    else:
-                        ## TODO: corpus[doc_id] += " "
-                        corpus[doc_id] = (corpus[doc_id].text + " ")
-                    # Appends text to corpus document
-                    ## TODO: corpus[doc_id] += doc_text
-                    corpus[doc_id] = (corpus[doc_id].text + doc_text)
-                    ## OLD: doc_filenames[doc_id] = filename + ":" + str(i + 1)
-                    doc_filenames[doc_id] = f"{filename}:{r + 1}"
-                    line += 1
+            corpus.add_documents(stream_csv_documents(filename, is_text=is_text, doc_filenames=doc_filenames,
+                                                      late_texts=late_texts))
         # Otherwise, treat entire file as document and use command-line position as the document ID
+        # note: files are added in bulk below (see TFIDF_WORKERS for parallel preprocessing)
         else:
             doc_id = str(i + 1)
-            doc_text = system.read_entire_file(filename)
-            corpus[doc_id] = doc_text
             doc_filenames[doc_id] = filename
+    if not csv_file:
+        corpus.add_documents((doc_id, system.read_entire_file(filename))
+                             for (doc_id, filename) in doc_filenames.items())
+    # Append text for document IDs recurring after the document was finalized
+    for doc_id, texts in late_texts.items():
+        corpus[doc_id] = (corpus[doc_id].text + " " + " ".join(texts))
     debug.trace_object(7, corpus, "corpus")
     if CORPUS_DUMP:
         system.save_object(CORPUS_DUMP, corpus)
+    if CORPUS_STATS:
+        save_corpus_stats(corpus, CORPUS_STATS)
 
     # Derive headers
     headers = ["term"]
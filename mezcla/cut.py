@@ -24,8 +24,14 @@
 
 # Standard modules
 import argparse
+from collections import Counter
 import csv
+import io
+from itertools import chain
+import mmap
+import os
 import re
+import shutil
 import sys
 
 # Installed modules
@@ -34,10 +40,10 @@ import functools
 import operator
 
 # Local modules
-from mezcla import data_utils as du
+## OLD: from mezcla import data_utils as du
 from mezcla import debug
 from mezcla import glue_helpers as gh
-from mezcla.main import Main
+from mezcla.main import Main, MultiFileInput, open_input_file, READ_LINES_HINT
 from mezcla.my_regex import my_re
 from mezcla import system
 
@@ -84,6 +90,19 @@ MAX_FIELD_LEN = "max-field-len"         # value length before elided
 NEW_FIX = system.getenv_bool("NEW_FIX", False,
                              "HACK: Fix for --fix bug")
 NUM_FN_SHORTCUTS = 9
+FAST_PATH = system.getenv_bool(
+    "CUT_FAST_PATH", True,
+    description="Use str.split over blocks of lines for simple delimited input (see Script.use_fast_path)")
+FAST_DIALECTS = (TAB_DIALECT, UNIX_DIALECT)
+MAX_RAGGED_LINES = system.getenv_int(
+    "MAX_RAGGED_LINES", 10,
+    description="Maximum number of ragged row line numbers to report")
+WORKERS = "workers"                     # processes for byte ranges of input file
+MIN_RANGE_BYTES = system.getenv_int(
+    "CUT_MIN_RANGE_BYTES", 1024 * 1024,
+    description="Minimum size of input file byte range per worker process for --workers")
+COUNT_BLOCK_SIZE = 16 * 1024 * 1024     # bytes checked at a time when counting quotes
+COMPRESSED_SUFFIXES = (".gz", ".bz2", ".xz")
 
 #...............................................................................
 
@@ -106,6 +125,170 @@ def flatten_list_of_strings(list_of_str):
     debug.trace(5, f"flatten_list_of_strings({list_of_str}) => {result}")
     return result
 
+#...............................................................................
+
+class RowShapeStats(object):
+    """Row-shape statistics collected while extracting fields (e.g., for sanity checks)
+    Note: The number of columns is based on the first row with fields, and rows without
+    fields (e.g., blank lines) are not considered ragged."""
+
+    def __init__(self, max_ragged_lines=None, num_cols=None):
+        """Initializer: MAX_RAGGED_LINES limits line numbers retained for ragged rows
+        and NUM_COLS is the expected number of columns (e.g., from first row of file)"""
+        self.num_rows = 0
+        self.num_lines = 0
+        self.num_cols = num_cols
+        self.field_counts = Counter()
+        self.num_ragged = 0
+        self.ragged_lines = []
+        self.max_ragged_lines = (MAX_RAGGED_LINES if (max_ragged_lines is None) else max_ragged_lines)
+
+    def add_rows(self, lengths, first_line_num):
+        """Update statistics for rows with field LENGTHS starting at FIRST_LINE_NUM
+        Note: The line numbers assume each row is on a single line."""
+        if not lengths:
+            return
+        self.num_rows += len(lengths)
+        min_length = min(lengths)
+        if min_length == max(lengths):
+            self.field_counts[min_length] += len(lengths)
+            if ((self.num_cols is None) and min_length):
+                self.num_cols = min_length
+            if (min_length == self.num_cols) or (not min_length):
+                return
+        else:
+            self.field_counts.update(lengths)
+        for (i, length) in enumerate(lengths):
+            if ((self.num_cols is None) and length):
+                self.num_cols = length
+            elif (length and (length != self.num_cols)):
+                self.add_ragged(first_line_num + i)
+
+    def add_row(self, length, line_num):
+        """Update statistics for single row with LENGTH fields at LINE_NUM"""
+        self.num_rows += 1
+        self.field_counts[length] += 1
+        if ((self.num_cols is None) and length):
+            self.num_cols = length
+        elif (length and (length != self.num_cols)):
+            self.add_ragged(line_num)
+
+    def add_ragged(self, line_num):
+        """Record ragged row at LINE_NUM"""
+        self.num_ragged += 1
+        if len(self.ragged_lines) < self.max_ragged_lines:
+            self.ragged_lines.append(line_num)
+
+    def merge(self, other):
+        """Add statistics from OTHER for the rows following those here (e.g., from a worker)"""
+        self.num_rows += other.num_rows
+        self.field_counts.update(other.field_counts)
+        if self.num_cols is None:
+            self.num_cols = other.num_cols
+        self.num_ragged += other.num_ragged
+        room = (self.max_ragged_lines - len(self.ragged_lines))
+        self.ragged_lines += [(self.num_lines + line_num) for line_num in other.ragged_lines[:room]]
+        self.num_lines += other.num_lines
+
+    def report(self):
+        """Trace the statistics and warn about ragged rows"""
+        debug.trace_fmt(4, "dimensions: {nr}x{nc}", nr=self.num_rows, nc=self.num_cols)
+        debug.trace_fmt(4, "field count histogram: {h}", h=sorted(self.field_counts.items()))
+        more = ("..." if (self.num_ragged > len(self.ragged_lines)) else "")
+        message = f"{self.num_ragged} ragged row(s) versus {self.num_cols} columns at line(s) {self.ragged_lines}{more}"
+        debug.assertion(not self.num_ragged, message)
+
+#...............................................................................
+
+class FileRange(io.RawIOBase):
+    """Raw binary stream over bytes START to END of FILENAME (e.g., for io.TextIOWrapper)"""
+
+    def __init__(self, filename, start, end):
+        """Initializer: opens FILENAME positioned at START"""
+        super().__init__()
+        # pylint: disable=consider-using-with
+        self.file = open(filename, "rb")
+        self.file.seek(start)
+        self.remaining = (end - start)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        size = min(len(buffer), self.remaining)
+        if size <= 0:
+            return 0
+        num_read = self.file.readinto(memoryview(buffer)[:size])
+        self.remaining -= num_read
+        return num_read
+
+    def close(self):
+        self.file.close()
+        super().close()
+
+
+def count_bytes(data, pattern, start, end):
+    """Return number of occurrences of PATTERN in DATA (e.g., mmap) from START to END
+    Note: checked a block at a time to bound memory, with occurrences spanning blocks counted separately"""
+    count = 0
+    for offset in range(start, end, COUNT_BLOCK_SIZE):
+        block_end = min(offset + COUNT_BLOCK_SIZE, end)
+        count += data[offset: block_end].count(pattern)
+        if (block_end < end):
+            for split in range(1, len(pattern)):
+                if ((block_end - split >= start) and (block_end - split + len(pattern) <= end)
+                        and (data[block_end - split: block_end - split + len(pattern)] == pattern)):
+                    count += 1
+    return count
+
+
+def find_record_boundaries(filename, num_ranges, quotechar=None, escapechar=None):
+    """Return byte offsets splitting FILENAME into up to NUM_RANGES ranges aligned to record boundaries
+    Notes:
+    - The result includes 0 and the file size (e.g., [0, 1200, 2500] for 2 ranges).
+    - A newline only ends a record if not escaped via ESCAPECHAR and if outside of quotes via QUOTECHAR,
+      based on parity of quote count (less escaped quotes) from the start of the file.
+    - Quotes within unquoted fields (e.g., a"b for excel dialect) throw off the parity.
+    """
+    debug.trace(5, f"find_record_boundaries({filename!r}, {num_ranges}, {quotechar!r}, {escapechar!r})")
+    size = os.path.getsize(filename)
+    boundaries = [0]
+    if (size and (num_ranges > 1)):
+        quote = (quotechar.encode() if quotechar else None)
+        escape = (escapechar.encode() if escapechar else None)
+        escaped_quote = ((escape + quote) if (quote and escape) else None)
+        in_quotes = False
+        counted = 0
+        with open(filename, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            for i in range(1, num_ranges):
+                pos = max((size * i) // num_ranges, boundaries[-1])
+                while True:
+                    pos = data.find(b"\n", pos)
+                    if (pos == -1):
+                        break
+                    pos += 1
+                    if escape:
+                        start = pos - 1
+                        while ((start > 0) and (data[start - 1] == escape[0])):
+                            start -= 1
+                        if ((pos - 1 - start) % 2):
+                            continue
+                    if quote:
+                        num_quotes = count_bytes(data, quote, counted, pos)
+                        if escaped_quote:
+                            num_quotes -= count_bytes(data, escaped_quote, counted, pos)
+                        in_quotes ^= bool(num_quotes % 2)
+                        counted = pos
+                        if in_quotes:
+                            continue
+                    break
+                if ((pos == -1) or (pos >= size)):
+                    break
+                boundaries.append(pos)
+    boundaries.append(size)
+    debug.trace(5, f"find_record_boundaries() => {boundaries}")
+    return boundaries
+
 #...............................................................................
 # TODO: Put following in separate module (e.g., data_utils.py)
 #
@@ -182,6 +365,7 @@ class Script(Main):
     run_sniffer = False
     single_line = False
     max_field_len = None
+    row_shape = None
     ## TODO: todo_arg = ...
 
     def setup(self):
@@ -234,6 +418,7 @@ class Script(Main):
         self.output_delimiter = self.get_parsed_option(OUT_DELIM, (self.output_delimiter or self.delimiter))
         self.single_line = self.get_parsed_option(SINGLE_LINE, self.single_line)
         self.max_field_len = self.get_parsed_option(MAX_FIELD_LEN, self.max_field_len)
+        self.workers = self.get_parsed_option(WORKERS, self.workers)
         # self.todo_arg = self.get_parsed_option(TODO_ARG, self.todo_arg)
 
         # Check CSV dialet options
@@ -306,54 +491,144 @@ class Script(Main):
         debug.assertion(field_list)
         debug.trace_fmtd(4, "parse_field_spec() => {fl}", fl=field_list)
         return field_list
-    
-    def run_main_step(self):
-        """Main processing step: read each line (i.e. row) and extract specified columns.
-        Note: The fields are 1-based (i.e., first column specified 1 not 0)"""
-        debug.trace_fmtd(4, "run_main_step()")
-
-        # If unspecified, try to determine dialect for CSV input automatically
-        # Notes: doesn't recognize escapes properly, such as \"); and,
-        # sniffer doesn't work for stdin due to python limitation with backtracking.
-        if ((self.delimiter == COMMA) and (not self.dialect) and self.run_sniffer):
-            debug.assertion(self.input_stream != sys.stdin)
-            self.dialect = csv.Sniffer().sniff(self.input_stream.read(SNIFFER_LOOKAHEAD))
-            debug.trace_object(4, self.dialect, "csv sniffer")
-            self.input_stream.seek(0)
-            if (self.output_dialect is None):
-                self.output_dialect = self.dialect
-
-        # Optionally, fixup input if TSV changins multiple spaces into single tab.
-        # Note: makes pass through data, writes to temp file, and then resets input stream to
-        # read from the temp file.
-        # TODO: have option to distinguish old-style loose fix (3+ spaces) from strict fix (all whitespace)
-        if self.fix:
-            debug.assertion(self.delimiter == TAB)
-            temp_file_stream = system.open_file(self.temp_file, mode="w")
-            num_fixed = 0
-            for line in self.input_stream.readlines():
-                ## OLD: line = re.sub(r"   *", TAB, line)
-                new_line = re.sub(r" +", TAB, line)
-                if (new_line != line):
-                    num_fixed += 1
-                    line = new_line
-                debug.assertion(SPACE not in line)
-                temp_file_stream.write(line)
-            debug.trace(4, f"Fixed {num_fixed} lines")
-            ## OLD: self.input_stream.seek(0)
-            temp_file_stream.close()
-            self.input_stream = system.open_file(self.temp_file, mode="r")
-            ## HACK: pretend reading from stdin
-            sys.stdin = self.input_stream
 
+    def use_fast_path(self):
+        """Whether the fields can be extracted via str.split (see extract_fields_fast)
+        Note: This requires tab or Unix dialects for input and output and single-character
+        delimiters, along with no options requiring per-field processing (e.g., --single-line)."""
+        interactive = False
+        try:
+            interactive = self.input_stream.isatty()
+        except (AttributeError, ValueError):
+            pass
+        result = (FAST_PATH and (READ_LINES_HINT > 0) and (not interactive)
+                  and (self.dialect in FAST_DIALECTS) and (self.output_dialect in FAST_DIALECTS)
+                  and (len(self.delimiter) == 1) and (len(self.output_delimiter) == 1)
+                  and (not (self.fix or NEW_FIX or self.single_line or self.max_field_len))
+                  and all((f >= 1) for f in self.fields) and (not debug.verbose_debugging()))
+        debug.trace(5, f"use_fast_path() => {result}")
+        return result
+
+    def extract_fields_fast(self):
+        """Extract the fields from blocks of input lines via str.split, returning (num_rows, num_cols) as per self.row_shape
+        Notes:
+        - Lines with characters needing special handling by the csv module (e.g., quotes, escapes, or carriage returns) are parsed via csv.reader, which can consume additional lines (e.g., quoted newlines).
+        - The output is written a block at a time.
+        """
+        debug.trace(4, "extract_fields_fast()")
+        stream = self.input_stream
+        delimiter = self.delimiter
+        input_dialect = csv.get_dialect(self.dialect)
+        output_dialect = csv.get_dialect(self.output_dialect)
+
+        # Determine the characters requiring the csv module, either for input or output
+        special_chars = {"\r", input_dialect.escapechar, output_dialect.quotechar, output_dialect.escapechar}
+        if input_dialect.quoting != csv.QUOTE_NONE:
+            special_chars.add(input_dialect.quotechar)
+        if self.output_delimiter != delimiter:
+            special_chars.add(self.output_delimiter)
+        special_chars.discard(None)
+        special_chars.discard("")
+        special_chars = "".join(sorted(special_chars))
+        special_char_regex = re.compile("[" + re.escape(special_chars) + "]")
+        debug.trace_expr(5, special_chars)
+
+        # Derive output format for the regular rows (e.g., a\tb\n or "a","b"\n)
+        debug.assertion(output_dialect.quoting in (csv.QUOTE_NONE, csv.QUOTE_ALL))
+        quote = (output_dialect.quotechar if (output_dialect.quoting == csv.QUOTE_ALL) else "")
+        join_fields = (quote + self.output_delimiter + quote).join
+        start_text = quote
+        end_text = quote + output_dialect.lineterminator
+        output = []
+        special_output = io.StringIO()
+        csv_writer = csv.writer(special_output, delimiter=self.output_delimiter, dialect=self.output_dialect)
+        row_shape = self.row_shape
+        line_num = 0
+        get_selection = None
+
+        def check_rows(rows, num_lines=None):
+            """Update row-shape statistics for ROWS spanning NUM_LINES (defaults to one per row), initializing fields if first
+            Note: returns ROWS less any leading ones without fields when deriving fields for --all-fields (n.b., output here)"""
+            nonlocal line_num, get_selection
+            start_row_num = row_shape.num_rows
+            if num_lines is None:
+                row_shape.add_rows([len(row) for row in rows], line_num + 1)
+            else:
+                row_shape.add_row(len(rows[0]), line_num + 1)
+            line_num += (num_lines or len(rows))
+            if get_selection is None:
+                start = 0
+                while ((start < len(rows)) and (not rows[start]) and self.all_fields and (not self.fields)):
+                    system.print_stderr("Error: No items in row at line {l}", l=(start_row_num + start + 1))
+                    output.append(output_dialect.lineterminator)
+                    start += 1
+                rows = rows[start:]
+                if not rows:
+                    return rows
+                if ((not self.fields) and self.all_fields):
+                    self.fields = [(c + 1) for c in range(len(rows[0]))]
+                debug.assertion(self.fields)
+                get_selection = (lambda row, f=(self.fields[0] - 1): [row[f]])
+                if len(self.fields) > 1:
+                    get_selection = operator.itemgetter(*[(f - 1) for f in self.fields])
+            return rows
+
+        def get_fields(row):
+            """Return the fields to extract from ROW, using empty strings for missing ones"""
+            num = len(row)
+            return [(row[f - 1] if (f <= num) else "") for f in self.fields]
+
+        def format_rows(rows):
+            """Add output text for ROWS (all regular) to output"""
+            try:
+                output.extend([start_text + join_fields(get_selection(row)) + end_text for row in rows])
+            except IndexError:
+                output.extend([start_text + join_fields(get_fields(row)) + end_text for row in rows])
+
+        # Process the input a block of lines at a time
+        for lines in iter(lambda: stream.readlines(READ_LINES_HINT), []):
+            if not lines[-1].endswith("\n"):
+                lines[-1] += "\n"
+            block_rows = []
+            # note: str.find is much faster than regex search for checking large blocks
+            text = "".join(lines)
+            if not any((c in text) for c in special_chars):
+                block_rows = [line[:-1].split(delimiter) for line in lines]
+                if [""] in block_rows:
+                    # note: blank lines have no fields (as with csv.reader)
+                    block_rows = [(row if (row != [""]) else []) for row in block_rows]
+            else:
+                line_iter = iter(lines)
+                for line in line_iter:
+                    if not special_char_regex.search(line):
+                        block_rows.append(line[:-1].split(delimiter) if (line != "\n") else [])
+                        continue
+                    # note: the reader draws on the rest of the block and then the stream as needed
+                    reader = csv.reader(chain([line], line_iter, iter(stream.readline, "")),
+                                        delimiter=delimiter, dialect=self.dialect)
+                    row = next(reader, [])
+                    if block_rows:
+                        format_rows(check_rows(block_rows))
+                        block_rows = []
+                    if check_rows([row], num_lines=reader.line_num):
+                        csv_writer.writerow(get_fields(row))
+                        output.append(special_output.getvalue())
+                        special_output.seek(0)
+                        special_output.truncate()
+
+            # Output the block
+            if block_rows:
+                format_rows(check_rows(block_rows))
+            sys.stdout.write("".join(output))
+            output.clear()
+        sys.stdout.write("".join(output))
+        row_shape.num_lines = line_num
+        return (row_shape.num_rows, row_shape.num_cols)
+
+    def extract_fields_csv(self):
+        """Extract the fields from rows read via csv.reader, returning (num_rows, num_cols) as per self.row_shape"""
         # Create reader and writer
-        debug.trace_expr(4, self.delimiter, self.output_delimiter, self.dialect, self.output_dialect)
         ## BAD: self.csv_reader = csv.reader(iter(system.stdin_reader()), delimiter=self.delimiter, quotechar='"')
-        if (self.input_stream != sys.stdin):
-            # note: silly csv.reader requirement for newline option to open (TODO, open what?)
-            # TODO: add support for multiple filenames
-            self.input_stream = system.open_file(self.filename, newline="")
-            debug.assertion(not self.other_filenames)
         self.csv_reader = csv.reader(self.input_stream, delimiter=self.delimiter, 
                                      dialect=self.dialect)
         debug.trace_object(5, self.csv_reader, "csv_reader")
@@ -362,13 +637,16 @@ class Script(Main):
                                 dialect=self.output_dialect)
 
         # Iterate through the rows, outputting subset of columns
-        last_row_length = None
-        num_rows = 0
-        num_cols = None
+        row_shape = self.row_shape
+        last_line_num = 0
+        # note: level checks done once, so that there is no per-row tracing overhead unless enabled
+        trace_rows = debug.verbose_debugging()
+        trace_details = debug.debugging(7)
         for i, row in enumerate(self.csv_reader):
             if NEW_FIX and (self.delimiter == TAB):
                 # Strip leading spaces and replace other multiple spaces by a tab
-                debug.trace_fmt(7, "old R{n}: {r}", n=(i + 1), r=row)
+                if trace_details:
+                    debug.trace_fmt(7, "old R{n}: {r}", n=(i + 1), r=row)
                 ## OLD: row = list(more_itertools.flatten([re.sub(" +", TAB, f) for f in row]))
                 ## OLD: row = flatten_list_of_strings([re.split(r" +", f) for f in row])
                 line = TAB.join(row)
@@ -376,23 +654,24 @@ class Script(Main):
                 line = re.sub(" +", TAB, line)
                 row = line.split(TAB)
                 debug.assertion(not any(SPACE in field for field in row))
-            debug.trace_fmt(6, "R{n}: {r}", n=(i + 1), r=row)
-            debug.trace_fmt(5, "R{n}: len(row)={l} [{rspec}]", n=(i + 1), l=len(row), rspec=elide_values(row))
-            debug.assertion((len(row) == last_row_length) or (not last_row_length))
-            last_row_length = len(row)
-            # TODO: rework i references in terms of num_rows
-            num_rows += 1
-            if num_cols is None:
-                num_cols = last_row_length
+            if trace_rows:
+                debug.trace_fmt(6, "R{n}: {r}", n=(i + 1), r=row)
+                debug.trace_fmt(5, "R{n}: len(row)={l} [{rspec}]", n=(i + 1), l=len(row), rspec=elide_values(row))
+            ## OLD: debug.assertion((len(row) == last_row_length) or (not last_row_length))
+            # note: ragged rows are reported at end (see RowShapeStats.report)
+            row_shape.add_row(len(row), last_line_num + 1)
+            last_line_num = self.csv_reader.line_num
 
             # Derive the fields to extract if all to be extracted
-            debug.trace_fmt(7, "pre f={f} all={a}", f=self.fields, a=self.all_fields)
+            if trace_details:
+                debug.trace_fmt(7, "pre f={f} all={a}", f=self.fields, a=self.all_fields)
             if ((not self.fields) and self.all_fields):
                 self.fields = [(c + 1) for c in range(len(row))]
                 if not self.fields:
                     ## OLD: system.print_stderr("Error: No items in header row at line {l}", l=(i + 1))
                     system.print_stderr("Error: No items in row at line {l}", l=(i + 1))
-            debug.trace_fmt(7, "post f={f}", f=self.fields)
+            if trace_details:
+                debug.trace_fmt(7, "post f={f}", f=self.fields)
             debug.assertion(self.fields)
 
             # Output line with fields joined by (output) separator
@@ -412,7 +691,8 @@ class Script(Main):
             output_row = []
             for f in self.fields:
                 valid_field_number = (1 <= f <= len(row))
-                debug.trace_expr(5, f)
+                if trace_rows:
+                    debug.trace_expr(5, f)
                 debug.assertion(valid_field_number)
                 ## OLD: output_row.append(row[f - 1] if valid_field_number else "")
                 column = row[f - 1] if valid_field_number else ""
@@ -421,28 +701,171 @@ class Script(Main):
                 if self.max_field_len:
                     column = gh.elide(column, max_len=self.max_field_len)
                 output_row.append(column)
-            debug.trace_expr(6, output_row)
+            if trace_rows:
+                debug.trace_expr(6, output_row)
             csv_writer.writerow(output_row)
+        row_shape.num_lines = self.csv_reader.line_num
+        return (row_shape.num_rows, row_shape.num_cols)
+
+    def get_num_ranges(self):
+        """Number of byte ranges of the input file for extraction by separate processes (see extract_fields_parallel)
+        Note: This is 1 unless --workers specified with a regular uncompressed file at least
+        MIN_RANGE_BYTES per range, provided fork supported."""
+        num_ranges = 1
+        if (self.workers > 1):
+            import multiprocessing              # pylint: disable=import-outside-toplevel
+            if ((self.input_stream == sys.stdin) or self.other_filenames or self.fix
+                    or self.filename.endswith(COMPRESSED_SUFFIXES) or (not os.path.isfile(self.filename))):
+                system.print_stderr("Warning: --workers requires single regular file, so extracting serially")
+            elif ("fork" not in multiprocessing.get_all_start_methods()):
+                system.print_stderr("Warning: workers not supported (i.e., no fork), so extracting serially")
+            else:
+                num_ranges = max(1, min(self.workers, os.path.getsize(self.filename) // max(1, MIN_RANGE_BYTES)))
+        debug.trace(5, f"get_num_ranges() => {num_ranges}")
+        return num_ranges
+
+    def extract_fields_parallel(self, num_ranges):
+        """Extract the fields from NUM_RANGES byte ranges of input file via separate processes, returning (num_rows, num_cols)
+        Notes:
+        - The ranges are aligned to record boundaries (see find_record_boundaries).
+        - The fields for --all-fields and the expected number of columns are based on the first row.
+        - Each worker writes its output to a temp file, and these are output in order.
+        """
+        # pylint: disable=import-outside-toplevel
+        from concurrent.futures import ProcessPoolExecutor
+        import multiprocessing
+        global worker_script
+        debug.trace(5, f"extract_fields_parallel({num_ranges})")
+        dialect = (csv.get_dialect(self.dialect) if isinstance(self.dialect, str) else self.dialect)
+        quotechar = (dialect.quotechar if (dialect.quoting != csv.QUOTE_NONE) else None)
+        first_row = next(csv.reader(self.input_stream, delimiter=self.delimiter, dialect=self.dialect), [])
+        self.input_stream.seek(0)
+        if ((not self.fields) and self.all_fields):
+            self.fields = [(c + 1) for c in range(len(first_row))]
+        if not self.fields:
+            debug.trace(4, "note: no fields in first row, so extracting serially")
+            return (self.extract_fields_fast() if self.use_fast_path() else self.extract_fields_csv())
+        self.row_shape = RowShapeStats(num_cols=(len(first_row) or None))
+        boundaries = find_record_boundaries(self.filename, num_ranges, quotechar, dialect.escapechar)
+
+        # Have each range processed by a separate process, outputting results in order
+        worker_script = self
+        sys.stdout.flush()
+        with ProcessPoolExecutor(max_workers=(len(boundaries) - 1),
+                                 mp_context=multiprocessing.get_context("fork")) as executor:
+            futures = [executor.submit(extract_worker_range, i, start, end)
+                       for (i, (start, end)) in enumerate(zip(boundaries, boundaries[1:]))]
+            for future in futures:
+                (output_file, range_shape) = future.result()
+                with open(output_file, "rb") as f:
+                    shutil.copyfileobj(f, sys.stdout.buffer)
+                sys.stdout.buffer.flush()
+                self.row_shape.merge(range_shape)
+                if not debug.detailed_debugging():
+                    gh.delete_file(output_file)
+        worker_script = None
+        return (self.row_shape.num_rows, self.row_shape.num_cols)
+
+    def run_main_step(self):
+        """Main processing step: read each line (i.e. row) and extract specified columns.
+        Note: The fields are 1-based (i.e., first column specified 1 not 0)"""
+        debug.trace_fmtd(4, "run_main_step()")
+
+        # If unspecified, try to determine dialect for CSV input automatically
+        # Notes: doesn't recognize escapes properly, such as \"); and,
+        # sniffer doesn't work for stdin due to python limitation with backtracking.
+        if ((self.delimiter == COMMA) and (not self.dialect) and self.run_sniffer):
+            debug.assertion(self.input_stream != sys.stdin)
+            self.dialect = csv.Sniffer().sniff(self.input_stream.read(SNIFFER_LOOKAHEAD))
+            debug.trace_object(4, self.dialect, "csv sniffer")
+            self.input_stream.seek(0)
+            if (self.output_dialect is None):
+                self.output_dialect = self.dialect
+
+        # Optionally, fixup input if TSV changins multiple spaces into single tab.
+        # Note: makes pass through data, writes to temp file, and then resets input stream to
+        # read from the temp file.
+        # TODO: have option to distinguish old-style loose fix (3+ spaces) from strict fix (all whitespace)
+        if self.fix:
+            debug.assertion(self.delimiter == TAB)
+            temp_file_stream = system.open_file(self.temp_file, mode="w")
+            num_fixed = 0
+            for line in self.input_stream.readlines():
+                ## OLD: line = re.sub(r"   *", TAB, line)
+                new_line = re.sub(r" +", TAB, line)
+                if (new_line != line):
+                    num_fixed += 1
+                    line = new_line
+                debug.assertion(SPACE not in line)
+                temp_file_stream.write(line)
+            debug.trace(4, f"Fixed {num_fixed} lines")
+            ## OLD: self.input_stream.seek(0)
+            temp_file_stream.close()
+            self.input_stream = system.open_file(self.temp_file, mode="r")
+            ## HACK: pretend reading from stdin
+            sys.stdin = self.input_stream
+
+        debug.trace_expr(4, self.delimiter, self.output_delimiter, self.dialect, self.output_dialect)
+        if (self.input_stream != sys.stdin):
+            # note: silly csv.reader requirement for newline option to open (TODO, open what?)
+            if self.other_filenames:
+                self.input_stream = MultiFileInput([self.filename] + self.other_filenames, newline="")
+            else:
+                self.input_stream = open_input_file(self.filename, newline="")
+
+        # Extract the fields, using str.split unless the csv module needed
+        self.row_shape = RowShapeStats()
+        num_ranges = self.get_num_ranges()
+        if (num_ranges > 1):
+            self.extract_fields_parallel(num_ranges)
+        elif self.use_fast_path():
+            self.extract_fields_fast()
+        else:
+            self.extract_fields_csv()
 
         # Do sanity checks
-        # Note: this compares row extraction against Pandas dataframe
-        ## OLD: if (self.input_stream != sys.stdin):
-        if (debug.debugging() and (self.input_stream != sys.stdin)):
-            debug.trace(4, "note: csv vs. pandas row count sanity check")
-            ## BAD: debug.assertion(num_rows == len(du.read_csv(self.filename, delimiter=self.delimiter))
-            dataframe = du.read_csv(self.filename, delimiter=self.delimiter, dialect=self.dialect)
-            valid_dataframe = (dataframe is not None)
-            debug.assertion(valid_dataframe)
-            if valid_dataframe:
-                df_num_rows = 1 + len(dataframe)
-                df_num_cols = len(dataframe.columns)
-                debug.trace_fmt(4, "csv dimensions: {nr}x{nc}", nr=num_rows, nc=num_cols)
-                debug.trace_fmt(4, "pandas dimensions: {nr}x{nc}", nr=df_num_rows, nc=df_num_cols)
-                debug.assertion(num_rows == df_num_rows)
-                debug.assertion(num_cols == df_num_cols)
+        # Note: uses row-shape statistics from the extraction pass (e.g., ragged rows)
+        ## OLD:
+        ## if (debug.debugging() and (self.input_stream != sys.stdin)):
+        ##     debug.trace(4, "note: csv vs. pandas row count sanity check")
+        ##     dataframe = du.read_csv(self.filename, delimiter=self.delimiter, dialect=self.dialect)
+        ##     ...
+        ##     debug.assertion(num_rows == df_num_rows)
+        ##     debug.assertion(num_cols == df_num_cols)
+        self.row_shape.report()
 
         return
 
+#...............................................................................
+# Worker support for extract_fields_parallel
+# note: the workers are forked, so the script instance is inherited
+
+worker_script = None
+
+
+def extract_worker_range(range_num, start, end):
+    """Extract the fields for bytes START to END of input file in worker, returning (output_file, row_shape)"""
+    debug.trace(5, f"extract_worker_range({range_num}, {start}, {end}); pid={os.getpid()}")
+    script = worker_script
+    output_file = f"{script.temp_file}.range{range_num}"
+    script.input_stream = io.TextIOWrapper(io.BufferedReader(FileRange(script.filename, start, end)),
+                                           encoding="UTF-8", errors="ignore", newline="")
+    script.row_shape = RowShapeStats(num_cols=script.row_shape.num_cols)
+    saved_stdout = sys.stdout
+    sys.stdout = system.open_file(output_file, mode="w")
+    try:
+        if script.use_fast_path():
+            script.extract_fields_fast()
+        else:
+            script.extract_fields_csv()
+    finally:
+        sys.stdout.close()
+        sys.stdout = saved_stdout
+        script.input_stream.close()
+    return (output_file, script.row_shape)
+
+#...............................................................................
+
 if __name__ == '__main__':
     debug.trace_current_context()
     debug.trace_fmt(4, "Environment options: {eo}",
@@ -469,7 +892,8 @@ if __name__ == '__main__':
              (TAB_STYLE, "Non-excel TSV conventions (default)"),
              ## (TODO_ARG, "TODO: arg desc").
              (UNIX_STYLE, "Use Unix conventions for CSV files (see csv python package docs)")]),
-        int_options = [(MAX_FIELD_LEN, "Maximum length per field")],
+        int_options = [(MAX_FIELD_LEN, "Maximum length per field"),
+                       (WORKERS, "Number of processes for extracting from byte ranges of input file (regular files only)")],
         text_options=[(DELIM, "Input field separator"),
                       (DIALECT, "CSV module dialect: standard (i.e., excel, excel-tab, or unix) or adhoc (e.g., pyspark, hive)"),
                       (OUTPUT_DIALECT, "dialect for output--defaults to input one"),
@@ -19,13 +19,12 @@
 """Utility functions for work with data (e.g., pandas wrappers)"""
 
 # Standard module
-import pandas as pd
+# note: pandas is imported when first needed (see get_pandas)
 import csv
 
 # Local modules
 from mezcla import debug
 from mezcla import system
-from mezcla.text_utils import version_to_number as version_as_float
 
 # Constants
 # Note: Delim defaults to None so that dialect inference can be used.
@@ -43,8 +42,22 @@ SEP = 'sep'
 
 # Sanity check for version info
 MIN_PANDAS_VERSION = "1.3.0"
-if (version_as_float(pd.__version__) < version_as_float(MIN_PANDAS_VERSION)):
-    system.exit(f"Error: data_utils.py now needs pandas {MIN_PANDAS_VERSION} or higher")
+pd = None
+
+
+def get_pandas():
+    """Return pandas module, importing it upon first use (i.e., to reduce startup time)
+    Note: exits if version is older than MIN_PANDAS_VERSION"""
+    global pd
+    if pd is None:
+        # pylint: disable=import-outside-toplevel
+        import pandas
+        # note: text_utils imports html_utils (and so requests)
+        from mezcla.text_utils import version_to_number as version_as_float
+        if (version_as_float(pandas.__version__) < version_as_float(MIN_PANDAS_VERSION)):
+            system.exit(f"Error: data_utils.py now needs pandas {MIN_PANDAS_VERSION} or higher")
+        pd = pandas
+    return pd
 
 #-------------------------------------------------------------------------------
 
@@ -75,8 +88,9 @@ def read_csv(filename, **in_kw):
     debug.trace_fmt(5, "read_csv({f}, [in_kw={ikw}])", f=filename, ikw=in_kw)
     debug.trace_fmt(6, "\tkw={k}", k=kw)
     df = None
+    pandas = get_pandas()
     try:
-        df = pd.read_csv(filename, **kw)
+        df = pandas.read_csv(filename, **kw)
     except:
         debug.trace(3, f"Exception during read_csv: {system.get_exception()}")
     debug.trace(4, f"read_csv({filename}) => {df}")
@@ -13,6 +13,11 @@
 #   code just for the sake of simplicity, a la manera moronista (i.e., only one moronic way to do things)!
 # - A few functions from system are re-implemented here without tracing to
 #   avoid circular dependencies (e.g., _to_utf8).
+# - With ASYNC_TRACING=1, trace output is written in batches via a background
+#   thread (see AsyncTraceSink); DEBUG_FILE output is appended a line at a time
+#   (see TraceFile), so it can be shared by multiple processes.
+# - With PROFILE_FILE=file, the script is profiled (see FunctionProfiler), with
+#   the results viewable via format_profile.py.
 # - For f-string syntax, see following:
 #   https://docs.python.org/3/tutorial/inputoutput.html
 #   https://www.python.org/dev/peps/pep-0498
@@ -54,18 +59,17 @@
 """Debugging functions (e.g., tracing)"""
 
 # Standard packages
+# note: modules only needed for special cases are imported when used (e.g., inspect and
+# logging), in order to reduce startup time for scripts (see tests/test_import_time.py).
 import atexit
-from datetime import datetime
 import enum
-import inspect
 from itertools import zip_longest
-import logging
 import os
-from pprint import pprint
+import queue
 import re
 ## OLD: from xml.dom.minidom import Element
-import six
 import sys
+import threading
 import time
 ## DEBUG: sys.stderr.write(f"{__file__=}\n")
 
@@ -107,7 +111,7 @@ MOST_VERBOSE = TL.MOST_VERBOSE
 
 # Other constants
 UTF8 = "UTF-8"
-STRING_TYPES = six.string_types
+STRING_TYPES = (str,)                   # note: same as six.string_types under Python 3
 # note: INDENT0 is left margin and INDENT1 is normal indent
 INDENT0 = ""
 INDENT1 = "    "
@@ -141,7 +145,8 @@ if __debug__:
     last_trace_time = time.time()       # timestamp from last trace
     use_logging = False                 # traces via logging (and stderr)
     debug_file = None                   # file for log output
-    debug_file_hack = False             # work around concurrent writes by reopening after each trace
+    debug_file_hack = False             # work around concurrent writes by reopening after each trace (n.b., not needed with TraceFile)
+    trace_sink = None                   # alternative output for traces (e.g., AsyncTraceSink)
     para_mode_tracing = False           # multiline tracing functions add blank lines (e.g., for para-mode grep)
     #
     try:
@@ -223,18 +228,188 @@ if __debug__:
         return result
 
     def do_print(text, end=None):
-        """Print TEXT to stderr and optionally to DEBUG_FILE"""
+        """Print TEXT to stderr and optionally to DEBUG_FILE (or via the trace sink if set)"""
+        if end is None:
+            end = "\n"
+        if trace_sink:
+            trace_sink.write(f"{text}{end}")
+            return
         print(text, file=sys.stderr, end=end)
         if debug_file:
-            print(text, file=debug_file, end=end)
+            # note: single write so that lines from other processes are not interleaved (see TraceFile)
+            debug_file.write(f"{text}{end}")
+
+
+    class TraceFile:
+        """Debug output file for which each write is a single append (i.e., O_APPEND)
+        Note: This allows multiple processes to share DEBUG_FILE without reopening the file after each trace.
+        """
+
+        def __init__(self, filename, append=True):
+            """Open FILENAME, truncating it unless APPEND"""
+            self.name = filename
+            flags = (os.O_WRONLY | os.O_CREAT | os.O_APPEND | (0 if append else os.O_TRUNC))
+            self.fd = os.open(filename, flags, 0o666)
+            self.closed = False
+
+        def write(self, text):
+            """Append TEXT to the file"""
+            data = text.encode(UTF8, "backslashreplace")
+            while data:
+                num_written = os.write(self.fd, data)
+                data = data[num_written:]
+            return len(text)
+
+        def flush(self):
+            """No-op: writes are unbuffered"""
+            return
+
+        def fileno(self):
+            """Return the file descriptor"""
+            return self.fd
+
+        def close(self):
+            """Close the file"""
+            if not self.closed:
+                os.close(self.fd)
+                self.closed = True
+
+
+    class AsyncTraceSink:
+        """Trace sink writing to stderr and DEBUG_FILE via background thread, with traces batched together
+        Notes:
+        - Memory is bounded: tracing blocks if MAX_QUEUED traces are pending.
+        - Pending traces are written upon flush or close, which is done at exit.
+        - Traces from other processes (e.g., forked workers) are written directly, as
+          workers exit via os._exit without running atexit handlers.
+        """
+
+        def __init__(self, max_queued=10000, max_batch=1000):
+            self.max_queued = max_queued
+            self.max_batch = max_batch
+            self.queue = None
+            self.thread = None
+            self.pid = None
+            self.parent_pid = os.getpid()
+            self.closed = False
+            self.lock = threading.Lock()
+
+        def reset_after_fork(self):
+            """Use new lock in child process (e.g., in case held by another thread at fork)"""
+            self.lock = threading.Lock()
+
+        def _start(self):
+            """Start writer thread (e.g., upon first use in process)"""
+            # note: pid set last so that other threads only see fully started writer
+            self.queue = queue.Queue(maxsize=self.max_queued)
+            self.thread = threading.Thread(target=self._run, name="trace-sink", daemon=True)
+            self.thread.start()
+            self.pid = os.getpid()
+
+        def _active(self):
+            """Whether writer thread active in current process"""
+            return ((self.pid == os.getpid()) and self.thread.is_alive())
+
+        def _run(self):
+            """Write out batches of queued traces until None received"""
+            done = False
+            while not done:
+                texts = [self.queue.get()]
+                while (len(texts) < self.max_batch) and (texts[-1] is not None):
+                    try:
+                        texts.append(self.queue.get_nowait())
+                    except queue.Empty:
+                        break
+                done = (texts[-1] is None)
+                try:
+                    self._output("".join(texts[:-1] if done else texts))
+                finally:
+                    for _text in texts:
+                        self.queue.task_done()
+
+        def _output(self, text):
+            """Write TEXT to stderr and DEBUG_FILE"""
+            if not text:
+                return
+            try:
+                sys.stderr.write(text)
+                sys.stderr.flush()
+            except (OSError, ValueError):
+                pass
+            if debug_file:
+                try:
+                    debug_file.write(text)
+                except (OSError, ValueError):
+                    # note: file might have been closed by main thread (e.g., reopen_debug_file)
+                    pass
+
+        def write(self, text):
+            """Queue TEXT for output (or output directly if closed, in another process, or writer stopped)"""
+            pid = os.getpid()
+            if self.closed or (pid != self.parent_pid):
+                self._output(text)
+                return
+            if self.pid != pid:
+                with self.lock:
+                    if self.pid != pid:
+                        self._start()
+            if not self.thread.is_alive():
+                self._output(text)
+                return
+            self.queue.put(text)
+
+        def flush(self):
+            """Wait until pending traces are written"""
+            if self.queue and self._active():
+                self.queue.join()
+
+        def close(self):
+            """Write pending traces and stop writer thread"""
+            if self.queue and self._active():
+                self.queue.put(None)
+                self.thread.join()
+            self.closed = True
+
+
+    def set_trace_sink(sink):
+        """Use SINK for trace output (or None for direct output), returning previous sink
+        Note: SINK should provide write(text), flush(), and close() methods (e.g., AsyncTraceSink).
+        """
+        global trace_sink
+        old_sink = trace_sink
+        if old_sink:
+            old_sink.flush()
+        trace_sink = sink
+        if sink:
+            atexit.register(sink.close)
+        return old_sink
+
+
+    def _reset_trace_sink_after_fork():
+        """Reinitialize state of current trace sink in forked child"""
+        if isinstance(trace_sink, AsyncTraceSink):
+            trace_sink.reset_after_fork()
+    #
+    if hasattr(os, "register_at_fork"):
+        os.register_at_fork(after_in_child=_reset_trace_sink_after_fork)
+
+
+    def flush_trace_output():
+        """Make sure pending trace output is written (e.g., with AsyncTraceSink)"""
+        if trace_sink:
+            trace_sink.flush()
     
     def trace(level, text, empty_arg=None, no_eol=False, indentation=None):
-        """Print TEXT if at trace LEVEL or higher, including newline unless SKIP_NEWLINE"""
+        """Print TEXT if at trace LEVEL or higher, including newline unless SKIP_NEWLINE
+        Note: TEXT can be a no-argument function, which is only invoked if tracing at LEVEL (see trace_lazy).
+        """
         # TODO: add option to use format_value
         # Note: trace should not be used with text that gets formatted to avoid
         # subtle errors
         ## DEBUG: sys.stderr.write("trace({l}, {t})\n".format(l=level, t=text))
         if (trace_level >= level):
+            if callable(text):
+                text = _to_string(text())
             if indentation is None:
                 indentation = INDENT0
             # Prefix trace with timestamp w/o date
@@ -255,6 +430,7 @@ if __debug__:
             do_print(indentation + _to_utf8(text), end=end)
             if use_logging:
                 # TODO: see if way to specify logging terminator
+                import logging                  # pylint: disable=import-outside-toplevel
                 logging.debug(indentation + _to_utf8(text))
             if debug_file_hack:
                 reopen_debug_file()
@@ -263,6 +439,24 @@ if __debug__:
         return
 
 
+    def trace_lazy(level, text, *args, **kwargs):
+        """Print TEXT formatted with ARGS and KWARGS if at trace LEVEL or higher, deferring all work until then.
+        Note:
+        - TEXT is either a str.format template or a function producing the trace text given ARGS and KWARGS.
+        - Unlike trace with an f-string, nothing is formatted (e.g., no repr calls) when not tracing at LEVEL.
+        """
+        # EX: trace_lazy(6, "L{n}: {l}", n=line_num, l=line)
+        # EX: trace_lazy(7, lambda: f"sorted={sorted(items)}")
+        if (trace_level >= level):
+            try:
+                text = (text(*args, **kwargs) if callable(text) else _to_unicode(text).format(*args, **kwargs))
+            except(IndexError, KeyError, ValueError):
+                _print_exception_info("trace_lazy")
+                return
+            trace(level, text)
+        return
+
+
     @docstring_parameter(max_len=max_trace_value_len)
     def trace_fmtd(level, text, **kwargs):
         """Print TEXT with formatting using optional format KWARGS if at trace LEVEL or higher, including newline
@@ -347,6 +541,7 @@ if __debug__:
         ## OLD: for (member, value) in inspect.getmembers(obj):
         member_info = []
         try:
+            import inspect                      # pylint: disable=import-outside-toplevel
             member_info = inspect.getmembers(obj)
         except:
             trace_fmtd(QUITE_VERBOSE, "Warning: Problem getting member list in trace_object: {exc}",
@@ -364,12 +559,13 @@ if __debug__:
             if (trace_level >= MOST_VERBOSE):
                 do_print(indentation + member + ": ", end="")
                 if pretty_print:
-                    pprint(value_spec, stream=sys.stderr)
-                    if debug_file:
-                        pprint(value_spec, stream=debug_file)
+                    ## OLD: pprint(value_spec, stream=sys.stderr)
+                    from pprint import pformat  # pylint: disable=import-outside-toplevel
+                    do_print(pformat(value_spec))
                 else:
                     do_print(value_spec)
                 if use_logging:
+                    import logging              # pylint: disable=import-outside-toplevel
                     logging.debug(_to_utf8((indentation + member + ": " + value_spec)))
                 continue
             # Include unless special member (or if no filtering)
@@ -408,10 +604,13 @@ if __debug__:
                 do_print(indentation + member + ": ", end="")
                 if pretty_print:
                     # TODO: remove quotes from numbers and booleans
-                    pprint(value_spec, stream=sys.stderr, indent=len(indentation))
+                    ## OLD: pprint(value_spec, stream=sys.stderr, indent=len(indentation))
+                    from pprint import pformat  # pylint: disable=import-outside-toplevel
+                    do_print(pformat(value_spec, indent=len(indentation)))
                 else:
                     do_print(_to_utf8(value_spec))
                 if use_logging:
+                    import logging              # pylint: disable=import-outside-toplevel
                     logging.debug(_to_utf8((indentation + member + ":" + value_spec)))
         trace(ALWAYS, indentation + "}")
         if para_mode_tracing:
@@ -477,8 +676,9 @@ if __debug__:
         - Use PREFIX to specify initial trace output (e.g., for function call tracing).
         - Use SUFFIX to specify final value to be printed (e.g., for perlish para grep over multi-line trace).
         - See misc_utils.trace_named_objects for similar function taking string input, which is more general but harder to use and maintain"""
-        trace_fmt(MOST_VERBOSE, "trace_expr({l}, a={args}, kw={kw}); debug_level={dl}",
-                  l=level, args=values, kw=kwargs, dl=trace_level)
+        if (trace_level >= MOST_VERBOSE):
+            trace_fmt(MOST_VERBOSE, "trace_expr({l}, a={args}, kw={kw}); debug_level={dl}",
+                      l=level, args=values, kw=kwargs, dl=trace_level)
         ## TODO1: check for unknown keywords, which could be cut-n-paste error
         ## TODO2: try to handle numpy arrays better; ex: 'arr=array([[11, 12],\n       [21, 22]])'
         ##        => 'arr=array([[11, 12], [21, 22]])'
@@ -510,28 +710,31 @@ if __debug__:
             use_repr = True
         if prefix is None:
             prefix = ""
-        trace(9, f"sep={sep!r}, del={delim!r}, noe={no_eol}, rep={use_repr}, len={max_len}, pre={prefix!r} suf={suffix!r}")
+        if (trace_level >= MOST_VERBOSE):
+            trace(MOST_VERBOSE, f"sep={sep!r}, del={delim!r}, noe={no_eol}, rep={use_repr}, len={max_len}, pre={prefix!r} suf={suffix!r}")
 
         # Get symbolic expressions for the values
-        # TODO2: handle cases split across lines
+        # Note: the call's source is parsed once per call site (see get_call_expressions)
         try:
-            # TODO3: rework introspection following icecream (e.g., using abstract syntax tree)
-            caller = inspect.stack()[1]
-            (_frame, filename, line_number, _function, context, _index) = caller
-            trace(9, f"filename={filename!r}, context={context!r}")
-            statement = read_line(filename, line_number).strip()
-            if statement == MISSING_LINE:
-                statement = str(context).replace("\\n']", "")
-            # Extract list of argument expressions (removing optional comment)
-            statement = re.sub(r"#.*$", "", statement)
-            statement = re.sub(r"^\s*\S*trace_expr\s*\(", "", statement)
-            # Remove trailing paren with optional semicolon
-            statement = re.sub(r"\)\s*;?\s*$", "", statement)
-            # Remove trailing comma (e.g., if split across lines)
-            statement = re.sub(r",?\s*$", "", statement)
+            caller = sys._getframe(1)       # pylint: disable=protected-access
+            filename = caller.f_code.co_filename
+            line_number = caller.f_lineno
+            expressions = get_call_expressions(filename, line_number, "trace_expr")
+            if expressions is None:
+                # Fallback to barebones parsing of the line (e.g., for statement continuations)
+                statement = read_line(filename, line_number).strip()
+                # Extract list of argument expressions (removing optional comment)
+                statement = re.sub(r"#.*$", "", statement)
+                statement = re.sub(r"^\s*\S*trace_expr\s*\(", "", statement)
+                # Remove trailing paren with optional semicolon
+                statement = re.sub(r"\)\s*;?\s*$", "", statement)
+                # Remove trailing comma (e.g., if split across lines)
+                statement = re.sub(r",?\s*$", "", statement)
+                expressions = re.split(", +", statement)
             # Skip first argument (level)
-            expressions = re.split(", +", statement)[1:]
-            trace(9, f"expressions={expressions!r}\nvalues={values!r}")
+            expressions = expressions[1:]
+            if (trace_level >= MOST_VERBOSE):
+                trace(MOST_VERBOSE, f"filename={filename!r}, line={line_number}\nexpressions={expressions!r}\nvalues={values!r}")
         except:
             trace_fmtd(ALWAYS, "Exception isolating expression in trace_expr: {exc}",
                        exc=sys.exc_info())
@@ -578,7 +781,7 @@ if __debug__:
         if label is None:
             label = "current"
         try:
-            frame = inspect.currentframe().f_back
+            frame = sys._getframe(1)    # pylint: disable=protected-access
         except (AttributeError, KeyError, ValueError):
             trace_fmt(VERBOSE, "Exception during trace_current_context: {exc}",
                       exc=sys.exc_info())
@@ -649,23 +852,26 @@ if __debug__:
         if (not expression):
             try:
                 # Get source information for failed assertion
-                trace_fmtd(MOST_VERBOSE, "Call stack: {st}", st=inspect.stack())
-                caller = inspect.stack()[1]
-                ## OLD: (_frame, filename, line_number, _function, _context, _index) = caller
-                (_frame, filename, line_number, _function, context, _index) = caller
-                trace(8, f"filename={filename!r}, context={context!r}")
-                # Read statement in file and extract assertion expression
-                # TODO: handle #'s in statement proper (e.g., assertion("#" in text))
-                statement = read_line(filename, line_number).strip()
-                if statement == MISSING_LINE:
-                    ## OLD: statement = str(context).replace(")\\n']", "")
-                    statement = str(context).replace("\\n']", "")
-                # Format expression and message
-                # note: removes comments, along with the assertion call prefix and suffix
-                statement = re.sub("#.*$", "", statement)
-                statement = re.sub(r"^(\S*)assertion\(", "", statement)
-                expression = re.sub(r"\);?\s*$", "", statement)
-                expression = re.sub(r",\s*$", "", statement)
+                if (trace_level >= MOST_VERBOSE):
+                    import inspect              # pylint: disable=import-outside-toplevel
+                    trace_fmtd(MOST_VERBOSE, "Call stack: {st}", st=inspect.stack())
+                caller = sys._getframe(1)   # pylint: disable=protected-access
+                filename = caller.f_code.co_filename
+                line_number = caller.f_lineno
+                trace(8, f"filename={filename!r}, line={line_number}")
+                # Extract assertion expression from the call's source
+                expressions = get_call_expressions(filename, line_number, "assertion")
+                if expressions:
+                    expression = expressions[0]
+                else:
+                    # Fallback to barebones parsing of the line
+                    # TODO: handle #'s in statement proper (e.g., assertion("#" in text))
+                    # note: removes comments, along with the assertion call prefix and suffix
+                    statement = read_line(filename, line_number).strip()
+                    statement = re.sub("#.*$", "", statement)
+                    statement = re.sub(r"^(\S*)assertion\(", "", statement)
+                    expression = re.sub(r"\);?\s*$", "", statement)
+                    expression = re.sub(r",\s*$", "", statement)
                 expression_text = expression
                 qualification_spec = (": " + message) if message else ""
                 # Output information
@@ -675,7 +881,7 @@ if __debug__:
             except:
                 trace_fmtd(ALWAYS, "Exception formatting assertion: {exc}",
                            exc=sys.exc_info())
-                trace_object(ALWAYS, inspect.currentframe(), "caller frame", pretty_print=True)
+                trace_object(ALWAYS, sys._getframe(), "caller frame", pretty_print=True)  # pylint: disable=protected-access
         return expression_text
 
     def val(level, value):
@@ -743,6 +949,12 @@ else:
 
     trace_fmtd = non_debug_stub
 
+    trace_lazy = non_debug_stub
+
+    set_trace_sink = non_debug_stub
+
+    flush_trace_output = non_debug_stub
+
     trace_object = non_debug_stub
 
     trace_values = non_debug_stub
@@ -801,6 +1013,7 @@ def debug_print(text, level):
 
 def timestamp():
     """Return timestamp for use in logging, etc."""
+    from datetime import datetime       # pylint: disable=import-outside-toplevel
     return (str(datetime.now()))
     
 
@@ -838,6 +1051,37 @@ def verbose_debugging():
     return (get_level() >= VERBOSE)
 
 
+class TraceGuard:
+    """Guard object that is true only when tracing at LEVEL, for code only needed for tracing
+    Note:
+    - This is intended for use in loops: the guard is created once and then tested per iteration.
+    - For the level to be fixed for the loop, just use a local flag: trace_lines = debugging(6).
+    """
+    # EX: guard = TraceGuard(99); (not guard)
+    # EX: with TraceGuard(ALWAYS) as tracing: bool(tracing) => True
+
+    def __init__(self, level):
+        """Initializer: LEVEL is the tracing level required"""
+        self.level = level
+
+    def __bool__(self):
+        """Whether tracing at self.level (always False if __debug__ not set)"""
+        return (__debug__ and (trace_level >= self.level))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_args):
+        return False
+
+    def trace(self, text, *args, **kwargs):
+        """Trace TEXT at the guard level, formatted as with trace_lazy"""
+        trace_lazy(self.level, text, *args, **kwargs)
+
+    def __repr__(self):
+        return f"TraceGuard({self.level})"
+
+
 def _getenv_bool(name, default_value):
     """Version of system.getenv_bool w/o tracing"""
     ## EX: os.setenv("FU", "1"); _getenv_bool("FU", False)) => True
@@ -922,6 +1166,7 @@ def xor3(value1:bool, value2:bool, value3:bool) -> bool:
 
 def init_logging():
     """Enable logging with INFO level by default or with DEBUG if detailed debugging"""
+    import logging                      # pylint: disable=import-outside-toplevel
     trace(DETAILED, "init_logging()")
     trace_object(QUITE_DETAILED, logging.root, "logging.root")
 
@@ -960,8 +1205,12 @@ def profile_function(frame, event, arg):
     #    of the object in the local namespace corresponding to "self".
     # TODO:
     # - Make tracing level an option (e.g., environment).
+    if (trace_level < DETAILED):
+        # note: this is invoked for each function event, so nothing else done unless traced
+        return
     trace_fmt(QUITE_DETAILED, "profile_function(_, {e}, {a})", e=event, a=arg)
-    trace_object(QUITE_VERBOSE, frame, "frame")
+    if (trace_level >= QUITE_VERBOSE):
+        trace_object(QUITE_VERBOSE, frame, "frame")
 
     # Resolve the names for the function (callable) and module
     name = "???"
@@ -990,6 +1239,103 @@ def profile_function(frame, event, arg):
                   mod=module, func=name, e=event, a=arg)
     return
 
+
+class FunctionProfiler:
+    """Low-overhead function profiler, with optional sampling of call stacks
+    Notes:
+    - The function call counts as well as cumulative and self times are collected via cProfile.
+    - With SAMPLE_MS, the call stack for the profiled thread is sampled at that interval (in milliseconds)
+      by a background thread, with counts kept per stack (e.g., for use with flame graphs).
+    - The results are saved to FILENAME in pstats format, or as JSON if it ends in .json.
+      Either can be displayed via format_profile.py.
+    - This is normally enabled via the PROFILE_FILE environment variable (see debug_init).
+    """
+
+    def __init__(self, filename, sample_ms=0):
+        self.filename = filename
+        self.sample_ms = sample_ms
+        self.profiler = None
+        self.samples = {}
+        self.thread_id = None
+        self.sampler = None
+        self.stop_sampling = threading.Event()
+
+    def start(self):
+        """Start profiling the current thread"""
+        import cProfile                 # pylint: disable=import-outside-toplevel
+        self.thread_id = threading.get_ident()
+        self.profiler = cProfile.Profile()
+        self.profiler.enable()
+        if self.sample_ms > 0:
+            self.sampler = threading.Thread(target=self._sample_stacks, name="stack-sampler", daemon=True)
+            self.sampler.start()
+
+    def _sample_stacks(self):
+        """Sample call stack for profiled thread until stopped"""
+        interval = (self.sample_ms / 1000.0)
+        while not self.stop_sampling.wait(interval):
+            frame = sys._current_frames().get(self.thread_id)     # pylint: disable=protected-access
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                key = ";".join(reversed(stack))
+                self.samples[key] = self.samples.get(key, 0) + 1
+
+    def stop(self):
+        """Stop profiling (and sampling)"""
+        if self.profiler:
+            self.profiler.disable()
+        if self.sampler:
+            self.stop_sampling.set()
+            self.sampler.join()
+            self.sampler = None
+
+    def get_stats(self):
+        """Return pstats dictionary: (file, line, function) => (primitive calls, calls, self time, cumulative time, callers)"""
+        import pstats                   # pylint: disable=import-outside-toplevel
+        return pstats.Stats(self.profiler).stats
+
+    def save(self):
+        """Save the results to self.filename (JSON if .json extension, otherwise pstats)"""
+        if self.filename.endswith(".json"):
+            import json                 # pylint: disable=import-outside-toplevel
+            with open(self.filename, mode="w", encoding=UTF8) as f:
+                json.dump(profile_stats_to_json(self.get_stats(), self.samples, self.sample_ms), f)
+        else:
+            self.profiler.dump_stats(self.filename)
+        trace(DETAILED, f"Saved profile to {self.filename}")
+
+    def finish(self):
+        """Stop profiling and save the results"""
+        try:
+            self.stop()
+            self.save()
+        except:
+            _print_exception_info("FunctionProfiler.finish")
+
+
+def profile_stats_to_json(stats, samples=None, sample_ms=0):
+    """Convert pstats STATS dict to JSON-compatible dict, including optional stack SAMPLES"""
+    # EX: profile_stats_to_json({("f.py", 1, "g"): (1, 1, 0.5, 0.5, {})})["functions"][0]["ncalls"] => 1
+    def function_info(key, values):
+        """Return dict for function KEY with pstats VALUES"""
+        (filename, line, name) = key
+        (pcalls, ncalls, tottime, cumtime) = values[:4]
+        return {"file": filename, "line": line, "name": name, "pcalls": pcalls, "ncalls": ncalls,
+                "tottime": tottime, "cumtime": cumtime}
+    functions = []
+    for key, (pcalls, ncalls, tottime, cumtime, callers) in stats.items():
+        info = function_info(key, (pcalls, ncalls, tottime, cumtime))
+        info["callers"] = [function_info(caller, (values if isinstance(values, tuple) else (values, values, 0, 0)))
+                           for (caller, values) in callers.items()]
+        functions.append(info)
+    return {"format": "mezcla-profile", "version": 1, "functions": functions,
+            "sample_ms": sample_ms, "samples": (samples or {})}
+
+
 def reference_var(*args):
     """No-op function used for referencing variables in ARGS"""
     trace(MOST_VERBOSE, f"reference_var{tuple(args)}")
@@ -1012,18 +1358,68 @@ def clip_value(value, max_len=CLIPPED_MAX):
 
 def read_line(filename, line_number):
     """Returns contents of FILENAME at LINE_NUMBER
-    Note: returns '???' upon exception
+    Note: returns '???' upon exception; the file contents are cached (via linecache)
     """
     # ex: "debugging" in read_line(os.path.join(os.getcwd(), "debug.py"), 3)
     # TODO: use rare Unicode value instead of "???"
     try:
-        file_handle = open(filename, encoding="UTF-8")
-        line_contents = (list(file_handle))[line_number - 1]
-        file_handle.close()
+        import linecache                # pylint: disable=import-outside-toplevel
+        line_contents = linecache.getline(filename, line_number) or MISSING_LINE
     except:
         line_contents = MISSING_LINE
     return line_contents
 
+
+# Argument expression texts for call sites, keyed by (filename, line_number, function_name)
+call_expressions_cache = {}
+MAX_CALL_LINES = 10
+
+
+def _find_call_expressions(filename, line_number, function_name):
+    """Parse source around LINE_NUMBER in FILENAME for call to FUNCTION_NAME and return argument texts
+    Note: This tries increasingly larger source windows, so that calls split across lines are
+    handled (e.g., LINE_NUMBER for the first or last line of the call, depending on Python version).
+    """
+    import ast                          # pylint: disable=import-outside-toplevel
+    import linecache                    # pylint: disable=import-outside-toplevel
+    lines = linecache.getlines(filename)
+    if not (0 < line_number <= len(lines)):
+        return None
+    for start in range(line_number - 1, max(0, line_number - MAX_CALL_LINES) - 1, -1):
+        indented = lines[start][:1] in (" ", "\t")
+        for end in range(line_number, min(len(lines), start + MAX_CALL_LINES) + 1):
+            # note: an indented statement is parsed as the body of a dummy if
+            source = (("if 1:\n" if indented else "") + "".join(lines[start:end]))
+            try:
+                tree = ast.parse(source)
+            except SyntaxError:
+                continue
+            line_offset = (start - (1 if indented else 0))
+            calls = [node for node in ast.walk(tree)
+                     if (isinstance(node, ast.Call)
+                         and (getattr(node.func, "id", None) or getattr(node.func, "attr", None)) == function_name
+                         and ((node.lineno + line_offset) <= line_number <= (node.end_lineno + line_offset)))]
+            if calls:
+                call = min(calls, key=lambda node: (node.lineno, node.col_offset))
+                # note: expressions split across lines are joined with a space
+                return [re.sub(r"\s*\n\s*", " ", ast.get_source_segment(source, arg)) for arg in call.args]
+    return None
+
+
+def get_call_expressions(filename, line_number, function_name):
+    """Return list of argument expression texts for call to FUNCTION_NAME at LINE_NUMBER of FILENAME
+    Note: The result is cached per call site, with None returned if the call can't be resolved.
+    """
+    # EX: get_call_expressions(__file__, 0, "trace") => None
+    key = (filename, line_number, function_name)
+    if key not in call_expressions_cache:
+        try:
+            call_expressions_cache[key] = _find_call_expressions(filename, line_number, function_name)
+        except:
+            _print_exception_info("get_call_expressions")
+            call_expressions_cache[key] = None
+    return call_expressions_cache[key]
+
 #-------------------------------------------------------------------------------
 
 def main(args):
@@ -1031,6 +1427,9 @@ def main(args):
     trace_expr(DETAILED, len(args))
     trace(ERROR, "FYI: Not intended for direct invocation. Some tracing examples follow.")
     #
+    # pylint: disable=import-outside-toplevel
+    from datetime import datetime
+    import inspect
     trace(ALWAYS, "date record for now at trace level 1")
     trace_object(ERROR, datetime.now(), label="now")
     trace(DETAILED, "stack record with max depth 1")
@@ -1074,7 +1473,8 @@ if __debug__:
             for_append = _getenv_bool("DEBUG_FILE_APPEND", True)
             mode = ("a" if for_append else "w")
             trace_expr(5, mode)
-            debug_file = open(debug_filename, mode=mode, buffering=1, encoding="UTF-8")
+            ## OLD: debug_file = open(debug_filename, mode=mode, buffering=1, encoding="UTF-8")
+            debug_file = TraceFile(debug_filename, append=for_append)
         trace_fmtd(VERBOSE, "debug_filename={fn} debug_file={f}",
                    fn=debug_filename, f=debug_file)
         return
@@ -1099,7 +1499,7 @@ if __debug__:
     def debug_init():
         """Debug-only initialization"""
         time_start = time.time()
-        trace(DETAILED, f"in debug_init(); DEBUG_LEVEL={trace_level}; {timestamp()}")
+        trace(DETAILED, lambda: f"in debug_init(); DEBUG_LEVEL={trace_level}; {timestamp()}")
         ## DEBUG: trace_values(8, inspect.stack(), max_len=256)
         # note: shows command invocation unless invoked via "python -c ..."
         command_line = " ".join(sys.argv)
@@ -1111,6 +1511,8 @@ if __debug__:
                     trace(USUAL, command_line)
         trace_expr(DETAILED, sys.argv)
         open_debug_file()
+        if _getenv_bool("ASYNC_TRACING", False):
+            set_trace_sink(AsyncTraceSink(max_queued=_getenv_int("ASYNC_TRACE_QUEUE_SIZE", 10000)))
 
         # Determine whether tracing include time and date
         global output_timestamps
@@ -1121,7 +1523,7 @@ if __debug__:
     
         # Show startup time and tracing info
         module_file = __file__
-        trace_fmtd(DETAILED, "[{f}] loaded at {t}", f=module_file, t=timestamp())
+        trace(DETAILED, lambda: f"[{module_file}] loaded at {timestamp()}")
         trace_fmtd(DETAILED, "trace_level={l}; output_timestamps={ots}", l=trace_level, ots=output_timestamps)
         trace_expr(QUITE_DETAILED, __file__)
 
@@ -1136,9 +1538,16 @@ if __debug__:
         if enable_logging:
             init_logging()
         monitor_functions = _getenv_bool("MONITOR_FUNCTIONS", False)
+        # note: profiling takes precedence over function monitoring, as both use the profile hook
+        profile_file = os.environ.get("PROFILE_FILE")
+        if profile_file:
+            profiler = FunctionProfiler(profile_file, sample_ms=_getenv_int("PROFILE_SAMPLE_MS", 0))
+            profiler.start()
+            atexit.register(profiler.finish)
+            monitor_functions = False
         if monitor_functions:
             sys.setprofile(profile_function)
-        trace_expr(VERBOSE, para_mode_tracing, max_trace_value_len, use_logging, enable_logging, monitor_functions)
+        trace_expr(VERBOSE, para_mode_tracing, max_trace_value_len, use_logging, enable_logging, monitor_functions, profile_file)
 
         # Show additional information when detailed debugging
         # TODO: sort keys to facilate comparisons of log files
@@ -1164,10 +1573,10 @@ if __debug__:
             if sys.stderr.closed:       # pylint: disable=using-constant-test
                 return
             elapsed = round(time.time() - time_start, 3)
-            trace_fmtd(DETAILED, "[{f}] unloaded at {t}; elapsed={e}s",
-                       f=module_file, t=timestamp(), e=elapsed)
+            trace(DETAILED, lambda: f"[{module_file}] unloaded at {timestamp()}; elapsed={elapsed}s")
             if monitor_functions:
                 sys.setprofile(None)
+            flush_trace_output()
             global debug_file
             if debug_file:
                 debug_file.close()
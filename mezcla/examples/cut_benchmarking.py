@@ -0,0 +1,115 @@
+#! /usr/bin/env python
+#
+# Benchmark for column extraction via cut.py versus GNU cut over a generated TSV file.
+#
+# Note:
+# - The cut.py timings are for the str.split engine (see Script.extract_fields_fast)
+#   and the csv module one (i.e., CUT_FAST_PATH=0), including Python startup.
+# - Use --megabytes 5120 for a 5 GB file (n.b., generating it takes a while).
+# - An existing TSV file can be specified instead via --input (e.g., to avoid regenerating).
+# - The outputs are compared to make sure the engines agree.
+# - With --workers N, cut.py is also timed using N processes over byte ranges of the file.
+#
+
+"""Benchmark cut.py against GNU cut
+
+Sample usage:
+   DEBUG_LEVEL=0 {script} --megabytes 100 --fields 2,5,8
+"""
+
+# Standard modules
+import random
+import sys
+import time
+
+# Local modules
+from mezcla import debug
+from mezcla import glue_helpers as gh
+from mezcla.main import Main
+from mezcla import system
+
+# Constants
+TL = debug.TL
+MEGABYTES_ARG = "megabytes"
+FIELDS_ARG = "fields"
+INPUT_ARG = "input"
+SKIP_CSV_ARG = "skip-csv"
+WORKERS_ARG = "workers"
+NUM_COLUMNS = 10
+WORDS = ["alpha", "beta", "gamma delta", "some text here", "x", "yy", "zzz"]
+
+# Environment options
+NUM_MEGABYTES = system.getenv_int(
+    "NUM_MEGABYTES", 100,
+    description="Default size of generated TSV file in megabytes")
+
+#-------------------------------------------------------------------------------
+
+def generate_tsv(filename, num_megabytes):
+    """Write tab-separated file with about NUM_MEGABYTES of random rows to FILENAME"""
+    debug.trace(TL.DETAILED, f"generate_tsv({filename!r}, {num_megabytes})")
+    rand = random.Random(num_megabytes)
+    max_size = num_megabytes * 1024 * 1024
+    size = 0
+    row_num = 0
+    with system.open_file(filename, mode="w") as f:
+        while size < max_size:
+            lines = []
+            for _i in range(10000):
+                row_num += 1
+                row = [str(row_num)] + [rand.choice(WORDS) for _c in range(NUM_COLUMNS - 2)] + [str(rand.random())]
+                lines.append("\t".join(row) + "\n")
+            text = "".join(lines)
+            f.write(text)
+            size += len(text)
+    return size
+
+
+def time_command(command, env=None):
+    """Return (seconds, output checksum) for running COMMAND via shell with ENV overrides"""
+    start = time.perf_counter()
+    result = gh.run_command(command + " | md5sum", env=env, subtrace_level=0)
+    elapsed = (time.perf_counter() - start)
+    debug.trace_expr(TL.DETAILED, command, elapsed, result.stderr)
+    return (elapsed, result.stdout.split()[0] if result.stdout else "")
+
+#-------------------------------------------------------------------------------
+
+def main():
+    """Entry point"""
+    debug.trace(TL.USUAL, f"main(): script={system.real_path(__file__)}")
+    main_app = Main(description=__doc__.format(script=gh.basename(__file__)),
+                    boolean_options=[(SKIP_CSV_ARG, "Skip timing of csv module engine")],
+                    int_options=[(MEGABYTES_ARG, "Size of generated file in megabytes", NUM_MEGABYTES),
+                                 (WORKERS_ARG, "Number of processes for additional cut.py timing", 0)],
+                    text_options=[(FIELDS_ARG, "Field specification as with cut -f", "2,5,8"),
+                                  (INPUT_ARG, "Existing TSV file to use")],
+                    skip_input=True, manual_input=True)
+    fields = main_app.get_parsed_option(FIELDS_ARG)
+    filename = main_app.get_parsed_option(INPUT_ARG)
+    if not filename:
+        filename = main_app.temp_file + ".tsv"
+        generate_tsv(filename, main_app.get_parsed_option(MEGABYTES_ARG))
+    num_megabytes = gh.file_size(filename) / (1024 * 1024)
+    cut_script = gh.form_path(gh.dir_path(gh.dir_path(__file__)), "cut.py")
+    command_spec = f"{sys.executable} {cut_script} --fields {fields} {filename}"
+    timings = [("GNU cut", *time_command(f"cut -f {fields} {filename}")),
+               ("cut.py", *time_command(command_spec, env={"CUT_FAST_PATH": 1, "DEBUG_LEVEL": 0}))]
+    workers = main_app.get_parsed_option(WORKERS_ARG)
+    if (workers > 1):
+        timings.append((f"cut.py ({workers} workers)",
+                        *time_command(f"{command_spec} --workers {workers}", env={"DEBUG_LEVEL": 0})))
+    if not main_app.get_parsed_option(SKIP_CSV_ARG):
+        timings.append(("cut.py (csv)", *time_command(command_spec, env={"CUT_FAST_PATH": 0, "DEBUG_LEVEL": 0})))
+    print(f"input: {filename} ({num_megabytes:.1f} MB); fields: {fields}")
+    for (label, seconds, _checksum) in timings:
+        print(f"{label}: {seconds:.2f} s ({num_megabytes / seconds:.1f} MB/s)")
+    debug.assertion(len(set(checksum for (_label, _seconds, checksum) in timings)) == 1)
+    if not (main_app.get_parsed_option(INPUT_ARG) or debug.detailed_debugging()):
+        gh.delete_file(filename)
+
+#-------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+    debug.trace_current_context(level=TL.QUITE_VERBOSE)
+    main()
@@ -0,0 +1,113 @@
+#! /usr/bin/env python
+#
+# Benchmark for the per-line overhead of Main.process_input, mainly to check
+# that disabled tracing (e.g., DEBUG_LEVEL=0) adds next to nothing.
+#
+# Note:
+# - The overhead is relative to a bare loop over the same lines invoking the
+#   same process_line method.
+# - Use DEBUG_LEVEL=0 for the disabled case; a higher level like 7 shows the
+#   cost when the per-line traces are active (n.b., redirect stderr).
+# - For comparison without any debugging code, run with python -O.
+#
+
+"""Benchmark per-line tracing overhead of Main.process_input
+
+Sample usage:
+   DEBUG_LEVEL=0 {script} --lines 100000 --
+"""
+
+# Standard modules
+import io
+import time
+
+# Local modules
+from mezcla import debug
+from mezcla import glue_helpers as gh
+from mezcla.main import Main
+from mezcla import system
+
+# Constants
+TL = debug.TL
+LINES_ARG = "lines"
+TRIALS_ARG = "trials"
+PARA_ARG = "para"
+LAZY_ARG = "lazy"
+
+# Environment options
+NUM_LINES = system.getenv_int(
+    "NUM_LINES", 100000,
+    description="Default number of lines to process")
+NUM_TRIALS = system.getenv_int(
+    "NUM_TRIALS", 3,
+    description="Number of trials (best time is used)")
+
+#-------------------------------------------------------------------------------
+
+class LineSink(Main):
+    """Main subclass for which line processing is a no-op (i.e., just tracing)"""
+    lazy = False
+
+    def process_line(self, line):
+        """Trace LINE at most verbose level"""
+        if self.lazy:
+            debug.trace_lazy(TL.MOST_VERBOSE, "line={l!r}", l=line)
+        else:
+            debug.trace(TL.MOST_VERBOSE, f"line={line!r}")
+
+
+def best_time(function, num_trials):
+    """Return best time in seconds over NUM_TRIALS invocations of FUNCTION"""
+    result = None
+    for _t in range(num_trials):
+        start = time.perf_counter()
+        function()
+        elapsed = (time.perf_counter() - start)
+        result = elapsed if (result is None) else min(result, elapsed)
+    return result
+
+
+def benchmark(num_lines, num_trials, paragraph_mode=False, lazy=False):
+    """Return nanoseconds per line for (Main.process_input, bare loop) over NUM_LINES text lines"""
+    text = "".join(f"line {i} of the input{'' if (i % 10) else chr(10)}\n" for i in range(num_lines))
+    sink = LineSink(runtime_args=["-"], skip_input=True, manual_input=True, paragraph_mode=paragraph_mode)
+    sink.lazy = lazy
+
+    def run_main():
+        sink.input_stream = io.StringIO(text)
+        sink.process_input()
+
+    def run_bare():
+        for line in io.StringIO(text):
+            sink.process_line(line[:-1])
+
+    main_ns = 1e9 * best_time(run_main, num_trials) / num_lines
+    bare_ns = 1e9 * best_time(run_bare, num_trials) / num_lines
+    debug.trace_expr(TL.DETAILED, main_ns, bare_ns)
+    return (main_ns, bare_ns)
+
+#-------------------------------------------------------------------------------
+
+def main():
+    """Entry point"""
+    debug.trace(TL.USUAL, f"main(): script={system.real_path(__file__)}")
+    main_app = Main(description=__doc__.format(script=gh.basename(__file__)),
+                    boolean_options=[(PARA_ARG, "Use paragraph mode"),
+                                     (LAZY_ARG, "Use trace_lazy rather than trace with f-string")],
+                    int_options=[(LINES_ARG, "Number of lines", NUM_LINES),
+                                 (TRIALS_ARG, "Number of trials", NUM_TRIALS)],
+                    skip_input=True, manual_input=True)
+    num_lines = main_app.get_parsed_option(LINES_ARG)
+    num_trials = main_app.get_parsed_option(TRIALS_ARG)
+    main_ns, bare_ns = benchmark(num_lines, num_trials,
+                                 paragraph_mode=main_app.get_parsed_option(PARA_ARG),
+                                 lazy=main_app.get_parsed_option(LAZY_ARG))
+    print(f"trace level: {debug.get_level()}; lines: {num_lines}")
+    print(f"process_input: {main_ns:.0f} ns/line; bare loop: {bare_ns:.0f} ns/line; "
+          f"overhead: {main_ns - bare_ns:.0f} ns/line")
+
+#-------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+    debug.trace_current_context(level=TL.QUITE_VERBOSE)
+    main()
@@ -3,10 +3,25 @@
 # Filters lines in input file, based on random numbers
 # TODO: use iterator for input (see ???)
 #
+# Notes:
+# - By default, each line is included independently with probability --ratio
+#   (i.e., the number of lines is only approximate).
+# - With --count, exactly that many lines are output via reservoir sampling,
+#   using Algorithm L to skip ahead between replacements (see ReservoirSampler).
+# - With --stratify-column, the sample keeps the proportions of the values in the
+#   column. This makes two passes (i.e., stdin is saved to a temp file).
+# - With --seek, lines are drawn at random byte offsets for a regular file (e.g., for
+#   a quick 1% sample of a huge log file), so the entire file is not read.
+# - The output is in input order, as with the default mode.
+#
 
 """Filter lines randomly"""
 
 # Standard packages
+from collections import Counter
+import math
+import mmap
+import os
 import random
 import sys
 
@@ -22,17 +37,198 @@ INCLUDE_HEADER = "include-header"
 RATIO = "ratio"
 SEED = "seed"
 QUIET_MODE = "quiet"
+COUNT = "count"
+STRATIFY_COLUMN = "stratify-column"
+DELIM = "delim"
+SEEK_MODE = "seek"
+TAB = "\t"
 ## TODO: ALT_TODO_ARG = "alt-todo-arg"
 DEFAULT_RATIO = system.getenv_number("DEFAULT_RATIO", 0.10,
                                      "Ratio of input to use (i.e., percent/100)")
 RANDOM_SEED = system.getenv_integer("RANDOM_SEED", 15485863,
                                     "Integral seed for randoom number generation")
+SEEK_PREFIX_LINES = system.getenv_int(
+    "SEEK_PREFIX_LINES", 1000,
+    description="Number of lines at start of file for estimating line lengths with --seek")
+SEEK_MAX_TRIES = 100                    # random offsets per line before giving up with --seek
+SEEK_LENGTH_PERCENTILE = 0.05           # percentile of prefix line lengths for --seek acceptance
+
+#...............................................................................
+
+def random_open():
+    """Random number in open interval (0, 1) (e.g., for taking log)"""
+    value = 0.0
+    while not value:
+        value = random.random()
+    return value
+
+
+class ReservoirSampler(object):
+    """Exact-size random sample of items via reservoir sampling
+    Note: This uses Algorithm L, which draws the gap until the next replacement,
+    so that there are no per-item random numbers (see Li 1994, "Reservoir-Sampling
+    Algorithms of Time Complexity O(n(1+log(N/n)))")."""
+
+    def __init__(self, size):
+        """Initializer: SIZE is number of items in the sample"""
+        self.size = size
+        self.reservoir = []             # (index, item) tuples
+        self.num_items = 0
+        self.next_index = None
+        self.weight = None
+
+    def skip_ahead(self):
+        """Advance index of next item to be included"""
+        gap = 0
+        if (self.weight < 1):
+            gap = int(math.log(random_open()) / math.log1p(-self.weight))
+        self.next_index += (gap + 1)
+
+    def add_items(self, items):
+        """Add batch of ITEMS (e.g., lines) to those sampled"""
+        start = self.num_items
+        self.num_items += len(items)
+        if not self.size:
+            return
+        if (self.next_index is None):
+            num_fill = min(self.size - len(self.reservoir), len(items))
+            self.reservoir += [((start + i), items[i]) for i in range(num_fill)]
+            if (len(self.reservoir) < self.size):
+                return
+            self.weight = math.exp(math.log(random_open()) / self.size)
+            self.next_index = (self.size - 1)
+            self.skip_ahead()
+        while (self.next_index < self.num_items):
+            self.reservoir[int(random.random() * self.size)] = (self.next_index, items[self.next_index - start])
+            self.weight *= math.exp(math.log(random_open()) / self.size)
+            self.skip_ahead()
+
+    def sample(self):
+        """Return the sampled items in input order"""
+        return [item for (_index, item) in sorted(self.reservoir)]
+
+
+def allocate_sample(counts, total):
+    """Allocate TOTAL sample size across the keys of COUNTS proportionally, via largest remainders"""
+    # EX: allocate_sample({"a": 6, "b": 3, "c": 1}, 5) => {"a": 3, "b": 2, "c": 0}
+    num_items = sum(counts.values())
+    total = min(total, num_items)
+    quotas = {key: (total * count / num_items) for (key, count) in counts.items()}
+    allocation = {key: int(quota) for (key, quota) in quotas.items()}
+    remainder = (total - sum(allocation.values()))
+    for key in sorted(quotas, key=lambda k: (quotas[k] - allocation[k]), reverse=True)[:remainder]:
+        allocation[key] += 1
+    return allocation
+
+
+def stratified_sample(get_lines, get_key, count=None, ratio=None):
+    """Generator for sample of lines from GET_LINES() in order, keeping proportions by GET_KEY
+    Notes:
+    - The sample size is COUNT or RATIO of the number of lines.
+    - GET_LINES is invoked twice: first for counts and then for selection (via Knuth's Algorithm S per stratum).
+    """
+    counts = Counter(map(get_key, get_lines()))
+    total = (count if (count is not None) else round(ratio * sum(counts.values())))
+    needed = allocate_sample(counts, total)
+    debug.trace(4, f"stratified_sample(): counts={dict(counts)}; allocation={needed}")
+    remaining = dict(counts)
+    rand = random.random
+    for line in get_lines():
+        key = get_key(line)
+        if (needed[key] and ((rand() * remaining[key]) < needed[key])):
+            needed[key] -= 1
+            yield line
+        remaining[key] -= 1
+
+
+def seek_sample(filename, count=None, ratio=None, skip_header=False, num_prefix_lines=None):
+    """Return sample of lines from FILENAME in file order via random byte offsets (i.e., without reading entire file)
+    Notes:
+    - The sample size is COUNT or RATIO of the number of lines. The latter is estimated from
+      NUM_PREFIX_LINES random offsets: the line containing an offset is drawn proportionally to
+      its length, so the file size times the mean inverse length is an unbiased estimate.
+    - The line containing an offset is accepted with probability inversely proportional to
+      its length, so that long lines are not favored. This is relative to a low percentile of the
+      lengths of the first NUM_PREFIX_LINES lines (after header if SKIP_HEADER), so that a few short
+      lines (e.g., blank) don't make acceptance rare; lines shorter than that are somewhat underrepresented.
+    - If the prefix covers the file, the lines are sampled directly.
+    - A warning is issued if fewer lines are found than requested (e.g., after SEEK_MAX_TRIES per line).
+    """
+    debug.trace(5, f"seek_sample({filename!r}, {count}, {ratio}, {skip_header}, {num_prefix_lines})")
+    if num_prefix_lines is None:
+        num_prefix_lines = SEEK_PREFIX_LINES
+    size = os.path.getsize(filename)
+    if not size:
+        return []
+    with open(filename, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+
+        def get_line_end(pos):
+            """Offset of newline ending line at POS (or file size if none)"""
+            end = data.find(b"\n", pos)
+            return (end if (end != -1) else size)
+
+        def get_line(start, end):
+            """Text of line from START to END"""
+            return data[start: end].decode("UTF-8", errors="ignore")
+
+        # Get lengths of the lines at start of file
+        start = ((get_line_end(0) + 1) if skip_header else 0)
+        pos = start
+        prefix_lines = []
+        while ((pos < size) and (len(prefix_lines) < max(1, num_prefix_lines))):
+            end = get_line_end(pos)
+            prefix_lines.append((pos, end))
+            pos = (end + 1)
+        if not prefix_lines:
+            return []
+        rand = random.random
+
+        def get_random_line():
+            """Return (start, end) for line containing random offset"""
+            offset = (start + int(rand() * (size - start)))
+            line_start = max(start, (data.rfind(b"\n", start, offset) + 1))
+            return (line_start, get_line_end(offset))
+
+        estimated_lines = len(prefix_lines)
+        if (pos < size):
+            inverse_lengths = [1 / (end + 1 - pos) for (pos, end) in (get_random_line() for _i in range(len(prefix_lines)))]
+            estimated_lines = round((size - start) * sum(inverse_lengths) / len(inverse_lengths))
+        num_lines = min(estimated_lines, (count if (count is not None) else round(ratio * estimated_lines)))
+        debug.trace(4, f"seek_sample(): estimated_lines={estimated_lines} num_lines={num_lines}")
+        if (pos >= size):
+            return [get_line(*line) for line in sorted(random.sample(prefix_lines, num_lines))]
+
+        # Draw random offsets until enough distinct lines accepted
+        ## OLD: min_length = min((end + 1 - pos) for (pos, end) in prefix_lines)
+        prefix_lengths = sorted((end + 1 - pos) for (pos, end) in prefix_lines)
+        min_length = max(1, prefix_lengths[int(SEEK_LENGTH_PERCENTILE * len(prefix_lengths))])
+        selected = {}
+        for _try in range(SEEK_MAX_TRIES * num_lines):
+            if (len(selected) >= num_lines):
+                break
+            (line_start, line_end) = get_random_line()
+            if (((rand() * (line_end + 1 - line_start)) < min_length) and (line_start not in selected)):
+                selected[line_start] = line_end
+        ## OLD: debug.assertion(len(selected) == num_lines)
+        if (len(selected) < num_lines):
+            system.print_stderr(f"Warning: only {len(selected)} of {num_lines} lines sampled via offsets in {filename}")
+        return [get_line(line_start, selected[line_start]) for line_start in sorted(selected)]
+
+#...............................................................................
 
 class Filter(Main):
     """Input processing class"""
     include_header = False
     ratio = 0.10
     quiet_mode = False
+    count = None
+    stratify_column = None
+    delimiter = TAB
+    seek_mode = False
+    reservoir = None
+    trace_lines = False
+    # note: serial only, as the reservoir and seeded random numbers are per process (see Main.process_input_parallel)
+    parallel_safe = False
     ## alt_todo_arg = ""
 
     def setup(self):
@@ -43,12 +239,29 @@ class Filter(Main):
         if seed:
             random.seed(seed)
         self.quiet_mode = self.get_parsed_option(QUIET_MODE, self.quiet_mode)
+        self.count = self.get_parsed_option(COUNT, self.count)
+        if ((self.count is not None) and (self.count < 0)):
+            system.exit("Error: --count must be non-negative")
+        self.stratify_column = self.get_parsed_option(STRATIFY_COLUMN, self.stratify_column)
+        self.delimiter = self.get_parsed_option(DELIM, self.delimiter)
+        self.seek_mode = self.get_parsed_option(SEEK_MODE, self.seek_mode)
+        debug.assertion(not (self.stratify_column and self.seek_mode))
         ## TODO: self.alt_todo_arg = self.get_parsed_option(alt_todo_arg, self.alt_todo_arg)
+        # note: the stratified and seek modes read the file directly (see run_main_step)
+        if (self.stratify_column or self.seek_mode):
+            self.manual_input = True
+        elif (self.count is not None):
+            self.reservoir = ReservoirSampler(self.count)
+        self.trace_lines = debug.debugging(5)
         debug.trace_object(6, self, "filter instance")
-        debug.trace(4, "ratio={self.ratio}, seed={seed}")
+        debug.trace(4, f"ratio={self.ratio}, seed={seed}")
         self.status("Settings:")
         self.status(f"Print header: {self.include_header}")
-        self.status(f"Ratio: {self.ratio}")
+        self.status(f"Ratio: {self.ratio}" if (self.count is None) else f"Count: {self.count}")
+        if self.stratify_column:
+            self.status(f"Stratify column: {self.stratify_column}")
+        if self.seek_mode:
+            self.status("Seek mode: True")
         self.status(f"Random seed: {seed}")
         debug.trace_object(5, self, label="Filter instance")
         return
@@ -61,14 +274,97 @@ class Filter(Main):
                   
     def process_line(self, line):
         """Processes current line from input (randomly printing)"""
-        debug.trace(5, f"Filter.process_line({line})")
+        ## OLD: debug.trace(5, f"Filter.process_line({line})")
+        if self.trace_lines:
+            debug.trace(5, f"Filter.process_line({line})")
+        if self.reservoir:
+            if ((self.line_num == 1) and self.include_header):
+                print(line)
+            else:
+                self.reservoir.add_items([line])
+            return
         include = ((random.random() <= self.ratio)
                    or ((self.line_num == 1) and (self.include_header)))
-        debug.trace_expr(6, include)
+        if self.trace_lines:
+            debug.trace_expr(6, include)
         if include:
             print(line)
         return
 
+    def process_lines(self, lines):
+        """Processes batch of LINES from input (randomly printing)
+        Note: the random numbers are drawn as with process_line (i.e., one per line)"""
+        first_line_num = (self.line_num - len(lines) + 1)
+        output = []
+        if ((first_line_num == 1) and self.include_header and lines):
+            if not self.reservoir:
+                random.random()
+            output.append(lines[0])
+            lines = lines[1:]
+        if self.reservoir:
+            self.reservoir.add_items(lines)
+        else:
+            rand = random.random
+            ratio = self.ratio
+            output += [line for line in lines if (rand() <= ratio)]
+        if output:
+            sys.stdout.write("\n".join(output) + "\n")
+        return
+
+    def run_main_step(self):
+        """Output stratified sample or sample via random offsets (i.e., --stratify-column or --seek)"""
+        debug.trace(5, "Filter.run_main_step()")
+        filename = self.filename
+        if (self.seek_mode and ((filename == "-") or not os.path.isfile(filename))):
+            system.print_error("Error: --seek requires regular file")
+            return
+        if (filename == "-"):
+            # note: stdin saved to file for the two passes
+            filename = self.temp_file
+            with system.open_file(filename, mode="w") as f:
+                for text in iter(lambda: self.input_stream.read(2 ** 20), ""):
+                    f.write(text)
+        if self.include_header:
+            with system.open_file(filename) as f:
+                header = f.readline()
+            if header:
+                print(header.rstrip("\n"))
+
+        # Output lines via random offsets
+        if self.seek_mode:
+            lines = seek_sample(filename, count=self.count, ratio=self.ratio, skip_header=self.include_header)
+            if lines:
+                sys.stdout.write("\n".join(lines) + "\n")
+            return
+
+        # Output sample stratified by column
+        column = (self.stratify_column - 1)
+
+        def get_lines():
+            """Generator for lines of file (less header if applicable)"""
+            with system.open_file(filename) as f:
+                if self.include_header:
+                    f.readline()
+                for lines in iter(lambda: f.readlines(2 ** 16), []):
+                    yield from (line.rstrip("\n") for line in lines)
+
+        def get_key(line):
+            """Value of stratification column in LINE (or empty string if missing)"""
+            fields = line.split(self.delimiter)
+            return (fields[column] if (column < len(fields)) else "")
+
+        for line in stratified_sample(get_lines, get_key, count=self.count, ratio=self.ratio):
+            print(line)
+        return
+
+    def wrap_up(self):
+        """Output the reservoir sample if applicable (i.e., --count)"""
+        if self.reservoir:
+            lines = self.reservoir.sample()
+            if lines:
+                sys.stdout.write("\n".join(lines) + "\n")
+        return
+
 if __name__ == '__main__':
     ## debug.trace_fmt(3, "Environment options: {eo}",
     ##                 eo=system.formatted_environment_option_descriptions())
@@ -76,7 +372,11 @@ if __name__ == '__main__':
                  # TODO: use Main.read_input directly w/ manual_input=True
                  # TODO: mention USE_PARAGRAPH_MODE env. option
                  boolean_options=[(INCLUDE_HEADER, "Include header line"),
-                                  (QUIET_MODE, "Don't print status messages")],
+                                  (QUIET_MODE, "Don't print status messages"),
+                                  (SEEK_MODE, "Sample lines at random byte offsets of file (e.g., for huge files)")],
+                 int_options=[(COUNT, "Exact number of lines to output (instead of ratio)"),
+                              (STRATIFY_COLUMN, "Column (1-based) whose value proportions are kept in sample")],
+                 text_options=[(DELIM, "Column delimiter for --stratify-column", TAB)],
                  ## TODO: text_options=[(alt_todo_arg, "TODO-desc")],
                  float_options=[(RATIO, "Random threshold in range [0, 1] for lines to be incorporated", DEFAULT_RATIO), 
                                 (SEED, "Random seed", RANDOM_SEED)])
@@ -5,6 +5,10 @@
 # usage example:
 #    python -u -m cProfile -o fubar.profile fubar.py
 #    format-profile.py fubar.profile > fubar.profile.list
+#
+# alternative usage via debug.py profiling (e.g., without -m cProfile):
+#    PROFILE_FILE=fubar.profile.json PROFILE_SAMPLE_MS=5 fubar.py
+#    format-profile.py fubar.profile.json > fubar.profile.list
 #------------------------------------------------------------------------
 # Notes:
 # via http://docs.python.org/3/library/profile.html:
@@ -44,13 +48,14 @@
 # Library packages
 
 # Standard packages
+import json
 import sys
 import pstats
 
 # Local packages
 from mezcla import debug
 ## OLD: from tpo_common import *
-from mezcla.system import getenv_bool, getenv_text, print_stderr
+from mezcla.system import getenv_bool, getenv_int, getenv_text, print_stderr
 
 ## OLD: PROFILE_KEY = getenv_text("PROFILE_KEY", "cumulative")
 PROFILE_KEY = getenv_text(
@@ -59,10 +64,44 @@ PROFILE_KEY = getenv_text(
 FULL_PATH = getenv_bool(
     "FULL_PATH", False,
     desc="Show full path in filename field")
+MAX_STACKS = getenv_int(
+    "MAX_STACKS", 25,
+    desc="Maximum number of sampled call stacks to show (for JSON profiles)")
 
 #------------------------------------------------------------------------
 # Functions
 
+class JsonProfile:
+    """Profile data from JSON file produced via debug.FunctionProfiler (usable with pstats.Stats)"""
+
+    def __init__(self, filename):
+        with open(filename, encoding="UTF-8") as f:
+            data = json.load(f)
+        self.samples = data.get("samples", {})
+        self.stats = {}
+        for info in data["functions"]:
+            callers = {(c["file"], c["line"], c["name"]): (c["pcalls"], c["ncalls"], c["tottime"], c["cumtime"])
+                       for c in info["callers"]}
+            self.stats[(info["file"], info["line"], info["name"])] = (
+                info["pcalls"], info["ncalls"], info["tottime"], info["cumtime"], callers)
+        debug.trace_fmt(5, "JsonProfile({f}): {n} functions; {s} stacks",
+                        f=filename, n=len(self.stats), s=len(self.samples))
+
+    def create_stats(self):
+        """No-op for pstats.Stats (i.e., stats already loaded)"""
+        return
+
+
+def print_samples(samples, max_stacks=MAX_STACKS):
+    """Print the MAX_STACKS most frequently sampled call stacks in SAMPLES"""
+    total = sum(samples.values())
+    print(f"Sampled call stacks: {total} samples")
+    print("")
+    for stack, count in sorted(samples.items(), key=lambda item: -item[1])[:max_stacks]:
+        print(f"{count:8d} {100.0 * count / total:6.2f}% {stack}")
+    return
+
+
 def usage():
     """Displays usage notes for script"""
     print_stderr("""
@@ -99,10 +138,14 @@ def main():
     file = sys.argv[1]
 
     # Generate listing and sort by cumulative time
-    p = pstats.Stats(file)
+    # note: JSON profiles are from debug.py (see FunctionProfiler)
+    json_profile = (JsonProfile(file) if file.endswith(".json") else None)
+    p = pstats.Stats(json_profile or file)
     if not FULL_PATH:
         p = p.strip_dirs()
     p.sort_stats(PROFILE_KEY).print_stats()
+    if json_profile and json_profile.samples:
+        print_samples(json_profile.samples)
     return
 
 #------------------------------------------------------------------------
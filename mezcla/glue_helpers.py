@@ -28,13 +28,12 @@ Usage example:
 """
 
 # Standard packages
+# note: subprocess is imported when used (i.e., to reduce startup time)
 from collections import defaultdict
 import glob
-import inspect
 import os
 import re
 import shutil
-from subprocess import getoutput
 import sys
 import tempfile
 
@@ -106,6 +105,9 @@ DISABLE_RECURSIVE_DELETE = system.getenv_value(
 PRESERVE_TEMP_FILE = system.getenv_value(
     "PRESERVE_TEMP_FILE", None,
     desc="Retain value of TEMP_FILE even if TEMP_BASE set--see INFER_TEMP_FILE")
+RUN_MANY_WORKERS = system.getenv_int(
+    "RUN_MANY_WORKERS", 0,
+    description="Maximum number of commands run concurrently by run_many (0 for executor default)")
 
 # Globals
 # note:
@@ -113,7 +115,7 @@ PRESERVE_TEMP_FILE = system.getenv_value(
 # - these are placeholds until module initialized
 # - os.path.join used to likewise avoid chick-n-egg problems with init
 # - TEMP_FILE is normally None to indicate use of random temp file name
-# - TEMP_LOG_FILE and TEMP_SCRIPT_FILE are used in run, issue, etc.
+# - TEMP_LOG_FILE and TEMP_SCRIPT_FILE were used in run, issue, etc. (now via pipes)
 TMP = system.getenv_text(
     "TMP", "/tmp",
     description="Temporary directory")
@@ -237,7 +239,7 @@ def resolve_path(filename, base_dir=None, heuristic=False):
         if not base_dir:
             frame = None
             try:
-                frame = inspect.currentframe().f_back
+                frame = sys._getframe(1)    # pylint: disable=protected-access
                 calling_filename = frame.f_globals['__file__']
                 base_dir = os.path.dirname(calling_filename)
                 debug.trace_expr(4, calling_filename, base_dir)
@@ -408,6 +410,97 @@ def disable_subcommand_tracing():
     default_subtrace_level = 0
 
 
+def get_subprocess_env(subtrace_level=None, env=None):
+    """Return environment dict for commands run via run_command: DEBUG_LEVEL is set to SUBTRACE_LEVEL (or default_subtrace_level), and TEMP_BASE/TEMP_FILE are made unique for the subprocess (see run).
+    Notes:
+    - ENV has per-command overrides, with None values removing the variable; os.environ is not modified.
+    - None is returned if os.environ can be used as is (n.b., passing an environment adds overhead).
+    """
+    if subtrace_level is None:
+        subtrace_level = default_subtrace_level
+    overrides = {"DEBUG_LEVEL": str(subtrace_level)}
+    if TEMP_BASE:
+        overrides["TEMP_BASE"] = TEMP_BASE + "_subprocess_"
+    if TEMP_FILE and (PRESERVE_TEMP_FILE is not True):
+        overrides["TEMP_FILE"] = TEMP_FILE + "_subprocess_"
+    overrides.update({var: (str(value) if (value is not None) else None)
+                      for (var, value) in (env or {}).items()})
+    result = None
+    for (var, value) in overrides.items():
+        if os.environ.get(var) != value:
+            if result is None:
+                result = dict(os.environ)
+            if value is None:
+                result.pop(var, None)
+            else:
+                result[var] = value
+    return result
+
+
+def run_command(command, env=None, subtrace_level=None, shell=None, timeout=None, input_text=None,
+                capture_stdout=True, capture_stderr=True, merge_stderr=False, cwd=None, trace_level=5):
+    """Run COMMAND with output captured via pipes, returning subprocess.CompletedProcess (with text stdout and stderr)
+    Notes:
+    - COMMAND is either a string or an argv list: by default, strings are run via the shell and lists are run directly (see SHELL).
+    - ENV has per-command environment overrides, and SUBTRACE_LEVEL the DEBUG_LEVEL (see get_subprocess_env).
+    - If MERGE_STDERR, stderr is included in stdout (as with run); uncaptured output goes to the current stdout/stderr.
+    - TIMEOUT is in seconds: the command is killed and subprocess.TimeoutExpired raised if exceeded.
+    - Unlike run, this is thread safe (e.g., see run_many).
+    """
+    # EX: run_command(["echo", "hey"]).stdout => "hey\n"
+    # EX: run_command("echo $FUBAR", env={"FUBAR": 1}).stdout => "1\n"
+    import subprocess                   # pylint: disable=import-outside-toplevel
+    if shell is None:
+        shell = isinstance(command, str)
+    if (isinstance(command, str) and not shell):
+        import shlex                    # pylint: disable=import-outside-toplevel
+        command = shlex.split(command)
+    stdout = (subprocess.PIPE if capture_stdout else None)
+    stderr = None
+    if merge_stderr:
+        stderr = subprocess.STDOUT
+    elif capture_stderr:
+        stderr = subprocess.PIPE
+    debug.trace(trace_level, f"run_command({command!r}, shell={shell}, timeout={timeout})")
+    result = subprocess.run(command, shell=shell, env=get_subprocess_env(subtrace_level, env),
+                            cwd=cwd, input=input_text, stdout=stdout, stderr=stderr,
+                            timeout=timeout, text=True, check=False)
+    debug.trace_lazy(trace_level + 1, "run_command() => rc={rc}; stdout={o!r}; stderr={e!r}",
+                     rc=result.returncode, o=elide(result.stdout), e=elide(result.stderr))
+    return result
+
+
+def run_many(commands, max_workers=None, **kwargs):
+    """Run COMMANDS concurrently via run_command with KWARGS, returning list of results in same order
+    Note: At most MAX_WORKERS commands are run at a time (see RUN_MANY_WORKERS); exceptions like timeouts are propagated.
+    """
+    # EX: [r.stdout for r in run_many(["echo 1", "echo 2"])] => ["1\n", "2\n"]
+    # note: threads suffice as the work is done in the subprocesses
+    from concurrent.futures import ThreadPoolExecutor  # pylint: disable=import-outside-toplevel
+    if not max_workers:
+        max_workers = (RUN_MANY_WORKERS or None)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        result = list(executor.map(lambda command: run_command(command, **kwargs), commands))
+    debug.trace(6, f"run_many({len(result)} commands) => {[r.returncode for r in result]}")
+    return result
+
+
+def get_run_env(trace_level, subtrace_level):
+    """Return (subtrace_level, env) for run_command given run's TRACE_LEVEL and SUBTRACE_LEVEL"""
+    # note: DEBUG_LEVEL left as is unless SUBTRACE_LEVEL differs from TRACE_LEVEL
+    if subtrace_level is None:
+        subtrace_level = default_subtrace_level
+    env = {}
+    if subtrace_level == trace_level:
+        env["DEBUG_LEVEL"] = os.getenv("DEBUG_LEVEL")
+    return (subtrace_level, env)
+
+
+def wait_status(returncode):
+    """Convert subprocess RETURNCODE into status as returned by os.system (under Unix)"""
+    return ((returncode << 8) if (returncode >= 0) else -returncode)
+
+
 def run(command, trace_level=4, subtrace_level=None, just_issue=None, output=False, **namespace):
     """Invokes COMMAND via system shell, using TRACE_LEVEL for debugging output, returning result. The command can use format-style templates, resolved from caller's namespace. The optional SUBTRACE_LEVEL sets tracing for invoked commands (default is same as TRACE_LEVEL); this works around problem with stderr not being separated, which can be a problem when tracing unit tests.
    Notes:
@@ -417,6 +510,7 @@ def run(command, trace_level=4, subtrace_level=None, just_issue=None, output=Fal
    - This function doesn't work fully under Win32. Tabs are not preserved, so redirect stdout to a file if needed.
    - If TEMP_FILE or TEMP_BASE defined, these are modified to be unique to avoid conflicts across processeses.
     - If OUTPUT, the result will be printed.
+   - The environment changes are made just for the command (see run_command).
    """
     # TODO: add automatic log file support as in run_script from unittest_wrapper.py
     # TODO: make sure no template markers left in command text (e.g., "tar cvfz {tar_file}")
@@ -424,22 +518,10 @@ def run(command, trace_level=4, subtrace_level=None, just_issue=None, output=Fal
     # Note: Script tracing controlled DEBUG_LEVEL environment variable.
     debug.assertion(isinstance(trace_level, int))
     debug.trace(trace_level + 2, f"run({command}, tl={trace_level}, sub_tr={subtrace_level}, iss={just_issue}, out={output}")
-    global default_subtrace_level
-    # Keep track of current debug level setting
-    debug_level_env = os.getenv("DEBUG_LEVEL")
-    if subtrace_level is None:
-        subtrace_level = default_subtrace_level
-    if subtrace_level != trace_level:
-        system.setenv("DEBUG_LEVEL", str(subtrace_level))
+    (subtrace_level, env) = get_run_env(trace_level, subtrace_level)
     in_just_issue = just_issue
     if just_issue is None:
         just_issue = False
-    save_temp_base = TEMP_BASE
-    if TEMP_BASE:
-         system.setenv("TEMP_BASE", TEMP_BASE + "_subprocess_")
-    save_temp_file = TEMP_FILE
-    if TEMP_FILE and (PRESERVE_TEMP_FILE is not True):
-        system.setenv("TEMP_FILE", TEMP_FILE + "_subprocess_")
     # Expand the command template
     # TODO: make this optional
     command_line = command
@@ -465,14 +547,19 @@ def run(command, trace_level=4, subtrace_level=None, just_issue=None, output=Fal
     wait_for_command = (foreground_wait and not just_issue)
     debug.trace_expr(5, foreground_wait, just_issue, wait_for_command)
     ## TODO3: clarify what output is when stdout redirected (e.g., for issue in support of unittest_wrapper.run_script
-    result = getoutput(command_line) if wait_for_command else str(os.system(command_line))
+    ## OLD: result = getoutput(command_line) if wait_for_command else str(os.system(command_line))
+    if wait_for_command:
+        # note: same as subprocess.getoutput (i.e., stderr included and final newline removed)
+        result = run_command(command_line, env=env, subtrace_level=subtrace_level,
+                             merge_stderr=True, trace_level=(trace_level + 2)).stdout
+        if result.endswith("\n"):
+            result = result[:-1]
+    else:
+        completed = run_command(command_line, env=env, subtrace_level=subtrace_level,
+                                capture_stdout=False, capture_stderr=False, trace_level=(trace_level + 2))
+        result = str(wait_status(completed.returncode))
     if output:
         print(result)
-    # Restore debug level setting in environment
-    system.setenv("DEBUG_LEVEL", debug_level_env or "")
-    system.setenv("TEMP_BASE", save_temp_base or "")
-    if save_temp_file and (PRESERVE_TEMP_FILE is not True):
-        system.setenv("TEMP_FILE", save_temp_file or "")
     debug_print("run(_) => {\n%s\n}" % indent_lines(result), (trace_level + 1))
     return result
 
@@ -487,50 +574,54 @@ def run_via_bash(command, trace_level=4, subtrace_level=None, init_file=None,
     - TRACE_LEVEL and SUBTRACE_LEVEL control tracing for COMMAND and any subcommands, respectively
     - Used in bash to python translation; see
          https://github.com/tomasohara/shell-scripts/blob/main/bash2python.py
+    - The commands are passed via bash -c (i.e., no temporary script), so NAMESPACE is not used for formatting (as before).
     """
     debug_print("issuing: %s" % command, trace_level)
+    debug.trace(7, f"run_via_bash: ignoring namespace keys {list(namespace)}")
     commands_to_run = ""
     if enable_aliases:
         commands_to_run += "shopt -s expand_aliases\n"
     if init_file:
         commands_to_run += system.read_file(init_file) + "\n"
     commands_to_run += command
-    system.write_file(TEMP_SCRIPT_FILE, commands_to_run)
-    
-    command_line = f"bash -f {TEMP_SCRIPT_FILE}"
-    return run(command_line, trace_level=(trace_level + 1), subtrace_level=subtrace_level, just_issue=False, **namespace)
+    ## OLD: system.write_file(TEMP_SCRIPT_FILE, commands_to_run)
+    (subtrace_level, env) = get_run_env(trace_level + 1, subtrace_level)
+    result = run_command(["bash", "-f", "-c", commands_to_run], env=env, subtrace_level=subtrace_level,
+                         merge_stderr=True, trace_level=(trace_level + 2)).stdout
+    if result.endswith("\n"):
+        result = result[:-1]
+    debug_print("run_via_bash(_) => {\n%s\n}" % indent_lines(result), (trace_level + 2))
+    return result
 
 
 def issue(command, trace_level=4, subtrace_level=None, **namespace):
     """Wrapper around run() for when output is not being saved (i.e., just issues command). 
     Note:
     - Nothing is returned.
-    - Traces stdout when debugging at quite-detailed level (6).
-    - Captures stderr unless redirected and traces at error level (1)."""
+    - Traces the status when debugging at quite-detailed level (6).
+    - Captures stderr via pipe unless redirected (or run in background) and traces at error level (1)."""
     # EX: issue("ls /") => None
     # EX: issue("xeyes &")
     debug_print("issue(%s, [trace_level=%s], [subtrace_level=%s], [ns=%s])"
                 % (command, trace_level, subtrace_level, namespace), (trace_level + 1))
-    # Add stderr redirect to temporary log file, unless redirection already present
-    log_file = None
-    if tpo.debugging() and (not "2>" in command) and (not "2|&1" in command):
-        ## TODO: use a different suffix each time to aid in debugging
-        log_file = TEMP_LOG_FILE
-        delete_existing_file(log_file)
-        command += " 2> " + log_file
-    # Run the command and trace output
     command_line = command
     if re.search("{.*}", command_line):
         command_line = tpo.format(command_line, indirect_caller=True, ignore_exception=False, **namespace)
-    output = run(command_line, trace_level, subtrace_level, just_issue=True)
-    tpo.debug_print("stdout from command: {\n%s\n}\n" % indent(output), (2 + trace_level))
-    # Trace out any standard error output and remove temporary log file (unless debugging)
-    if log_file:
-        if tpo.debugging() and non_empty_file(log_file):
-            stderr_output = indent(read_file(log_file))
-            tpo.debug_print("stderr output from command: {\n%s\n}\n" % indent(stderr_output))
-        if not tpo.detailed_debugging():
-            delete_file(log_file)
+    debug_print("issuing: %s" % command_line, trace_level)
+    # Capture stderr, unless redirection already present
+    # note: not done for background commands, which would otherwise block on the pipe
+    ## OLD: log_file = TEMP_LOG_FILE ... command += " 2> " + log_file
+    in_background = command_line.strip().endswith("&")
+    capture_stderr = (tpo.debugging() and (not "2>" in command) and (not "2|&1" in command)
+                      and (not in_background))
+    (subtrace_level, env) = get_run_env(trace_level, subtrace_level)
+    # Run the command and trace output
+    completed = run_command(command_line, env=env, subtrace_level=subtrace_level, capture_stdout=False,
+                            capture_stderr=capture_stderr, trace_level=(trace_level + 2))
+    tpo.debug_print("status from command: %s" % wait_status(completed.returncode), (2 + trace_level))
+    if capture_stderr and completed.stderr:
+        stderr_output = indent(completed.stderr)
+        tpo.debug_print("stderr output from command: {\n%s\n}\n" % indent(stderr_output))
     return
 
 
@@ -888,7 +979,7 @@ if __debug__:
             line_num = -1
             frame = None
             try:
-                frame = inspect.currentframe().f_back
+                frame = sys._getframe(1)    # pylint: disable=protected-access
                 tpo.debug_trace("frame=%s", frame, level=8)
                 tpo.trace_object(frame, 9, "frame")
                 filename = frame.f_globals.get("__file__")
@@ -42,6 +42,8 @@
 # - During page-tracking mode, the page numbers are set based on occurrence of
 #   form feed characters: \f (n.b., same as ^L and 0x0c).
 # - A form feed is treated as an implicit paragraph break: see read_input.
+# - With multiple_files, the input is the concatenation of the files (see
+#   MultiFileInput), and .gz/.bz2/.xz files are decompressed transparently.
 # - The input processing can be used in non-Main scripts by creating a
 #   dummy instance and then calling read_input (see randomize_lines.py):
 #      dummy = Main([]);   dummy.input_stream = str
@@ -63,7 +65,6 @@
 #      options=[{"name": "fubar", "type": bool}, 
 #               {"name": "count", type: int, default: 10}]
 # - Add support for perl-style paragraph mode in input processing.
-# - Add support for multple input files (e.g., via fileinput module).
 # - Add support for csv.csv_reader (see usage in cut.py).
 # - Add support for argument aliases (e.g., --input-delim for --delim).
 # - Have option for processing text by page by page, instead of
@@ -78,8 +79,12 @@
 
 # Standard packages
 import argparse
+import glob
 import io
+from itertools import chain, islice
 import os
+import random
+import shutil
 import re
 import sys
 import tempfile
@@ -155,12 +160,27 @@ INPUT_ERROR = system.getenv_value(
 DISABLE_RECURSIVE_DELETE = system.getenv_value(
     "DISABLE_RECURSIVE_DELETE", None,
     description="Disable use of potentially dangerous rm -r style recursive deletions")
+READ_LINES_HINT = system.getenv_int(
+    "READ_LINES_HINT", 65536,
+    description="Size in characters for reading input lines in batches (0 for line at a time)")
+LINE_BATCH_SIZE = 1024
+DECOMPRESS_INPUT = system.getenv_bool(
+    "DECOMPRESS_INPUT", True,
+    description="Transparently decompress .gz, .bz2, and .xz input files")
+MAIN_WORKERS = system.getenv_int(
+    "MAIN_WORKERS", 1,
+    description="Default number of processes for processing input lines or paragraphs (only for scripts with Main.parallel_safe)")
+WORKER_BATCH_SIZE = system.getenv_int(
+    "WORKER_BATCH_SIZE", 256,
+    description="Number of input lines or paragraphs sent to worker processes at a time")
 
 #-------------------------------------------------------------------------------
 
 class Main(object):
     """Class encompassing common script processing"""
     argument_parser = None
+    # note: whether process_line can be run in worker processes by default (see process_input_parallel)
+    parallel_safe = False
     force_unicode = False
     # TODO: add more class-wide member
     ## temp_base, temp_file
@@ -178,16 +198,18 @@ class Main(object):
                  boolean_options=None, text_options=None, int_options=None,
                  float_options=None, positional_options=None, positional_arguments=None,
                  skip_input=None, manual_input=None, skip_stdin=None, auto_help=None, brief_usage=None,
-                 short_options=None, **kwargs):
+                 short_options=None, workers=None, **kwargs):
         """Class constructor: parses RUNTIME_ARGS (or command line), with specifications
         for BOOLEAN_OPTIONS, TEXT_OPTIONS, INT_OPTIONS, FLOAT_OPTIONS, and POSITIONAL_OPTIONS
         (see convert_option). Includes options to SKIP_INPUT, or to have MANUAL_INPUT, or to use AUTO_HELP invocation (i.e., assuming {ha} if no args). Also allows for SHORT_OPTIONS.
         Note: SKIP_STDIN makes explicit SKIP_INPUT which gets inferred from MANUAL_INPUT when no specified. This avoids the - argument support that blocks help usage.
+        WORKERS specifies the number of processes for the input processing (see process_input_parallel),
+        defaulting to MAIN_WORKERS only for parallel_safe classes.
         """
         #
         def trace_args(level:int, label:str):
             """Trace out input arguments, each on separate line to simplify diff"""
-            debug.trace_expr(level, runtime_args, description, skip_args, multiple_files, use_temp_base_dir, usage_notes, program, paragraph_mode, track_pages, file_input_mode, newlines, boolean_options, text_options, int_options, float_options, positional_options, positional_arguments, skip_input, manual_input, skip_stdin, auto_help, brief_usage, short_options, kwargs, prefix=f"{label}: {{", delim="\n\t", suffix="}")
+            debug.trace_expr(level, runtime_args, description, skip_args, multiple_files, use_temp_base_dir, usage_notes, program, paragraph_mode, track_pages, file_input_mode, newlines, boolean_options, text_options, int_options, float_options, positional_options, positional_arguments, skip_input, manual_input, skip_stdin, auto_help, brief_usage, short_options, workers, kwargs, prefix=f"{label}: {{", delim="\n\t", suffix="}")
         #
         debug.trace(4, f"Main.__init__(): self={self}")
         trace_args(5, "input")
@@ -257,6 +279,11 @@ class Main(object):
         if track_pages is None:
             track_pages = TRACK_PAGES
         self.track_pages = track_pages
+        ## OLD: self.workers = (workers if (workers is not None) else MAIN_WORKERS)
+        if workers is None:
+            workers = (MAIN_WORKERS if self.parallel_safe else 1)
+        self.workers = workers
+        self.worker_seed = None
         self.short_options = (short_options if (short_options is not None) else SHORT_OPTIONS)
         if skip_args is None:
             # note: skip_args useful for testing scripts to avoid argument parsine
@@ -280,18 +307,23 @@ class Main(object):
                     "delete": not debug.detailed_debugging(),
                     ## TODO: "suffix": "-"
                     }
-        self.temp_base = (TEMP_BASE or tempfile.NamedTemporaryFile(**ntf_args).name)
         # TODO: self.use_temp_base_dir = gh.dir_exists(gh.basename(self.temp_base))
         # -or-: temp_base_dir = system.getenv_text("TEMP_BASE_DIR", " "); self.use_temp_base_dir = bool(temp_base_dir.strip()); ...
         if use_temp_base_dir is None:
             use_temp_base_dir = USE_TEMP_BASE_DIR
         self.use_temp_base_dir = use_temp_base_dir
+        if TEMP_BASE:
+            self.temp_base = TEMP_BASE
+        elif self.use_temp_base_dir:
+            self.temp_base = tempfile.mkdtemp(prefix=prefix)
+        else:
+            self.temp_base = tempfile.NamedTemporaryFile(**ntf_args).name
         if self.use_temp_base_dir:
-            ## TODO: gh.full_mkdir
             ## TEMP HACK: remove file if not a dir (n.b., quirk with NamedTemporaryFile
             if system.is_regular_file(self.temp_base):
                 gh.delete_file(self.temp_base)
-            gh.run("mkdir -p {dir}", dir=self.temp_base)
+            # note: created directly (i.e., without shell invocation via gh.run) to reduce startup time
+            os.makedirs(self.temp_base, exist_ok=True)
             ## TODO3: main-temp.txt???
             default_temp_file = gh.form_path(self.temp_base, "temp.txt")
         else:
@@ -699,6 +731,14 @@ class Main(object):
         print(line)
         return
 
+    def process_lines(self, lines):
+        """Process batch of input LINES (without newlines), by default via process_line.
+        Note: Specialize this for processing blocks of lines at a time (see read_line_batches),
+        which is only done in line mode (e.g., not paragraph mode or with page tracking)."""
+        for line in lines:
+            self.process_line(line)
+        return
+
     def run_main_step(self):
         """Stub for main processing, along with error message"""
         # TODO: use decorator (e.g., @abstract)
@@ -711,19 +751,26 @@ class Main(object):
         Note: self.newlines is used to override stream (e.g., so \r not treated as line delim)"""
         debug.trace(5, "Main.init_input()")
         self.input_stream = sys.stdin
-        if (self.filename and (self.filename != "-")):
+        mode = ("r" if (not self.binary_input) else "rb")
+        if (self.filename and ((self.filename != "-") or self.other_filenames)):
             if (isinstance(self.filename, list) or (len(self.other_filenames) > 0)):
                 debug.assertion(self.filename != ["-"])
                 if not self.multiple_files:
                     # note: check_arguments sets self.other_filenames
                     debug.trace(3, "Warning: Not opening multiple-valued filename arg")
                     debug.trace_expr(3, self.filename, self.other_filenames)
+                elif not (self.manual_input and self.skip_input):
+                    filenames = ((self.filename if isinstance(self.filename, list) else [self.filename])
+                                 + self.other_filenames)
+                    # note: newline and error handling applied when each file opened
+                    self.input_stream = MultiFileInput(filenames, mode=mode, errors=self.input_error,
+                                                       newline=self.newlines)
+                    return
             else:
                 debug.assertion(isinstance(self.filename, str))
                 if not (self.manual_input and self.skip_input):
                     debug.assertion(os.path.exists(self.filename))
-                    mode = ("r" if (not self.binary_input) else "rb")
-                    self.input_stream = system.open_file(self.filename, mode=mode, errors=self.input_error)
+                    self.input_stream = open_input_file(self.filename, mode=mode, errors=self.input_error)
                     debug.assertion(self.input_stream)
         # Optionally reopen stream to change built-in settings
         error_handling_change = (self.input_error and (self.input_error != self.input_stream.errors))
@@ -834,19 +881,27 @@ class Main(object):
         self.line_num = 0
         self.rel_line_num = 0
         self.char_offset = 0
+        # note: level checks done once, so that there is no per-line tracing overhead unless enabled
+        trace_lines = debug.debugging(6)
+        trace_segments = debug.debugging(7)
+        if not (self.track_pages or self.force_unicode or trace_lines):
+            yield from self._fast_read_input()
+            return
         for line in self.input_stream:
             self.rel_line_num += 1
             self.line_num += 1
             self.raw_line = line
             if line.endswith("\n"):
                 line = line[:-1]
-            debug.trace_fmt(6, "L{n}: {l}", n=self.line_num, l=line)
+            if trace_lines:
+                debug.trace_fmt(6, "L{n}: {l}", n=self.line_num, l=line)
             if self.force_unicode:
                 line = tpo.ensure_unicode(line)
             ## TEST: debug.trace(7, f"\ttype(line): {type(line)}; offset={self.input_stream.tell()}")
             if self.track_pages:
                 for i, line_segment in enumerate(line.split(FORM_FEED)):
-                    debug.trace(7, f"LS{i}: {line_segment}")
+                    if trace_segments:
+                        debug.trace(7, f"LS{i}: {line_segment}")
                     self.end_of_page = False
                     if i == 0:
                         self.end_of_page = (line != line_segment)
@@ -866,20 +921,99 @@ class Main(object):
                     ## OLD: if line_segment:
                     ## NEW:
                     if True:            # pylint: disable=using-constant-test
-                        debug.trace_fmt(6, "yielding line segment [Pg{pg}/Par{par}/L{ln}]: {ls}",
-                                        pg=self.page_num, par=self.rel_para_num, ln=self.rel_line_num, ls=line_segment)
+                        if trace_lines:
+                            debug.trace_fmt(6, "yielding line segment [Pg{pg}/Par{par}/L{ln}]: {ls}",
+                                            pg=self.page_num, par=self.rel_para_num, ln=self.rel_line_num, ls=line_segment)
                         yield line_segment
                     self.char_offset += len(line_segment)
-                    debug.trace_expr(7, self.page_num)
+                    if trace_segments:
+                        debug.trace_expr(7, self.page_num)
                 if (line != self.raw_line):
                     self.char_offset += 1
             else:
-                debug.trace_fmt(6, "yielding line [Par{par}/L{lnum}]: {l}",
-                                par=self.rel_para_num, lnum=self.rel_line_num, l=line)
+                if trace_lines:
+                    debug.trace_fmt(6, "yielding line [Par{par}/L{lnum}]: {l}",
+                                    par=self.rel_para_num, lnum=self.rel_line_num, l=line)
                 yield line
                 self.char_offset += len(self.raw_line)
         return
 
+    def _interactive_input(self):
+        """Whether input stream is a terminal (i.e., lines shouldn't be held back for batching)"""
+        try:
+            interactive = self.input_stream.isatty()
+        except (AttributeError, ValueError):
+            interactive = False
+        return interactive
+
+    def _raw_input_lines(self):
+        """Iterator over input lines (with newlines), read in batches unless READ_LINES_HINT is 0 or interactive"""
+        stream = self.input_stream
+        if (READ_LINES_HINT <= 0) or self._interactive_input():
+            return stream
+        return chain.from_iterable(iter(lambda: stream.readlines(READ_LINES_HINT), []))
+
+    def _fast_read_input(self):
+        """Version of read_input for the common case: no page tracking, Unicode forcing, or line tracing"""
+        line_num = 0
+        char_offset = 0
+        for raw_line in self._raw_input_lines():
+            line_num += 1
+            self.line_num = self.rel_line_num = line_num
+            self.raw_line = raw_line
+            yield (raw_line[:-1] if raw_line.endswith("\n") else raw_line)
+            char_offset += len(raw_line)
+            self.char_offset = char_offset
+        return
+
+    def read_line_batches(self):
+        """Generator for producing lists of lines from the input (without newlines), as with read_input.
+        Notes:
+        - In the common case (see _fast_read_input), the input is read in chunks of
+          about READ_LINES_HINT characters, which are split into lines. For interactive
+          input, each line is its own batch (i.e., no output held back).
+        - During the processing of the batch, line_num and raw_line are for the last line,
+          and char_offset is for the start of the batch.
+        """
+        tpo.debug_format("Main.read_line_batches(): {input}", 5,
+                         input=self.input_stream)
+        interactive = self._interactive_input()
+        if (self.file_input_mode or self.track_pages or self.force_unicode or debug.debugging(6)
+                or (READ_LINES_HINT <= 0) or interactive):
+            lines = self.read_input()
+            batch_size = (1 if interactive else LINE_BATCH_SIZE)
+            while True:
+                batch = list(islice(lines, batch_size))
+                if not batch:
+                    break
+                yield batch
+            return
+
+        # Split chunks of input into lines, keeping partial line at end for next chunk
+        self.page_num = self.para_num = self.rel_para_num = 1
+        self.line_num = self.rel_line_num = self.char_offset = 0
+        stream = self.input_stream
+        partial_line = ""
+        while True:
+            chunk = stream.read(READ_LINES_HINT)
+            if not chunk:
+                break
+            text = (partial_line + chunk)
+            lines = text.split("\n")
+            partial_line = lines.pop()
+            if not lines:
+                continue
+            self.line_num = self.rel_line_num = (self.line_num + len(lines))
+            self.raw_line = lines[-1] + "\n"
+            yield lines
+            self.char_offset += (len(text) - len(partial_line))
+        if partial_line:
+            self.line_num = self.rel_line_num = (self.line_num + 1)
+            self.raw_line = partial_line
+            yield [partial_line]
+            self.char_offset += len(partial_line)
+        return
+
     def is_line_mode(self):
         """Whether processing normal lines (not paragraphs or entire files)"""
         return  (not (self.paragraph_mode or self.file_input_mode))
@@ -893,16 +1027,48 @@ class Main(object):
         self.rel_line_num = 0
         if self.paragraph_mode:
             self.para_num = 0
-        paragraph = ""
+
+        # Optionally have the lines (or paragraphs) processed by multiple processes
+        # note: the workers only use process_line, so specialized process_lines requires serial processing
+        if (self.workers > 1):
+            import multiprocessing              # pylint: disable=import-outside-toplevel
+            if (type(self).process_lines is not Main.process_lines):
+                system.print_stderr("Warning: workers not supported with process_lines, so processing input serially")
+            elif "fork" in multiprocessing.get_all_start_methods():
+                self.process_input_parallel()
+                return
+            else:
+                system.print_stderr("Warning: workers not supported (i.e., no fork), so processing input serially")
+
+        # Use lines batches if process_lines specialized
+        if (self.is_line_mode() and (not self.track_pages)
+                and (type(self).process_lines is not Main.process_lines)):
+            for lines in self.read_line_batches():
+                self.process_lines(lines)
+            return
+        self._process_input_units(self.process_line)
+        return
+
+    def _process_input_units(self, process_unit):
+        """Read input and invoke PROCESS_UNIT over each line, paragraph, or entire input (see process_input)"""
+        # note: paragraph text is joined from list of lines (i.e., to avoid repeated concatenation)
+        paragraph_lines = []
         last_line = None
         line_mode = self.is_line_mode()
         debug.assertion(debug.xor3(line_mode, self.paragraph_mode, self.file_input_mode))
+        trace_paragraphs = debug.debugging(7)
+
+        # Use streamlined loop for regular line mode
+        if (line_mode and (not self.track_pages)):
+            for line in self.read_input():
+                process_unit(line)
+            return
 
         # Read next line (or line segment if in page mode and form feed in line)
         for line in self.read_input():
             # Process as is if in regular line mode
             if (line_mode or self.file_input_mode):
-                self.process_line(line)
+                process_unit(line)
                 if line_mode:
                     debug.assertion("\n" not in line)
 
@@ -915,39 +1081,122 @@ class Main(object):
             # with respect to handling more than 2 newlines between paragraphs; see
             #     https://perldoc.perl.org/variables/$/.
             else:
-                new_paragraph = None
+                new_paragraph_lines = None
                 if self.end_of_page:
-                    new_paragraph = (line + "\n")
-                    paragraph = ""
+                    new_paragraph_lines = [line]
+                    paragraph_lines = []
                 elif ((last_line == "") and line):
-                    new_paragraph = paragraph
-                    paragraph = (line + "\n")
+                    new_paragraph_lines = paragraph_lines
+                    paragraph_lines = [line]
                 else:
-                    paragraph += (line + "\n")
-                debug.trace_expr(7, new_paragraph, paragraph)
-                if new_paragraph:
+                    paragraph_lines.append(line)
+                if trace_paragraphs:
+                    debug.trace_expr(7, new_paragraph_lines, paragraph_lines)
+                if new_paragraph_lines:
                     self.rel_para_num += 1
                     self.para_num += 1
-                    debug.assertion(new_paragraph.endswith("\n\n") or (new_paragraph == "\n"))
-                    if new_paragraph.endswith("\n"):
-                        new_paragraph = new_paragraph[:-1]
-                    self.process_line(new_paragraph)
-            debug.assertion(not (self.track_pages and (not RETAIN_FORM_FEED) and (FORM_FEED in line)))
+                    # note: paragraph ends in blank line (i.e., includes trailing newline)
+                    debug.assertion(new_paragraph_lines[-1] == "")
+                    process_unit("\n".join(new_paragraph_lines))
+            if self.track_pages:
+                debug.assertion(RETAIN_FORM_FEED or (FORM_FEED not in line))
             last_line = line
 
         # Process the last set of lines if in paragraph mode
         # Note: Final newline is removed (as per process_line).
-        if (self.paragraph_mode and paragraph):
+        if (self.paragraph_mode and paragraph_lines):
             self.rel_para_num += 1
             self.para_num += 1
             debug.trace(5, "processing last paragraph")
-            debug.assertion(paragraph.endswith("\n") or (paragraph == ""))
-            if paragraph.endswith("\n"):
-                paragraph = paragraph[:-1]
-            self.process_line(paragraph)
+            process_unit("\n".join(paragraph_lines))
 
         return
 
+    def process_input_parallel(self):
+        """Process input lines (or paragraphs) via self.workers processes, preserving the output order
+        Notes:
+        - The units of input are sent to the workers in batches of WORKER_BATCH_SIZE, each with a
+          sequence number. Output to stdout by process_line is captured in the worker, and it is
+          written by the main process in sequence order.
+        - The workers are forked after setup, so its state is shared (e.g., loaded models).
+          For any per-process initialization, use worker_setup.
+        - Changes in worker state can be passed back via get_worker_state and merge_worker_state (e.g., for wrap_up).
+        - The random module is reseeded per batch based on worker_seed, which is drawn here, so that
+          output is reproducible given the seed of the main process (e.g., via --seed).
+        """
+        # pylint: disable=import-outside-toplevel
+        from collections import deque
+        from concurrent.futures import ProcessPoolExecutor
+        import multiprocessing
+        debug.trace(5, f"Main.process_input_parallel(); workers={self.workers}")
+        global worker_main
+        worker_main = self
+        self.worker_seed = random.getrandbits(64)
+        sys.stdout.flush()
+        pending = deque()
+        batch = []
+        next_seq = 0
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("fork"),
+                                 initializer=init_main_worker) as executor:
+
+            def output_next_batch():
+                """Output results for oldest pending batch"""
+                (seq, future) = pending.popleft()
+                (result_seq, output, state) = future.result()
+                debug.assertion(result_seq == seq)
+                sys.stdout.write(output)
+                if state is not None:
+                    self.merge_worker_state(state)
+
+            def submit_batch():
+                """Send current batch to a worker, outputting results of older batches to bound memory"""
+                nonlocal batch, next_seq
+                pending.append((next_seq, executor.submit(process_worker_batch, next_seq, batch)))
+                next_seq += 1
+                batch = []
+                while len(pending) > (2 * self.workers):
+                    output_next_batch()
+
+            def add_unit(unit):
+                """Add UNIT of input to batch (along with position info)"""
+                batch.append((unit, self.line_num, self.rel_line_num, self.para_num, self.rel_para_num, self.page_num))
+                if len(batch) >= WORKER_BATCH_SIZE:
+                    submit_batch()
+
+            self._process_input_units(add_unit)
+            if batch:
+                submit_batch()
+            while pending:
+                output_next_batch()
+        worker_main = None
+        return
+
+    def worker_setup(self):
+        """Initialization for each worker process with process_input_parallel
+        Notes:
+        - setup is already done prior to the workers being forked.
+        - By default, the random module is reseeded deterministically from worker_seed (n.b., it is
+          otherwise reseeded from the OS after fork). It is also reseeded for each batch, since the
+          assignment of batches to workers varies (see process_worker_batch).
+        """
+        tpo.debug_format("Main.worker_setup(): self={s}", 5, s=self)
+        self.seed_worker_random("setup")
+        return
+
+    def seed_worker_random(self, label):
+        """Reseed random module based on worker_seed and LABEL (e.g., batch sequence number)"""
+        random.seed(f"{self.worker_seed}-{label}")
+
+    def get_worker_state(self):
+        """Return worker state changes since last call for merging via merge_worker_state (or None)
+        Note: This is invoked in the worker after each batch of input"""
+        return None
+
+    def merge_worker_state(self, state):
+        """Merge STATE from a worker (see get_worker_state) into the main process state"""
+        tpo.debug_format("Main.merge_worker_state() stub: state={s}", 5, s=state)
+        return
+
     def wrap_up(self):
         """Default end processing"""
         tpo.debug_format("Main.wrap_up() stub: self={s}", 5, s=self)
@@ -959,26 +1208,222 @@ class Main(object):
         tpo.debug_format("Main.clean_up(): self={s}", 5, s=self)
         if not KEEP_TEMP_FILES:
             ## TODO2: 3=>6
-            debug.trace_fmt(4, "Deleting any temporary files: {files}",
-                            files=gh.run(f"echo {self.temp_base}* {self.temp_file}* | sort -u"))
-                                
+            # note: files removed directly (i.e., without shell invocations via gh.run) to reduce run time
+            debug.trace(4, lambda: ("Deleting any temporary files: " +
+                                    str(sorted(set(glob.glob(glob.escape(self.temp_base) + "*") +
+                                                   glob.glob(glob.escape(self.temp_file) + "*"))))))
+
             # Remove all temp_base* files (or the temp_base directory)
             if self.use_temp_base_dir:
                 ## OLD: gh.run("rm -rf {dir}", dir=self.temp_base)
                 if DISABLE_RECURSIVE_DELETE:
                     debug.trace(4, f"FYI: Only deleting top-level files in {self.temp_base} to avoid potentially dangerous rm -r")
-                    gh.run("rm -f {dir}/* {dir}/.*", dir=self.temp_base)
-                    gh.run("rm -f {dir}", dir=self.temp_base)
+                    remove_files(glob.glob(gh.form_path(glob.escape(self.temp_base), "*")) +
+                                 glob.glob(gh.form_path(glob.escape(self.temp_base), ".*")))
+                    try:
+                        os.rmdir(self.temp_base)
+                    except OSError:
+                        debug.trace(4, f"FYI: Unable to remove temp dir {self.temp_base} (e.g., not empty)")
                 else:
                     debug.trace(4, f"FYI: Using potentially dangerous rm -r over {self.temp_base}")
-                    gh.run("rm -rvf {dir}", dir=self.temp_base)
+                    shutil.rmtree(self.temp_base, ignore_errors=True)
             else:
-                gh.run("rm -vf {file}*", file=self.temp_base)
+                remove_files(glob.glob(glob.escape(self.temp_base) + "*"))
             # Likewise remove all temp_file* files
             if (self.temp_file != self.temp_base):
-                gh.run("rm -vf {file}*", file=self.temp_file)
+                remove_files(glob.glob(glob.escape(self.temp_file) + "*"))
         return
 
+#-------------------------------------------------------------------------------
+# Temporary file support
+
+def remove_files(filenames):
+    """Remove regular FILENAMES, ignoring directories and errors (as with rm -f)"""
+    debug.trace(6, f"remove_files({filenames})")
+    for filename in filenames:
+        try:
+            if not os.path.isdir(filename):
+                os.remove(filename)
+        except OSError:
+            debug.trace(5, f"Unable to remove {filename}: {system.get_exception()}")
+
+#-------------------------------------------------------------------------------
+# Input file support
+
+def open_input_file(filename, mode="r", errors=None, newline=None):
+    """Open FILENAME for input with MODE, decompressing .gz, .bz2, and .xz files (unless DECOMPRESS_INPUT is 0)
+    Notes:
+    - ERRORS and NEWLINE are as with open (n.b., errors ignored by default as with system.open_file).
+    - A FILENAME of - is used for stdin.
+    """
+    # pylint: disable=import-outside-toplevel
+    binary = ("b" in mode)
+    if (filename == "-"):
+        return (sys.stdin.buffer if binary else sys.stdin)
+    text_args = ({} if binary else {"errors": errors, "newline": newline})
+    opener = None
+    if DECOMPRESS_INPUT:
+        if filename.endswith(".gz"):
+            import gzip
+            opener = gzip.open
+        elif filename.endswith(".bz2"):
+            import bz2
+            opener = bz2.open
+        elif filename.endswith(".xz"):
+            import lzma
+            opener = lzma.open
+    if opener:
+        if not binary:
+            text_args["encoding"] = "UTF-8"
+            if text_args["errors"] is None:
+                text_args["errors"] = "ignore"
+        result = opener(filename, mode=(mode if binary else "rt"), **text_args)
+    else:
+        result = system.open_file(filename, mode=mode, **text_args)
+    debug.trace(5, f"open_input_file({filename!r}, {mode!r}) => {result!r}")
+    return result
+
+
+class MultiFileInput(object):
+    """Read-only stream over the concatenation of FILENAMES, each opened via open_input_file
+    Note: A file lacking a final newline is treated as if it had one (i.e., lines not merged across files), except for the last file.
+    """
+
+    def __init__(self, filenames, mode="r", errors=None, newline=None):
+        debug.trace(5, f"MultiFileInput.__init__({filenames}, {mode!r})")
+        self.filenames = list(filenames)
+        self.open_args = {"mode": mode, "errors": errors, "newline": newline}
+        binary = ("b" in mode)
+        self.empty = (b"" if binary else "")
+        self.eol = (b"\n" if binary else "\n")
+        self.errors = errors
+        self.encoding = (None if binary else "UTF-8")
+        self.newlines = newline
+        self.file_num = 0
+        self.filename = None
+        self.stream = None
+        self.last_char = self.empty
+        self._next_file()
+
+    def _next_file(self):
+        """Open the next file, returning newline if needed to terminate the previous one (or empty string)"""
+        result = self.empty
+        if self.stream is not None:
+            if (self.last_char not in (self.empty, self.eol)) and (self.file_num < len(self.filenames)):
+                result = self.eol
+            if self.filename != "-":
+                self.stream.close()
+            self.stream = None
+        if self.file_num < len(self.filenames):
+            self.filename = self.filenames[self.file_num]
+            self.file_num += 1
+            self.stream = open_input_file(self.filename, **self.open_args)
+            if self.stream is None:
+                raise IOError(f"Unable to open {self.filename}")
+            self.last_char = self.empty
+        return result
+
+    def _has_more_files(self):
+        """Whether there are files after the current one"""
+        return (self.file_num < len(self.filenames))
+
+    def read(self, size=-1):
+        """Read up to SIZE characters (or rest of input if negative)"""
+        parts = []
+        while self.stream is not None:
+            data = (self.stream.read(size) if ((size is not None) and (size >= 0)) else self.stream.read())
+            if not data:
+                data = self._next_file()
+            else:
+                self.last_char = data[-1:]
+            if data:
+                parts.append(data)
+                if (size is not None) and (size >= 0):
+                    break
+        return self.empty.join(parts)
+
+    def readline(self, size=-1):
+        """Read next line (or up to SIZE characters)"""
+        while self.stream is not None:
+            line = self.stream.readline(size)
+            if line:
+                self.last_char = line[-1:]
+                if (not line.endswith(self.eol)) and ((size is None) or (size < 0)) and self._has_more_files():
+                    line += self.eol
+                    self.last_char = self.eol
+                return line
+            line = self._next_file()
+            if line:
+                return line
+        return self.empty
+
+    def readlines(self, hint=-1):
+        """Read list of lines, with total size about HINT characters (or rest of current file if negative)"""
+        while self.stream is not None:
+            lines = self.stream.readlines(hint)
+            if lines:
+                if (not lines[-1].endswith(self.eol)) and self._has_more_files():
+                    lines[-1] += self.eol
+                self.last_char = self.eol
+                return lines
+            self._next_file()
+        return []
+
+    def __iter__(self):
+        if (READ_LINES_HINT <= 0):
+            yield from iter(self.readline, self.empty)
+            return
+        for lines in iter(lambda: self.readlines(READ_LINES_HINT), []):
+            yield from lines
+
+    def isatty(self):
+        """Whether interactive (n.b., always False)"""
+        return False
+
+    def close(self):
+        """Close current file and skip any remaining ones"""
+        if (self.stream is not None) and (self.filename != "-"):
+            self.stream.close()
+        self.stream = None
+        self.file_num = len(self.filenames)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_args):
+        self.close()
+
+#-------------------------------------------------------------------------------
+# Support for Main.process_input_parallel
+#
+# note: the Main instance is inherited by the forked worker processes
+#
+
+worker_main = None
+
+
+def init_main_worker():
+    """Initialization for worker process"""
+    debug.trace(5, f"init_main_worker(); pid={os.getpid()}")
+    worker_main.worker_setup()
+
+
+def process_worker_batch(seq, batch):
+    """Process BATCH of (unit, line_num, rel_line_num, para_num, rel_para_num, page_num) tuples in worker
+    Returns (SEQ, output, worker_state) tuple with process_line output to stdout captured"""
+    debug.trace(6, f"process_worker_batch({seq}, _); len={len(batch)}")
+    main_app = worker_main
+    main_app.seed_worker_random(seq)
+    saved_stdout = sys.stdout
+    sys.stdout = output = io.StringIO()
+    try:
+        for (unit, main_app.line_num, main_app.rel_line_num, main_app.para_num,
+             main_app.rel_para_num, main_app.page_num) in batch:
+            main_app.process_line(unit)
+    finally:
+        sys.stdout = saved_stdout
+    return (seq, output.getvalue(), main_app.get_worker_state())
+
 #-------------------------------------------------------------------------------
 # Global instance for convenient adhoc usage
 # 
@@ -103,6 +103,9 @@ TFIDF_BAD_BOOST = system.getenv_float(
 TFIDF_GOOD_BOOST = system.getenv_float(
     "TFIDF_GOOD_BOOST", 0,
     description="Boost factor for ngrams that good terms")
+TFIDF_FETCH_FACTOR = system.getenv_int(
+    "TFIDF_FETCH_FACTOR", 2,
+    description="Multiple of term limit for initial keywords in get_top_terms (0 for all)")
 
 ## OLD:
 ## # Dynamic loading
@@ -130,6 +133,29 @@ def split_tokens(text, include_punct=None, include_stop=None):
     return result
 
 
+class ngram_token_index(object):
+    """Token index over spaced ngrams for subsumption and overlap checks in get_top_terms
+    Note: both checks require a common token, so only ngrams sharing one are candidates."""
+
+    def __init__(self):
+        self.spaced_ngrams = []
+        self.postings = defaultdict(list)
+
+    def add(self, spaced_ngram):
+        """Add SPACED_NGRAM at next position"""
+        pos = len(self.spaced_ngrams)
+        self.spaced_ngrams.append(spaced_ngram)
+        for token in set(spaced_ngram.split()):
+            self.postings[token].append(pos)
+
+    def candidates(self, spaced_ngram):
+        """Return sorted positions of ngrams sharing a token with SPACED_NGRAM"""
+        positions = set()
+        for token in set(spaced_ngram.split()):
+            positions.update(self.postings.get(token, []))
+        return sorted(positions)
+
+
 class ngram_tfidf_analysis(object):
     """Class for performing TF-IDF over ngrams and returning sorted list"""
 
@@ -199,6 +225,19 @@ class ngram_tfidf_analysis(object):
         if TFIDF_VP_BOOST:
             self.verb_phrases[doc_id] = self.text_proc.verb_phrases(text) 
 
+    def add_docs(self, docs, workers=None):
+        """Add DOCS given as (doc_id, text) pairs, optionally preprocessing via WORKERS processes
+        Note: see Corpus.add_documents (e.g., TFIDF_WORKERS default)"""
+        docs = list(docs)
+        self.corpus.add_documents(docs, workers=workers)
+        self.noun_phrases = defaultdict(list)
+        self.verb_phrases = defaultdict(list)
+        for (doc_id, text) in docs:
+            if TFIDF_NP_BOOST:
+                self.noun_phrases[doc_id] = self.text_proc.noun_phrases(text) 
+            if TFIDF_VP_BOOST:
+                self.verb_phrases[doc_id] = self.text_proc.verb_phrases(text) 
+
     def get_doc(self, doc_id):
         """Return document data for DOC_ID"""
         return self.corpus[doc_id]
@@ -242,16 +281,39 @@ class ngram_tfidf_analysis(object):
         # ex: top_terms=[CorpusKeyword(term=<tfidf.dockeyword.DocKeyword object at 0x7f08b43bf550>, ngram=u'patuxent river', score=0.0015548719642054984), ... CorpusKeyword(term=<tfidf.dockeyword.DocKeyword object at 0x7f08b43cf110>, ngram=u'afognak native corporation', score=0.0009894639772216809)]
         ## TODO3: decompose using helper methods
         
-        # Get twice as many top terms to display to account for filtering
+        # Get a multiple of the top terms to display to account for filtering, falling back to all
+        # of them if too few remain. Reranking via boosting requires all terms from the start.
         # TODO: keep track of how often too few terms shown
         debug.trace(6, (f"get_top_terms({doc_id}, tfw:{tf_weight}, idfw:{idf_weight}, lim={limit},"
                         f"allow_sub={allow_ngram_subsumption}, allow_over={allow_ngram_overlap},"
                         f"allow_num={allow_numeric_ngrams})"))
-        top_terms = self.corpus.get_keywords(document_id=doc_id,
-                                             tf_weight=tf_weight,
-                                             idf_weight=idf_weight,
-                                             ## OLD: limit=(2 * limit)
-                                             )
+        apply_reranking = (TFIDF_NP_BOOST or TFIDF_VP_BOOST or TFIDF_NUMERIC_BOOST)
+        fetch_limit = None
+        if (limit and TFIDF_FETCH_FACTOR and not apply_reranking):
+            fetch_limit = (TFIDF_FETCH_FACTOR * limit)
+        while True:
+            top_terms = self.corpus.get_keywords(document_id=doc_id,
+                                                 tf_weight=tf_weight,
+                                                 idf_weight=idf_weight,
+                                                 limit=fetch_limit)
+            truncated = ((fetch_limit is not None) and (len(top_terms) >= fetch_limit))
+            result, complete = self.rank_top_terms(doc_id, top_terms, limit=limit, truncated=truncated,
+                                                   allow_ngram_subsumption=allow_ngram_subsumption,
+                                                   allow_ngram_overlap=allow_ngram_overlap,
+                                                   allow_numeric_ngrams=allow_numeric_ngrams)
+            if complete:
+                break
+            debug.trace(5, f"Getting all terms for {doc_id} as {fetch_limit} insufficient")
+            fetch_limit = None
+        return result
+
+    def rank_top_terms(self, doc_id, top_terms, limit=MAX_TERMS, truncated=False,
+                       allow_ngram_subsumption=ALLOW_NGRAM_SUBSUMPTION,
+                       allow_ngram_overlap=ALLOW_NGRAM_OVERLAP, allow_numeric_ngrams=ALLOW_NUMERIC_NGRAMS):
+        """Return (term_info, complete) with up to LIMIT (term, weight) tuples from TOP_TERMS list (see get_top_terms)
+        Note: If TRUNCATED, TOP_TERMS is a prefix of the full keyword list, and COMPLETE is only
+        true if the result is the same as with the full list.
+        """
         debug.trace_fmtd(7, "top_terms={tt}", tt=top_terms)
 
         # Skip empty tokens due to spacing and to punctuation removal (e.g, " ").
@@ -268,6 +330,7 @@ class ngram_tfidf_analysis(object):
 
         # Apply various boosting heuristics that affect the ranking
         apply_reranking = (TFIDF_NP_BOOST or TFIDF_VP_BOOST or TFIDF_NUMERIC_BOOST)
+        debug.assertion(not (apply_reranking and truncated))
         if apply_reranking:
             boosted = False
             for (i, (ngram, score)) in enumerate(top_term_info):
@@ -312,47 +375,59 @@ class ngram_tfidf_analysis(object):
         debug.trace_values(6, round_terms(top_term_info), "interim top terms")
         
         # Put spaces around ngrams to aid in subsumption tests
+        # note: an ngram is only checked against higher-weighted ones (i.e., earlier in list), so
+        # the checks can stop once the limit is reached; a token index limits the comparisons.
         check_ngram_overlap = (not (allow_ngram_subsumption and allow_ngram_overlap))
-        if check_ngram_overlap:
-            spaced_ngrams = [(" " + ngram + " ") for (ngram, _score) in top_term_info]
-            debug.trace_fmtd(7, "spaced_ngrams={sn}", sn=spaced_ngrams)
+        ngram_index = ngram_token_index()
         final_top_term_info = []
+        num_checked = 0
         for (i, (ngram, score)) in enumerate(top_term_info):
+            if (len(final_top_term_info) == limit):
+                break
+            num_checked += 1
+            spaced_ngram = (" " + ngram + " ")
+            include = True
             
             if (not ngram.strip()):
                 debug.trace_fmt(6, "Omitting invalid ngram '{ng}'", ng=ngram)
-                continue
-            if ((not allow_numeric_ngrams) and any(tpo.is_numeric(token) for token in split_tokens(ngram))):
+                include = False
+            elif ((not allow_numeric_ngrams) and any(tpo.is_numeric(token) for token in split_tokens(ngram))):
                 debug.trace_fmt(6, "Omitting ngram with numerics '{ng}'", ng=ngram)
-                continue
+                include = False
             
             # Check for subsumption (e.g., "new york" in "new york city") and overlap (e.g. "new york" and "york city")
             ## TODO: record ngram offsets to facilitate contiguity tests
-            include = True
-            if check_ngram_overlap:
-                for (j, other_spaced_ngram) in enumerate(spaced_ngrams):
+            elif check_ngram_overlap:
+                for j in ngram_index.candidates(spaced_ngram):
+                    other_spaced_ngram = ngram_index.spaced_ngrams[j]
                     is_subsumed = ((not allow_ngram_subsumption) and
-                                   ((spaced_ngrams[i] in other_spaced_ngram)
-                                     or (other_spaced_ngram in spaced_ngrams[i])))
+                                   ((spaced_ngram in other_spaced_ngram)
+                                     or (other_spaced_ngram in spaced_ngram)))
                     has_overlap = ((not allow_ngram_overlap) and
-                                   terms_overlap(spaced_ngrams[i], other_spaced_ngram))
-                    if ((i > j) and (is_subsumed or has_overlap)):
+                                   terms_overlap(spaced_ngram, other_spaced_ngram))
+                    if (is_subsumed or has_overlap):
                         include = False
                         label = ("in subsumption" if is_subsumed else "overlapping")
                         debug.trace_fmt(6, "Omitting lower-weighted ngram '{ng2}' {lbl} with '{ng1}': {s1} <= {s2}",
-                                        ng1=other_spaced_ngram.strip(), ng2=spaced_ngrams[i].strip(), lbl=label,
+                                        ng1=other_spaced_ngram.strip(), ng2=spaced_ngram.strip(), lbl=label,
                                         s1=rnd(top_term_info[i][1]), s2=rnd(top_term_info[j][1]))
                         break
+            ngram_index.add(spaced_ngram)
             if not include:
                 continue
 
             # OK
             final_top_term_info.append((ngram, score))
-            ## OLD:
-            ## if (len(final_top_term_info) == limit):
-            ##     break
         debug.trace_values(6, round_terms(final_top_term_info), "final top terms")
 
+        # Check whether result would be the same with all terms
+        # note: the last term of a truncated list is excluded, as it might be affected by
+        # the capitalized-term reordering with the next term.
+        complete = ((not truncated) or
+                    ((len(final_top_term_info) == limit) and (num_checked < len(top_term_info))))
+        if not complete:
+            return (final_top_term_info, complete)
+
         # Sanity check on number of terms displayed
         num_terms = len(final_top_term_info)
         if (num_terms < limit):
@@ -360,7 +435,7 @@ class ngram_tfidf_analysis(object):
                             n=num_terms, m=limit)
         debug.trace_fmtd(6, "final_top_term_info={tti}", tti=final_top_term_info)
         result = final_top_term_info[:limit]
-        return result
+        return (result, complete)
 
     def old_get_ngrams(self, text):
         """Returns generator with ngrams in TEXT"""
@@ -441,10 +516,9 @@ def output_tfidf_analysis(main_app, good_text=None, bad_text=None):
     ngram_analyzer = ngram_tfidf_analysis(min_ngram_size=MIN_NGRAM_SIZE, max_ngram_size=MAX_NGRAM_SIZE,
                                           good_terms=good_terms, bad_terms=bad_terms)
     all_text = main_app.read_entire_input()
-    num_docs = 0
-    for l, line in enumerate(all_text.splitlines()):
-        ngram_analyzer.add_doc(line, doc_id=(l + 1))
-        num_docs += 1
+    lines = all_text.splitlines()
+    ngram_analyzer.add_docs((l + 1, line) for (l, line) in enumerate(lines))
+    num_docs = len(lines)
 
     # Output ngram sample
     SAMPLE_SIZE = 10
@@ -1,12 +1,19 @@
 #! /usr/bin/env python
 #
 # randomize-lines.py: randomize lines in a file without reading entirely into memory.
-# This creates a temporary file with a random number in the first column and
-# the original line contents in the second. Then the temporary file is sorted
-# and the random number column removed.
+# Input within a memory budget is shuffled in memory (Fisher-Yates). Otherwise, the
+# lines are scattered to temporary bucket files chosen at random, and then each bucket
+# is shuffled in memory in turn (i.e., no sort needed).
 #
 # Note:
 # - Inspired by examples under Stack Overflow (see below).
+# - The original version added a random number column and then used Unix sort.
+# - Random bucket assignment followed by in-bucket shuffling yields a uniform
+#   permutation (as with Rao-Sandelius shuffle).
+# - For --percent, the output stops after the sample size is reached (e.g., via
+#   partial Fisher-Yates), so that the remaining buckets are not shuffled.
+# - Paragraphs are shuffled instead of lines if Main paragraph mode in effect
+#   (e.g., PARAGRAPH_MODE=1).
 #
 #------------------------------------------------------------------------
 # via http://stackoverflow.com/questions/4618298/randomly-mix-lines-of-3-million-line-file
@@ -31,7 +38,6 @@
 #------------------------------------------------------------------------
 # TODO:
 # - Add sanity check for disk space issues.
-# - Have streamlined version just using output from sort.
 #
 
 ## OLD: """Randomize lines from stardard input"""
@@ -48,41 +54,177 @@ Sample usage:
 ## OLD: import argparse
 import os
 import random
+import re
 import sys
 
 # Local modules
 from mezcla import debug
 from mezcla import glue_helpers as gh
-from mezcla.main import Main
+from mezcla.main import Main, READ_LINES_HINT
 from mezcla import system
 
 RANDOM_SEED = system.getenv_int(
     "RANDOM_SEED", 15485863,
     description="Integral seed for random number generation--use 0 for default based on time-of-day")
+MEMORY_BUDGET = system.getenv_int(
+    "SHUFFLE_MEMORY_BUDGET", 128 * 1024 * 1024,
+    description="Approximate bytes of memory for shuffling input in memory, beyond which temporary bucket files are used")
+NUM_BUCKETS = system.getenv_int(
+    "SHUFFLE_BUCKETS", 0,
+    description="Number of temporary bucket files when input exceeds memory budget--use 0 to base on input size")
+MAX_BUCKETS = 256
+UNIT_OVERHEAD = 56                      # approximate bytes per str object beyond its characters (e.g., header and list slot)
+MAX_DEPTH = 3
 
 class Dummy_Main(Main):
     """Class for reading input using Main"""
     ## TODO2: Merge usage with that of regular Main class instance main_app below
     manual_input = True
     
-    def __init__(self, input_stream):
+    def __init__(self, input_stream, process_units=None):
+        """Initializer: PROCESS_UNITS is invoked with lists of lines (or paragraphs)"""
         super().__init__(runtime_args=[])
         self.input_stream = input_stream
+        self.process_units = process_units
         ## BAD: self.all_lines = []
 
     ## OLD:
     ## def process_line(self, line):
     ##     self.all_lines.append(line)
     ##     return
-        
+
+    def process_line(self, line):
+        """Pass along LINE (or paragraph)"""
+        self.process_units([line])
+
+    def process_lines(self, lines):
+        """Pass along batch of LINES"""
+        self.process_units(lines)
+
+#...............................................................................
+
+def partial_shuffle(units, num):
+    """Return random sample of NUM of the UNITS in random order, via partial Fisher-Yates (n.b., UNITS modified)"""
+    # EX: sorted(partial_shuffle(list(range(5)), 5)) => [0, 1, 2, 3, 4]
+    num_units = len(units)
+    if (num >= num_units):
+        random.shuffle(units)
+        return units
+    rand = random.random
+    for i in range(num):
+        j = i + int(rand() * (num_units - i))
+        (units[i], units[j]) = (units[j], units[i])
+    return units[:num]
+
+
+def encode_unit(unit):
+    """Escape newlines in UNIT (along with backslashes) for bucket files"""
+    # EX: encode_unit("a\\b\nc") => "a\\\\b\\nc"
+    return unit.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def decode_unit(unit):
+    """Inverse of encode_unit for UNIT"""
+    # EX: decode_unit("a\\\\b\\nc") => "a\\b\nc"
+    return re.sub(r"\\(.)", lambda m: ("\n" if (m.group(1) == "n") else m.group(1)), unit)
+
+
+class Shuffler(object):
+    """Class for shuffling input units (e.g., lines), in memory if within budget and otherwise via temporary bucket files"""
+
+    def __init__(self, temp_base, memory_budget=None, num_buckets=None, estimated_size=None, escape_newlines=False, depth=0):
+        """Initializer: TEMP_BASE is prefix for bucket files used if over MEMORY_BUDGET bytes
+        Notes:
+        - NUM_BUCKETS defaults to twice the ESTIMATED_SIZE (e.g., of input file) over the budget.
+        - ESCAPE_NEWLINES is needed for units with newlines (e.g., paragraphs).
+        - Memory usage is estimated as the unit characters plus UNIT_OVERHEAD per unit.
+        """
+        debug.trace(5, f"Shuffler.__init__({temp_base!r}, {memory_budget}, {num_buckets}, {estimated_size}, {escape_newlines}, {depth})")
+        self.temp_base = temp_base
+        self.memory_budget = max(1, (memory_budget or MEMORY_BUDGET))
+        if not num_buckets:
+            num_buckets = NUM_BUCKETS
+        if not num_buckets:
+            num_buckets = (((2 * estimated_size) // self.memory_budget + 1) if estimated_size else 16)
+        self.num_buckets = max(2, min(MAX_BUCKETS, num_buckets))
+        self.escape_newlines = escape_newlines
+        self.depth = depth
+        self.units = []
+        self.size = 0
+        self.num_units = 0
+        self.bucket_files = None
+        self.bucket_streams = None
+
+    def add_units(self, units):
+        """Add UNITS (without trailing newlines) to be shuffled, switching to bucket files if over budget"""
+        self.num_units += len(units)
+        if (self.bucket_streams is not None):
+            self.scatter(units)
+            return
+        self.units += units
+        ## OLD: self.size += sum(map(len, units))
+        self.size += (sum(map(len, units)) + UNIT_OVERHEAD * len(units))
+        if ((self.size > self.memory_budget) and (self.depth < MAX_DEPTH)):
+            debug.trace(4, f"Using {self.num_buckets} bucket files after {self.num_units} units ({self.size} bytes)")
+            self.bucket_files = [f"{self.temp_base}.bucket{b}" for b in range(self.num_buckets)]
+            self.bucket_streams = [system.open_file(f, mode="w", newline="") for f in self.bucket_files]
+            self.scatter(self.units)
+            self.units = []
+
+    def scatter(self, units):
+        """Write each of the UNITS to a random bucket file"""
+        bucket_units = [[] for _b in range(self.num_buckets)]
+        for (bucket, unit) in zip(random.choices(range(self.num_buckets), k=len(units)), units):
+            bucket_units[bucket].append(unit)
+        for (stream, units_subset) in zip(self.bucket_streams, bucket_units):
+            if units_subset:
+                if self.escape_newlines:
+                    units_subset = map(encode_unit, units_subset)
+                stream.write("\n".join(units_subset) + "\n")
+
+    def shuffled_units(self, max_units=None):
+        """Generator for lists of the units in random order, stopping after MAX_UNITS (e.g., for sampling)"""
+        remaining = (self.num_units if (max_units is None) else min(max_units, self.num_units))
+        debug.trace(5, f"Shuffler.shuffled_units({max_units}); remaining={remaining}")
+        if (self.bucket_streams is None):
+            if remaining:
+                yield partial_shuffle(self.units, remaining)
+            self.units = []
+            return
+
+        # Shuffle each bucket in turn, using another level of buckets if too large
+        # note: bucket files are removed even if output stops early (e.g., broken pipe)
+        for stream in self.bucket_streams:
+            stream.close()
+        try:
+            for filename in self.bucket_files:
+                if (remaining <= 0):
+                    break
+                with system.open_file(filename, newline="\n") as stream:
+                    bucket = Shuffler(filename, memory_budget=self.memory_budget,
+                                      estimated_size=gh.file_size(filename), depth=(self.depth + 1))
+                    # note: line at a time if no hint (n.b., readlines(0) reads entire file)
+                    line_batches = (iter(lambda: stream.readlines(READ_LINES_HINT), []) if (READ_LINES_HINT > 0)
+                                    else ([line] for line in stream))
+                    for lines in line_batches:
+                        bucket.add_units([line[:-1] for line in lines])
+                for units in bucket.shuffled_units(remaining):
+                    remaining -= len(units)
+                    yield ([decode_unit(unit) for unit in units] if self.escape_newlines else units)
+        finally:
+            if not debug.detailed_debugging():
+                for filename in self.bucket_files:
+                    gh.delete_file(filename)
+
+#...............................................................................
 
 def main():
     """Entry point for script"""
     debug.trace(4, "main(): sys.argv=%s" % sys.argv)
-    ## TODO: assert is_directory("/usr/bin"), "This requires Unix"
-    if ("--ignore-case" not in gh.run("sort --help")):
-        system.print_error("Error: This requires a Unix-type version of sort (e.g., GNU).")
-        sys.exit()
+    ## OLD:
+    ## if ("--ignore-case" not in gh.run("sort --help")):
+    ##     system.print_error("Error: This requires a Unix-type version of sort (e.g., GNU).")
+    ##     sys.exit()
 
     # Check command-line arguments
     # TODO3: standardize name of instance (e.g., dummy_app vs app vs. script_app)
@@ -97,99 +239,71 @@ def main():
     debug.assertion(main_app.parsed_args)
     #
     input_stream = sys.stdin
+    estimated_size = None
     if (main_app.filename != "-"):
         assert(os.path.exists(main_app.filename))
         input_stream = system.open_file(main_app.filename)
         assert(input_stream)
+        estimated_size = gh.file_size(main_app.filename)
     else:
         debug.trace(5, "Re-opening stdin w/ UTF-8 support")
         ## TODO: figure out proper way to re-open stdin
         STDIN = 0
         input_stream = system.open_file(STDIN)
+    # Initialize seed for optional random number generator
+    # note: the --seed option takes precedence over RANDOM_SEED
     random_seed = main_app.get_parsed_option(SEED_OPT, RANDOM_SEED)
     if random_seed:
         random.seed(random_seed)
     include_header = main_app.get_parsed_option(HEADER_OPT)
     percent_lines = main_app.get_parsed_option(PERCENT_OPT, 100)
+    ## OLD:
+    ## if RANDOM_SEED:
+    ##     random.seed(RANDOM_SEED)
 
-    # Initialize seed for optional random number generator
-    if RANDOM_SEED:
-        random.seed(RANDOM_SEED)
-
-    # Add column with random number to temporary file
+    # Read the lines (or paragraphs), shuffling in memory or scattering to temporary bucket files
+    # Note: uses main class to allow for reading pages and paragraphs
     ## OLD: temp_base = system.getenv_text("TEMP_FILE", gh.get_temp_file())
     temp_base = main_app.temp_base
-    temp_input_file = temp_base + ".input"
-    temp_output_file = temp_base + ".output"
-    ## OLD: temp_input_handle = open(temp_input_file, "w")
-    temp_input_handle = system.open_file(temp_input_file, mode="w")
-    assert(temp_input_handle)
-    #
     header = None
-    line_num = 0
-    # Note: uses main class to allow for reading pages and paragraphs
-    main_app = Dummy_Main(input_stream)
-    main_app.read_input()
-    multi_line_mode = not main_app.is_line_mode()
+    reader_app = Dummy_Main(input_stream)
+    multi_line_mode = not reader_app.is_line_mode()
+    shuffler = Shuffler(temp_base, estimated_size=estimated_size, escape_newlines=multi_line_mode)
     #
-    ## BAD: for line in main_app.all_lines:
-    for line in main_app.read_input():
-        line_num += 1
-        line = line.strip("\n")
-        if multi_line_mode:
-            # Encode internal newlines so the sort is not thrown off
-            line = line.replace("\n", "\\n")
-        if (line_num == 1) and include_header:
-            header = line
-        else:
-            temp_input_handle.write("%s\t%s\n" % (random.random(), line))
-    num_input_lines = line_num
-    temp_input_handle.close()
-
-    # Sort by random-number column (1) and then remove temporary column
-    # NOTES:
-    # - This needs to ensure that the unix version of sort is used.
-    # - The Win32 version of run() doesn't support pipes. 
-    ## TODO: Use another way to bypass Windows sort command (e.g., in case sort
-    ## is located in a different directory than /usr/bin).
-    gh.delete_existing_file(temp_output_file)
-    gh.run("sort -n < {in_file} | cut -f2- > {out_file}",
-           in_file=temp_input_file, out_file=temp_output_file)
-
-    # Display result
-    # TODO: send output of command above to stdout
-    ## OLD: temp_output_handle = open(temp_output_file, "r")
-    temp_output_handle = system.open_file(temp_output_file, mode="r")
-    assert(temp_output_handle)
+    def add_units(units):
+        """Add UNITS to shuffler, setting aside first as header if applicable"""
+        nonlocal header
+        if (include_header and (header is None) and units):
+            header = units[0]
+            units = units[1:]
+        shuffler.add_units(units)
+    #
+    reader_app.process_units = add_units
+    reader_app.process_input()
+    num_input_lines = (shuffler.num_units + (header is not None))
+
+    # Display result, stopping early if sampling
     line_num = 0
     IO_error = False
-    if include_header and header:
-        print(header)
-        line_num += 1
-        debug.trace(6, "HL%d: %s" % (line_num, header))
-    last_line_num = (num_input_lines if (percent_lines >= 100) else (percent_lines / 100 * num_input_lines))
-    for line in temp_output_handle:
-        line_num += 1
-        if line_num > last_line_num:
-            debug.trace(4, f"Stopping after line# {last_line_num} for {percent_lines}% support")
-            break
-        line = line.strip("\n")
-        if multi_line_mode:
-            line = line.replace("\\n", "\n")
-        debug.trace(6, "RL%d: %s" % (line_num, line))
-        if (include_header and (line == header)):
-            debug.trace(5, "Ignoring header at line %d" % (line_num))
-            continue
-        try:
-            print(line)
-        except:
-            IO_error = True
-            debug.trace(4, "Exception printing line %d: %s" % (line_num, str(sys.exc_info())))
-            break
+    last_line_num = (shuffler.num_units if (percent_lines >= 100) else int(percent_lines / 100 * shuffler.num_units))
+    try:
+        if include_header and (header is not None):
+            print(header)
+            debug.trace(6, "HL1: %s" % header)
+        for units in shuffler.shuffled_units(last_line_num):
+            if multi_line_mode:
+                # note: paragraphs separated by blank line
+                text = ("\n" if line_num else "") + "\n\n".join(unit.rstrip("\n") for unit in units) + "\n"
+            else:
+                text = "\n".join(units) + "\n"
+            sys.stdout.write(text)
+            line_num += len(units)
+    except IOError:
+        IO_error = True
+        debug.trace(4, "Exception printing line %d: %s" % (line_num, str(sys.exc_info())))
     num_output_lines = line_num
     debug.trace(4, "%s input and %d output lines" % (num_input_lines, num_output_lines))
     debug.assertion((last_line_num == num_output_lines) or IO_error)
-    temp_output_handle.close()
 
     ## OLD:
     ## # Cleanup (e.g., removing temporary files)
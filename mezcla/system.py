@@ -25,19 +25,14 @@
 """System-related functions"""
 
 # Standard packages
+# note: modules needed only by a few functions are imported when used (e.g., inspect and pickle)
 from collections import defaultdict, OrderedDict
-import datetime
 ## OLD: import importlib_metadata
-import inspect
 import os
-import pickle
 import re
 import sys
 import time
 
-# Installed packages
-import six
-
 # Local packages
 from mezcla import debug
 from mezcla.debug import UTF8
@@ -45,8 +40,8 @@ from mezcla.debug import UTF8
 ## DEBUG: sys.stderr.write(f"{__file__=}\n")
 
 # Constants
-STRING_TYPES = six.string_types
-MAX_SIZE = six.MAXSIZE
+STRING_TYPES = (str,)                   # note: same as six.string_types under Python 3
+MAX_SIZE = sys.maxsize
 MAX_INT = MAX_SIZE
 TEMP_DIR = None
 
@@ -67,22 +62,70 @@ def maxint():
 # Support for environment variable access
 # TODO: Put in separate module
 
+# Note:
+# - This is the single registry for environment options (e.g., tpo_common uses it as well).
+# - Parsed values for the typed getenv_xyz variants are cached in env_values by
+#   (function, var, default), along with the raw text, so that a changed
+#   environment value is noticed. The descriptions are cached in env_descriptions
+#   until another option is registered.
+# - After freeze_env_options, the cached values are used without rechecking the
+#   environment (n.b., os.environ.get is relatively slow for unset variables),
+#   except for variables changed via setenv.
 env_options = {}
 env_defaults = {}
+env_values = {}
+env_descriptions = {}
+env_option_snapshot = None
+env_options_frozen = False
 #
 def register_env_option(var, description, default):
     """Register environment VAR as option with DESCRIPTION and DEFAULT"""
     # Note: The default value is typically the default value passes into the
     # getenv_xyz call, not the current value from the environment.
-    debug.trace_fmt(7, "register_env_option({v}, {dsc}, {dft})",
-                    v=var, dsc=description, dft=default)
+    if debug.trace_level >= 7:
+        debug.trace_fmt(7, "register_env_option({v}, {dsc}, {dft})",
+                        v=var, dsc=description, dft=default)
     global env_options
     global env_defaults
-    env_options[var] = description
-    env_defaults[var] = default
+    global env_option_snapshot
+    if ((var not in env_options) or (env_options[var] != description)
+            or (env_defaults[var] is not default)):
+        env_options[var] = description
+        env_defaults[var] = default
+        if env_descriptions or (env_option_snapshot is not None):
+            env_descriptions.clear()
+            env_option_snapshot = None
     return
 
 
+def check_env_descriptions():
+    """Clear the cached option descriptions if the registry was replaced (e.g., by tests)"""
+    registry = env_descriptions.get("registry")
+    if ((registry is None) or (registry[0] is not env_options) or (registry[1] is not env_defaults)):
+        env_descriptions.clear()
+        env_descriptions["registry"] = (env_options, env_defaults)
+    return
+
+
+def freeze_env_options(indent="\t", frozen=True):
+    """Precompute the environment option registry into env_option_snapshot, a read-only mapping from option name to (description, default)
+    Notes:
+    - The sorted descriptions using INDENT are precomputed as well (e.g., for usage); registering a new option invalidates the snapshot.
+    - If FROZEN, cached getenv_bool/number/int values are reused without checking the environment (use False to undo).
+    """
+    global env_option_snapshot
+    global env_options_frozen
+    env_options_frozen = frozen
+    if env_option_snapshot is None:
+        # note: types only needed here
+        import types                    # pylint: disable=import-outside-toplevel
+        formatted_environment_option_descriptions(sort=True, indent=indent)
+        env_option_snapshot = types.MappingProxyType(
+            {var: (env_options[var], env_defaults[var]) for var in env_options})
+        debug.trace(5, f"freeze_env_options(): {len(env_option_snapshot)} options")
+    return env_option_snapshot
+
+
 def get_registered_env_options():
     """Returns list of environment options registered via register_env_option"""
     ## TEMP
@@ -107,6 +150,10 @@ def get_environment_option_descriptions(include_all=None, include_default=None,
         include_default = True
     if not include_default:
         indent = ''
+    check_env_descriptions()
+    cache_key = ("list", include_all, include_default, indent)
+    if cache_key in env_descriptions:
+        return list(env_descriptions[cache_key])
     #
     def _format_env_option(opt):
         """Returns OPT description and optionally default value (if INCLUDE_DEFAULT)"""
@@ -133,11 +180,18 @@ def get_environment_option_descriptions(include_all=None, include_default=None,
     option_descriptions = [_format_env_option(opt) for opt in env_options if (env_options[opt] or include_all)]
     debug.trace_fmt(5, "get_environment_option_descriptions() => {od}",
                     od=option_descriptions)
+    env_descriptions[cache_key] = tuple(option_descriptions)
     return option_descriptions
 
 
 def formatted_environment_option_descriptions(sort=False, include_all=None, indent="\t"):
     """Returns string list of environment options and their descriptions (separated by newlines and tabs), optionally SORTED"""
+    if include_all is None:
+        include_all = debug.verbose_debugging()
+    check_env_descriptions()
+    cache_key = ("text", sort, include_all, indent)
+    if cache_key in env_descriptions:
+        return env_descriptions[cache_key]
     option_info = get_environment_option_descriptions(include_all)
     if sort:
         option_info = sorted(option_info)
@@ -145,6 +199,7 @@ def formatted_environment_option_descriptions(sort=False, include_all=None, inde
     descriptions = entry_separator.join(["%s%s%s" % (opt, indent, (desc if desc else "n/a")) for (opt, desc) in option_info])
     debug.trace_fmt(6, "formatted_environment_option_descriptions() => {d}",
                     d=descriptions)
+    env_descriptions[cache_key] = descriptions
     return descriptions
 
 
@@ -165,6 +220,9 @@ def setenv(var, value, normalize=False):
     if normalize:
         var = var.replace("-", "_").upper()
     os.environ[var] = str(value)
+    if env_options_frozen:
+        for key in [k for k in env_values if (k[1] == var)]:
+            del env_values[key]
     return
 
 
@@ -184,14 +242,16 @@ def getenv_text(var, default=None, description=None, desc=None, helper=False, up
     text_value = os.getenv(var)
     ## TODO?: if ((not helper and (text_value is None)) or (not text_value)):
     if (text_value is None):
-        debug.trace_fmtd(6, "getenv_text: no value for var {v}", v=var)
+        if debug.trace_level >= 6:
+            debug.trace_fmtd(6, "getenv_text: no value for var {v}", v=var)
         text_value = default
     if update:
         setenv(var, text_value, normalize=True)
     trace_level = 6 if helper else 5
     ## DEBUG: sys.stderr.write("debug.trace_fmtd({trace_level} \"getenv_text('{v}', [def={dft}], [desc={desc}], [helper={hlpr}]) => {r}\"".format(trace_level=trace_level, v=var, dft=default, desc=description, hlpr=helper, r=text_value))
-    debug.trace_fmtd(trace_level, "getenv_text('{v}', [def={dft}], [desc={desc}], [helper={hlpr}]) => {r}",
-                     v=var, dft=default, desc=description, hlpr=helper, r=text_value)
+    if debug.trace_level >= trace_level:
+        debug.trace_fmtd(trace_level, "getenv_text('{v}', [def={dft}], [desc={desc}], [helper={hlpr}]) => {r}",
+                         v=var, dft=default, desc=description, hlpr=helper, r=text_value)
     return (text_value)
 
 
@@ -203,11 +263,35 @@ def getenv_value(var, default=None, description=None, desc=None, update=None):
     if update:
         setenv(var, value, normalize=True)
     # note: uses !r for repr()
-    debug.trace_fmtd(5, "getenv_value({v!r}, [def={dft!r}], [desc={dsc!r}]]) => {val!r}",
-                     v=var, dft=default, dsc=(description or desc), val=value)
+    if debug.trace_level >= 5:
+        debug.trace_fmtd(5, "getenv_value({v!r}, [def={dft!r}], [desc={dsc!r}]]) => {val!r}",
+                         v=var, dft=default, dsc=(description or desc), val=value)
     return (value)
 
 
+NO_ENV_VALUE = object()
+#
+def get_cached_env_value(key):
+    """Return parsed value cached for KEY (function, var, default, ...) if the environment text is unchanged, otherwise NO_ENV_VALUE"""
+    # note: unhashable defaults (e.g., lists) are not cached
+    try:
+        (text, value) = env_values[key]
+    except (KeyError, TypeError):
+        return NO_ENV_VALUE
+    if env_options_frozen:
+        return value
+    return (value if (os.environ.get(key[1]) == text) else NO_ENV_VALUE)
+
+
+def cache_env_value(key, value):
+    """Cache parsed VALUE for KEY (function, var, default, ...) along with current environment text"""
+    try:
+        env_values[key] = (os.environ.get(key[1]), value)
+    except TypeError:
+        pass
+    return value
+
+
 DEFAULT_GETENV_BOOL = False
 #
 def getenv_bool(var, default=DEFAULT_GETENV_BOOL, description=None, desc=None, update=None):
@@ -218,13 +302,20 @@ def getenv_bool(var, default=DEFAULT_GETENV_BOOL, description=None, desc=None, u
     """
     # EX: getenv_bool("bad env var", None) => False
     # TODO: * Add debugging sanity checks for type of default to help diagnose when incorrect getenv_xyz variant used (e.g., getenv_int("USE_FUBAR", False) => ... getenv_bool)!
+    cache_key = ("bool", var, default, type(default))
+    bool_value = (get_cached_env_value(cache_key) if (not update) else NO_ENV_VALUE)
+    if bool_value is not NO_ENV_VALUE:
+        register_env_option(var, description or desc, default)
+        if debug.trace_level >= 5:
+            debug.trace_fmtd(5, "getenv_bool({v}, {d}) => {r} [cached]", v=var, d=default, r=bool_value)
+        return bool_value
     bool_value = default
     value_text = getenv_value(var, description=description, desc=desc, default=default, update=update)
     if (isinstance(value_text, str) and value_text.strip()):
         bool_value = to_bool(value_text)
     debug.trace_fmtd(5, "getenv_bool({v}, {d}) => {r}",
                      v=var, d=default, r=bool_value)
-    return (bool_value)
+    return cache_env_value(cache_key, bool_value)
 #
 getenv_boolean = getenv_bool
 
@@ -233,6 +324,13 @@ def getenv_number(var, default=-1.0, description=None, desc=None, helper=False,
     """Returns number based on environment VAR (or DEFAULT value), with optional DESCRIPTION and env. UPDATE"""
     # TODO: def getenv_number(...) -> Optional(float):
     # Note: use getenv_int or getenv_float for typed variants
+    cache_key = ("number", var, default, type(default))
+    num_value = (get_cached_env_value(cache_key) if (not update) else NO_ENV_VALUE)
+    if num_value is not NO_ENV_VALUE:
+        register_env_option(var, description or desc, default)
+        if debug.trace_level >= 5:
+            debug.trace_fmtd(5, "getenv_number({v}, {d}) => {r} [cached]", v=var, d=default, r=num_value)
+        return num_value
     num_value = default
     value = getenv_value(var, description=description, desc=desc, default=default, update=update)
     if (isinstance(value, str) and value.strip()):
@@ -241,7 +339,7 @@ def getenv_number(var, default=-1.0, description=None, desc=None, helper=False,
     trace_level = 6 if helper else 5
     debug.trace_fmtd(trace_level, "getenv_number({v}, {d}) => {r}",
                      v=var, d=default, r=num_value)
-    return (num_value)
+    return cache_env_value(cache_key, num_value)
 #
 getenv_float = getenv_number
 
@@ -252,13 +350,20 @@ def getenv_int(var, default=-1, description=None, desc=None, allow_none=False, u
     Note: Return is an integer unless ALLOW_NONE
     """
     # EX: getenv_int("?", 1.5) => 1
+    cache_key = ("int", var, default, type(default), allow_none)
+    value = (get_cached_env_value(cache_key) if (not update) else NO_ENV_VALUE)
+    if value is not NO_ENV_VALUE:
+        register_env_option(var, description or desc, default)
+        if debug.trace_level >= 5:
+            debug.trace_fmtd(5, "getenv_int({v}, {d}) => {r} [cached]", v=var, d=default, r=value)
+        return value
     value = getenv_number(var, description=description, desc=desc, default=default, helper=True, update=update)
     if (not isinstance(value, int)):
         if ((value is not None) or allow_none):
             value = to_int(value)
     debug.trace_fmtd(5, "getenv_int({v}, {d}) => {r}",
                      v=var, d=default, r=value)
-    return (value)
+    return cache_env_value(cache_key, value)
 #
 getenv_integer = getenv_int
 
@@ -352,6 +457,7 @@ def print_full_stack(stream=sys.stderr):
     # TODO: Fix off-by-one error in display of offending statement!
     debug.trace_fmtd(7, "print_full_stack(stream={s})", s=stream)
     stream.write("Traceback (most recent call last):\n")
+    import inspect                      # pylint: disable=import-outside-toplevel
     try:
         # Note: Each tuple has the form (frame, filename, line_number, function, context, index)
         item = None
@@ -382,6 +488,7 @@ def trace_stack(level=debug.VERBOSE, stream=sys.stderr):
 def get_current_function_name():
     """Returns name of current function that is running"""
     function_name = "???"
+    import inspect                      # pylint: disable=import-outside-toplevel
     try:
         current_frame = inspect.stack()[1]
         function_name = current_frame[3]
@@ -404,8 +511,8 @@ def open_file(filename, /, mode="r", *, encoding=None, errors=None, **kwargs):
         encoding = "UTF-8"
     if (encoding and (errors is None)):
         errors = 'ignore'
-    if kwargs.get(ENCODING) is None:
-        kwargs[ENCODING] = encoding
+    if kwargs.get("encoding") is None:
+        kwargs["encoding"] = encoding
     result = None
     try:
         # pylint: disable=consider-using-with; note: bogus 'Bad option value' warning
@@ -423,6 +530,7 @@ def save_object(file_name, obj):
     # Note: The data file is created in binary mode to avoid quirk under Windows.
     # See https://stackoverflow.com/questions/556269/importerror-no-module-named-copy-reg-pickle.
     debug.trace_fmtd(6, "save_object({f}, _)", f=file_name)
+    import pickle                       # pylint: disable=import-outside-toplevel
     try:
         with open(file_name, mode='wb') as f:
             pickle.dump(obj, f)
@@ -437,6 +545,7 @@ def load_object(file_name, ignore_error=False):
     # Note: Reads in binary mode to avoid unicode decode error. See
     #    https://stackoverflow.com/questions/32957708/python-pickle-error-unicodedecodeerror
     obj = None
+    import pickle                       # pylint: disable=import-outside-toplevel
     try:
         with open(file_name, mode='rb') as f:
             try:
@@ -808,6 +917,7 @@ def get_file_modification_time(filename, as_float=False):
     if file_exists(filename):
         mod_time = os.path.getmtime(filename)
         if not as_float:
+            import datetime             # pylint: disable=import-outside-toplevel
             mod_time = str(datetime.datetime.fromtimestamp(mod_time))
     debug.trace_fmtd(5, "get_file_modification_time({f}) => {t}", f=filename, t=mod_time)
     return mod_time
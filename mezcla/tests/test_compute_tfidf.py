@@ -132,6 +132,18 @@ class TestComputeTfidf(TestWrapper):
         assert THE_MODULE.is_subsumed("White House", ["The White House", "Congress", "Supreme Court"])
         assert THE_MODULE.is_subsumed("White House", ["White Houses"])
 
+    def test_stream_csv_documents(self):
+        """Ensure stream_csv_documents combines rows for same ID"""
+        debug.trace(4, "test_stream_csv_documents()")
+        data_file = self.create_temp_file("a,first\na,second\nb,third\na,fourth\n")
+        doc_filenames = {}
+        late_texts = {}
+        docs = list(THE_MODULE.stream_csv_documents(data_file, doc_filenames=doc_filenames,
+                                                    late_texts=late_texts))
+        assert docs == [("a", "first second"), ("b", "third")]
+        assert late_texts == {"a": ["fourth"]}
+        assert doc_filenames["a"] == f"{data_file}:4"
+
     @pytest.mark.xfail                   # TODO: remove xfail
     ## DEBUG: @trap_exception            # TODO: remove when debugged
     def test_data_file(self):
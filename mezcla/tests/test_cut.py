@@ -21,6 +21,7 @@ import pytest
 from mezcla import debug
 from mezcla.unittest_wrapper import TestWrapper
 from mezcla import glue_helpers as gh
+from mezcla import system
 
 # Note: Two references are used for the module to be tested:
 #    THE_MODULE:	    global module object
@@ -47,6 +48,34 @@ class TestCutUtils:
         debug.trace(4, "test_flatten_list_of_strings()")
         assert THE_MODULE.flatten_list_of_strings([["l1i1", "l1i2"], ["l2i1"]]) == ["l1i1", "l1i2", "l2i1"]
 
+    def test_row_shape_stats(self):
+        """Ensure RowShapeStats tracks dimensions, field counts and ragged lines"""
+        debug.trace(4, "test_row_shape_stats()")
+        stats = THE_MODULE.RowShapeStats(max_ragged_lines=2)
+        stats.add_rows([0, 3, 3], 1)
+        stats.add_rows([3, 3], 4)
+        stats.add_row(2, 6)
+        stats.add_rows([3, 4, 0, 1], 8)
+        assert (stats.num_rows, stats.num_cols) == (10, 3)
+        assert stats.field_counts == {0: 2, 1: 1, 2: 1, 3: 5, 4: 1}
+        assert stats.num_ragged == 3
+        assert stats.ragged_lines == [6, 9]
+
+    def test_record_boundaries_small_blocks(self, tmp_path, monkeypatch):
+        """Ensure quote parity is even at each boundary when quotes are counted over many blocks"""
+        debug.trace(4, "test_record_boundaries_small_blocks()")
+        data_file = str(tmp_path / "quoted.csv")
+        text = "".join(f'"{i}","a\n""b""",c\n' for i in range(200))
+        system.write_file(data_file, text, skip_newline=True)
+        data = text.encode()
+        for block_size in [1, 2, 3, 16]:
+            monkeypatch.setattr(THE_MODULE, "COUNT_BLOCK_SIZE", block_size)
+            boundaries = THE_MODULE.find_record_boundaries(data_file, 7, quotechar='"')
+            assert len(boundaries) == 8
+            for offset in boundaries[1:-1]:
+                assert data[offset - 1: offset] == b"\n"
+                assert (data[:offset].count(b'"') % 2) == 0
+
 class TestCutScript(TestWrapper):
     """Class for testcase definition"""
     script_file = TestWrapper.get_module_file_path(__file__)
@@ -73,6 +102,45 @@ class TestCutScript(TestWrapper):
         assert script_output
         assert script_output + '\n' == gh.read_file(FIELDS_2_3_4)
 
+    def test_fast_path(self):
+        """Ensure str.split engine agrees with csv module one (e.g., for lines with quotes)"""
+        debug.trace(4, "test_fast_path()")
+        data_file = self.temp_file + ".data"
+        for (options, text) in [
+                ("--fields 3,1", 'a\tb\tc\n\nd\te\n"q"\tback\\slash\tf\ng\th\ti\r\nj\tk\tl'),
+                ("--csv --all-fields --convert-delim", 'a,b,c\n"multi\nline, ""x""",d,e\nf,g,h\n'),
+                ("--fields 2 --output-csv", 'a\tx"y\nb\tc d\n')]:
+            with open(data_file, "w", encoding="UTF-8", newline="") as f:
+                f.write(text)
+            csv_output = self.run_script(options=options, data_file=data_file, env_options="CUT_FAST_PATH=0")
+            fast_output = self.run_script(options=options, data_file=data_file, env_options="CUT_FAST_PATH=1")
+            assert fast_output
+            assert fast_output == csv_output
+
+    def test_workers(self):
+        """Ensure byte ranges processed by --workers agree with serial extraction (e.g., for quoted newlines)"""
+        debug.trace(4, "test_workers()")
+        data_file = self.temp_file + ".data"
+        for (options, text) in [
+                ("--fields 3,1", "".join(f"a{i}\tb{i}\tc{i}\n" for i in range(50))),
+                ("--csv --all-fields", "".join(f'a{i},"b\n""{i}""\n",c{i}\n' for i in range(50))),
+                ("--fields 2 --csv --convert-delim", "".join(f'"x,{i}","y\n{i}"\n' for i in range(50)))]:
+            system.write_file(data_file, text, skip_newline=True)
+            serial_output = self.run_script(options=options, data_file=data_file)
+            parallel_output = self.run_script(options=f"{options} --workers 3", data_file=data_file,
+                                              env_options="CUT_MIN_RANGE_BYTES=1")
+            assert parallel_output
+            assert parallel_output == serial_output
+
+    def test_find_record_boundaries(self):
+        """Ensure byte ranges are split at newlines outside of quotes"""
+        debug.trace(4, "test_find_record_boundaries()")
+        data_file = self.temp_file + ".csv"
+        system.write_file(data_file, 'a,"b\nc",d\ne,f,g\n"h""\ni",j,k\nl,m,n\n', skip_newline=True)
+        assert THE_MODULE.find_record_boundaries(data_file, 5, quotechar='"') == [0, 10, 16, 28, 34]
+        assert THE_MODULE.find_record_boundaries(data_file, 5) == [0, 10, 16, 21, 28, 34]
+        assert THE_MODULE.find_record_boundaries(data_file, 1) == [0, 34]
+
 
 if __name__ == '__main__':
     debug.trace_current_context()
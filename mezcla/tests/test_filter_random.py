@@ -75,6 +75,57 @@ class TestFilterRandom(TestWrapper):
         self.setUp()
         return self.run_data_file_test(1.0, self.temp_file, temp_file_contents)
 
+    def test_reservoir_sampler(self):
+        """Makes sure reservoir sample has exact size and is in input order"""
+        debug.trace(4, f"TestFilterRandom.test_reservoir_sampler({self})")
+        sampler = THE_MODULE.ReservoirSampler(5)
+        for start in range(0, 1000, 7):
+            sampler.add_items(list(range(start, min(start + 7, 1000))))
+        sample = sampler.sample()
+        assert len(set(sample)) == 5
+        assert sample == sorted(sample)
+        assert all((0 <= n < 1000) for n in sample)
+        sampler = THE_MODULE.ReservoirSampler(20)
+        sampler.add_items(["a", "b"])
+        assert sampler.sample() == ["a", "b"]
+
+    def test_stratified_sample(self):
+        """Makes sure stratified sample keeps proportions of key values"""
+        debug.trace(4, f"TestFilterRandom.test_stratified_sample({self})")
+        assert THE_MODULE.allocate_sample({"a": 6, "b": 3, "c": 1}, 5) == {"a": 3, "b": 2, "c": 0}
+        lines = [f"{i}\t{'x' if (i % 4) else 'y'}" for i in range(400)]
+        get_key = lambda line: line.split("\t")[1]
+        sample = list(THE_MODULE.stratified_sample(lambda: iter(lines), get_key, ratio=0.1))
+        assert len(sample) == 40
+        assert sum(1 for line in sample if get_key(line) == "y") == 10
+        assert sample == [line for line in lines if line in sample]
+
+    def test_seek_sample(self):
+        """Makes sure sampling via byte offsets returns distinct lines in file order"""
+        debug.trace(4, f"TestFilterRandom.test_seek_sample({self})")
+        data = [f"line {i}" for i in range(500)]
+        gh.write_lines(self.temp_file, data)
+        for num_prefix_lines in [10, 1000]:
+            sample = THE_MODULE.seek_sample(self.temp_file, count=20, num_prefix_lines=num_prefix_lines)
+            assert len(set(sample)) == 20
+            assert sample == [line for line in data if line in sample]
+        sample = THE_MODULE.seek_sample(self.temp_file, count=499, skip_header=True)
+        assert sample == data[1:]
+
+    def test_seek_sample_short_line(self):
+        """Makes sure a short line at start of file doesn't keep seek_sample from getting enough lines"""
+        debug.trace(4, f"TestFilterRandom.test_seek_sample_short_line({self})")
+        gh.write_lines(self.temp_file, [""] + [f"{i:05d}" + ("x" * 300) for i in range(5000)])
+        sample = THE_MODULE.seek_sample(self.temp_file, count=200)
+        assert len(set(sample)) == 200
+
+    def test_reservoir_sampler_empty(self):
+        """Makes sure reservoir of size 0 samples nothing"""
+        debug.trace(4, f"TestFilterRandom.test_reservoir_sampler_empty({self})")
+        sampler = THE_MODULE.ReservoirSampler(0)
+        sampler.add_items(["a", "b"])
+        assert sampler.sample() == []
+
 #------------------------------------------------------------------------
 
 if __name__ == '__main__':
@@ -422,6 +422,18 @@ class TestFormatProfile(TestWrapper):
         assert (SAMPLE_OUTPUT[0] not in output and SAMPLE_OUTPUT[1] in output)
         return
 
+    def test_formatprofile_json(self):
+        "Ensures that JSON profiles from debug.py (via PROFILE_FILE) can be formatted"
+        debug.trace(4, f"test_formatprofile_json(); self={self}")
+        testing_script = gh.form_path(gh.dir_path(THE_MODULE.__file__), "simple_main_example.py")
+        profile_data = self.temp_file + "-profile.json"
+        gh.run(f"PROFILE_FILE={profile_data} PROFILE_SAMPLE_MS=1 python {testing_script} {testing_script}")
+        output = self.run_script(env_options="PROFILE_KEY=calls", data_file=profile_data)
+        assert "Ordered by: call count" in output
+        assert my_re.search(r"main.py:\d+\(process_input\)", output)
+        assert "Sampled call stacks" in output
+        return
+
 if __name__ == '__main__':
     debug.trace_current_context()
     pytest.main([__file__])
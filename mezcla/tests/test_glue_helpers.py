@@ -175,6 +175,36 @@ class TestGlueHelpers(TestWrapper):      ## TODO: (TestWrapper)
         debug.trace(4, "test_run()")
         assert "root" in THE_MODULE.run("ls /")
 
+    def test_run_command(self):
+        """Ensure run_command uses per-call environment without modifying os.environ"""
+        debug.trace(4, "test_run_command()")
+        self.monkeypatch.delenv('RUN_COMMAND_VAR', raising=False)
+        result = THE_MODULE.run_command("echo $RUN_COMMAND_VAR; echo oops >&2", env={'RUN_COMMAND_VAR': 123})
+        assert (result.returncode, result.stdout, result.stderr) == (0, "123\n", "oops\n")
+        assert 'RUN_COMMAND_VAR' not in os.environ
+        # note: argv lists (or shell=False) bypass the shell
+        assert THE_MODULE.run_command(["echo", "$HOME"]).stdout == "$HOME\n"
+        assert THE_MODULE.run_command("echo 'a  b'", shell=False).stdout == "a  b\n"
+        assert THE_MODULE.run_command("cat", input_text="in\n").stdout == "in\n"
+        assert THE_MODULE.run_command("exit 3").returncode == 3
+        with pytest.raises(Exception, match="timed out"):
+            THE_MODULE.run_command(["sleep", "5"], timeout=0.1)
+
+    def test_run_many(self):
+        """Ensure run_many returns results in order"""
+        debug.trace(4, "test_run_many()")
+        commands = [f"sleep 0.{(5 - i) % 3}; echo {i}" for i in range(5)]
+        results = THE_MODULE.run_many(commands, max_workers=3)
+        assert [r.stdout for r in results] == [f"{i}\n" for i in range(5)]
+
+    def test_run_via_bash(self):
+        """Ensure run_via_bash supports aliases without a temporary script"""
+        debug.trace(4, "test_run_via_bash()")
+        command = "alias hey='echo hey'\nhey there; ls /fubar-does-not-exist"
+        output = THE_MODULE.run_via_bash(command, enable_aliases=True)
+        assert output.startswith("hey there\n")
+        assert "fubar-does-not-exist" in output
+
     def test_issue(self):
         """Ensure issue works as expected"""
         debug.trace(4, "test_issue()")
@@ -0,0 +1,105 @@
+#! /usr/bin/env python
+#
+# Import-time regression benchmark for the core modules used by Main-based scripts
+#
+# Notes:
+# - The imports are done in a separate process via python -X importtime, so that
+#   modules already loaded by pytest don't affect the results.
+# - Modules only needed for special cases (e.g., inspect for stack traces) are
+#   imported when used: see the notes under "Standard packages" in debug.py.
+# - The time budget is generous to avoid spurious failures on loaded machines:
+#   the check for deferred modules is the main regression test. Use
+#   IMPORT_TIME_BUDGET_MS for a tighter check.
+# - This can be run as follows:
+#   $ PYTHONPATH=".:$PYTHONPATH" python ./mezcla/tests/test_import_time.py
+#
+
+"""Import-time regression benchmark"""
+
+# Standard modules
+import os
+import subprocess
+import sys
+
+# Installed modules
+import pytest
+
+# Local modules
+from mezcla import debug
+from mezcla import system
+
+# Constants
+CORE_MODULES = ["mezcla.main", "mezcla.cut"]
+DEFERRED_MODULES = ["ast", "datetime", "inspect", "logging", "multiprocessing", "pandas",
+                    "pickle", "pprint", "requests", "six", "subprocess"]
+IMPORT_TIME_BUDGET_MS = system.getenv_int(
+    "IMPORT_TIME_BUDGET_MS", 250,
+    description="Maximum milliseconds for importing the core modules")
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def run_python(*args):
+    """Run python with ARGS in a new process with the repo in the path, returning (stdout, stderr)"""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([REPO_DIR, env.get("PYTHONPATH", "")])
+    env["DEBUG_LEVEL"] = "0"
+    result = subprocess.run([sys.executable] + list(args), capture_output=True, text=True,
+                            env=env, check=True)
+    return (result.stdout, result.stderr)
+
+
+def get_new_modules(module):
+    """Return set of top-level modules newly loaded by importing MODULE"""
+    code = ("import sys; base = set(sys.modules); "
+            f"import {module}; "
+            "print(' '.join(sorted(set(sys.modules) - base)))")
+    (stdout, _stderr) = run_python("-c", code)
+    return {m.split(".")[0] for m in stdout.split()}
+
+
+def get_import_time_ms(module):
+    """Return cumulative milliseconds to import MODULE (via python -X importtime)"""
+    (_stdout, stderr) = run_python("-X", "importtime", "-c", f"import {module}")
+    # note: lines have the form "import time: self [us] | cumulative | imported package"
+    result = None
+    for line in stderr.splitlines():
+        fields = [f.strip() for f in line.split("|")]
+        if (len(fields) == 3) and (fields[2] == module):
+            result = int(fields[1]) / 1000
+    debug.trace(4, f"get_import_time_ms({module}) => {result}")
+    return result
+
+
+class TestImportTime:
+    """Class for testcase definition"""
+
+    @pytest.mark.parametrize("module", CORE_MODULES)
+    def test_deferred_modules(self, module):
+        """Make sure MODULE doesn't load modules that are only needed for special cases"""
+        debug.trace(4, f"test_deferred_modules({module})")
+        loaded = get_new_modules(module).intersection(DEFERRED_MODULES)
+        assert not loaded
+
+    @pytest.mark.parametrize("module", CORE_MODULES)
+    def test_import_time_budget(self, module):
+        """Make sure MODULE imports within IMPORT_TIME_BUDGET_MS (best of 3)"""
+        debug.trace(4, f"test_import_time_budget({module})")
+        # note: first run ensures the bytecode is cached (if writable)
+        times = [get_import_time_ms(module) for _i in range(4)][1:]
+        debug.trace_expr(3, module, times)
+        assert min(times) < IMPORT_TIME_BUDGET_MS
+
+    def test_lazy_helpers(self):
+        """Make sure deferred imports still work when needed"""
+        debug.trace(4, "test_lazy_helpers()")
+        code = ("from mezcla import debug, system; "
+                "print(system.get_current_function_name(), "
+                "bool(debug.timestamp()), system.MAX_SIZE == sys.maxsize)")
+        (stdout, _stderr) = run_python("-c", "import sys; " + code)
+        assert stdout.split() == ["<module>", "True", "True"]
+
+#------------------------------------------------------------------------
+
+if __name__ == '__main__':
+    debug.trace_current_context()
+    pytest.main([__file__])
@@ -14,6 +14,7 @@
 # Standard packages
 from argparse import ArgumentParser
 import io
+import random
 import sys
 
 # Installed packages
@@ -234,6 +235,169 @@ class TestMain2:
         debug.trace_expr(5, main, num_lines)
         debug.trace(5, "out test_missing_newline")
 
+    @pytest.mark.parametrize("read_hint", [0, 7, 65536])
+    def test_line_batches(self, monkeypatch, read_hint):
+        """Make sure lines read via fast path and batches agree with regular line splitting"""
+        debug.trace(4, f"in test_line_batches({read_hint}); self={self}")
+        monkeypatch.setattr(THE_MODULE, "READ_LINES_HINT", read_hint)
+        contents = "1\n\n22\nthree 3\n\n" + ("x" * 20) + "\nlast"
+
+        class LineCollector(THE_MODULE.Main):
+            """Main class saving processed lines"""
+            lines = []
+            def process_line(self, line):
+                self.lines.append(line)
+
+        class BatchCollector(LineCollector):
+            """Main class saving processed lines in batches"""
+            num_batches = 0
+            def process_lines(self, lines):
+                self.num_batches += 1
+                self.lines.extend(lines)
+
+        for main_class in [LineCollector, BatchCollector]:
+            main = main_class(runtime_args=["-"], skip_input=True, manual_input=True)
+            main.lines = []
+            main.input_stream = io.StringIO(contents)
+            main.process_input()
+            assert main.lines == contents.split("\n")
+            assert main.line_num == len(main.lines)
+            assert main.char_offset == len(contents)
+            assert main.raw_line == "last"
+        assert main.num_batches >= 1
+
+    def test_interactive_line_batches(self):
+        """Make sure batches for interactive input aren't read via blocking chunks"""
+        debug.trace(4, f"in test_interactive_line_batches(); self={self}")
+
+        class TerminalInput(io.StringIO):
+            """Input stream acting as terminal, without support for chunks"""
+            def isatty(self):
+                return True
+            def read(self, size=-1):
+                raise AssertionError(f"chunk of {size} read from terminal")
+
+        main = THE_MODULE.Main(runtime_args=["-"], skip_input=True, manual_input=True)
+        main.input_stream = TerminalInput("a\nb\n")
+        assert list(main.read_line_batches()) == [["a"], ["b"]]
+
+    @pytest.mark.parametrize("batched", [False, True])
+    def test_multiple_input_files(self, tmp_path, batched):
+        """Make sure multiple input files are read in order, including compressed ones"""
+        debug.trace(4, f"in test_multiple_input_files({batched}); self={self}")
+        # pylint: disable=import-outside-toplevel
+        import bz2
+        import gzip
+        (tmp_path / "a.txt").write_text("a1\na2")
+        with gzip.open(tmp_path / "b.txt.gz", "wt") as f:
+            f.write("b1\n\nb2\n")
+        with bz2.open(tmp_path / "c.txt.bz2", "wt") as f:
+            f.write("c1\n")
+        filenames = [str(tmp_path / f) for f in ["a.txt", "b.txt.gz", "c.txt.bz2"]]
+
+        class LineCollector(THE_MODULE.Main):
+            """Main class saving processed lines"""
+            lines = []
+            def process_line(self, line):
+                self.lines.append(line)
+
+        class BatchCollector(LineCollector):
+            """Main class saving processed lines in batches"""
+            def process_lines(self, lines):
+                self.lines.extend(lines)
+
+        main_class = (BatchCollector if batched else LineCollector)
+        main = main_class(runtime_args=filenames, multiple_files=True)
+        main.lines = []
+        main.init_input()
+        main.process_input()
+        assert main.lines == ["a1", "a2", "b1", "", "b2", "c1"]
+        main = main_class(runtime_args=filenames, multiple_files=True, paragraph_mode=True)
+        main.lines = []
+        main.init_input()
+        main.process_input()
+        assert main.lines == ["a1\na2\nb1\n", "b2\nc1"]
+
+    def test_multiple_input_files_by_line(self, tmp_path, monkeypatch):
+        """Make sure multiple input files are iterated a line at a time if READ_LINES_HINT is 0"""
+        debug.trace(4, f"in test_multiple_input_files_by_line(); self={self}")
+        monkeypatch.setattr(THE_MODULE, "READ_LINES_HINT", 0)
+        (tmp_path / "a.txt").write_text("a1\na2")
+        (tmp_path / "b.txt").write_text("b1\n")
+        def no_readlines(hint=-1):
+            raise AssertionError(f"readlines({hint}) used")
+        stream = THE_MODULE.MultiFileInput([str(tmp_path / "a.txt"), str(tmp_path / "b.txt")])
+        monkeypatch.setattr(stream, "readlines", no_readlines)
+        assert list(stream) == ["a1\n", "a2\n", "b1\n"]
+
+    @pytest.mark.parametrize("paragraph_mode", [False, True])
+    def test_process_input_parallel(self, monkeypatch, capsys, paragraph_mode):
+        """Make sure input processed via workers gives same output and state as serial processing"""
+        debug.trace(4, f"in test_process_input_parallel({paragraph_mode}); self={self}")
+        monkeypatch.setattr(THE_MODULE, "WORKER_BATCH_SIZE", 3)
+        contents = "".join(f"line {i}\n" + ("\n" if (i % 4 == 0) else "") for i in range(25))
+
+        class UnitCounter(THE_MODULE.Main):
+            """Main class with output per unit and count of units as state"""
+            count = 0
+            def process_line(self, line):
+                print(f"{self.line_num} {self.para_num}: {line.upper()}")
+                self.count += 1
+            def get_worker_state(self):
+                result = self.count
+                self.count = 0
+                return result
+            def merge_worker_state(self, state):
+                self.count += state
+
+        results = []
+        for workers in [1, 2]:
+            main = UnitCounter(runtime_args=["-"], skip_input=True, manual_input=True,
+                               paragraph_mode=paragraph_mode, workers=workers)
+            main.input_stream = io.StringIO(contents)
+            capsys.readouterr()
+            main.process_input()
+            results.append((capsys.readouterr().out, main.count))
+        assert results[0][1] == (7 if paragraph_mode else 32)
+        assert results[1] == results[0]
+
+    def test_workers_opt_in(self, monkeypatch, capsys):
+        """Make sure MAIN_WORKERS only applies to parallel_safe classes, that process_lines
+        forces serial processing, and that random numbers in workers are reproducible"""
+        debug.trace(4, f"in test_workers_opt_in(); self={self}")
+        monkeypatch.setattr(THE_MODULE, "MAIN_WORKERS", 4)
+        monkeypatch.setattr(THE_MODULE, "WORKER_BATCH_SIZE", 3)
+        contents = "".join(f"line {i}\n" for i in range(20))
+
+        class RandomPrinter(THE_MODULE.Main):
+            """Main class printing random number per line"""
+            parallel_safe = True
+            def process_line(self, line):
+                print(f"{line}: {random.random()}")
+
+        class BatchCollector(THE_MODULE.Main):
+            """Main class saving processed lines in batches"""
+            lines = []
+            def process_lines(self, lines):
+                self.lines.extend(lines)
+
+        assert THE_MODULE.Main(runtime_args=["-"], skip_input=True, manual_input=True).workers == 1
+        assert RandomPrinter(runtime_args=["-"], skip_input=True, manual_input=True).workers == 4
+        main = BatchCollector(runtime_args=["-"], skip_input=True, manual_input=True, workers=2)
+        main.input_stream = io.StringIO(contents)
+        main.process_input()
+        assert len(main.lines) == 20
+        outputs = []
+        for _i in range(2):
+            random.seed(7)
+            main = RandomPrinter(runtime_args=["-"], skip_input=True, manual_input=True)
+            main.input_stream = io.StringIO(contents)
+            capsys.readouterr()
+            main.process_input()
+            outputs.append(capsys.readouterr().out)
+        assert len(outputs[0].splitlines()) == 20
+        assert outputs[0] == outputs[1]
+
     def test_has_parsed_option_hack(self):
         """Make sure (temporarily hacked) has_parsed_option differs from has_parsed_option_old"""
         debug.trace(4, f"in test_has_parsed_option_hack(); self={self}")
@@ -79,6 +79,16 @@ class TestNgramTfidf(TestWrapper):
         self.do_assert(lap_dog_score_doc1 < lap_dawg_score_doc3)
         return
 
+    def test_ngram_token_index(self):
+        """Make sure token index returns ngrams sharing tokens in order"""
+        debug.trace(4, "test_ngram_token_index()")
+        index = THE_MODULE.ngram_token_index()
+        for ngram in ["new york city", "york river", "red bank", "new jersey"]:
+            index.add(f" {ngram} ")
+        assert index.candidates(" new york ") == [0, 1, 3]
+        assert index.candidates(" blue bank ") == [2]
+        assert not index.candidates(" green ")
+
     @pytest.mark.xfail                   # TODO: remove xfail
     ## DEBUG:
     @trap_exception
@@ -47,6 +47,39 @@ class TestRandomizeLines(TestWrapper):
         self.do_assert(tpo.is_subset(random_lines, data))
         return
 
+    def test_bucket_files(self):
+        """Ensure shuffling via temporary bucket files yields permutation of input"""
+        debug.trace(4, f"TestIt.test_bucket_files(); self={self}")
+        data = [f"line {l}" for l in range(1000)]
+        system.write_lines(self.temp_file, ["header"] + data)
+        output = self.run_script(options="--header", data_file=self.temp_file,
+                                 env_options="SHUFFLE_MEMORY_BUDGET=100 SHUFFLE_BUCKETS=4")
+        random_lines = output.splitlines()
+        assert random_lines[0] == "header"
+        assert random_lines[1:] != data
+        assert sorted(random_lines[1:]) == sorted(data)
+
+    def test_paragraph_mode(self):
+        """Ensure paragraphs are shuffled intact, including via bucket files"""
+        debug.trace(4, f"TestIt.test_paragraph_mode(); self={self}")
+        paragraphs = [f"para {p}\nwith \\n\nlines" for p in range(20)]
+        system.write_file(self.temp_file, "\n\n".join(paragraphs))
+        for budget in [1000000, 10]:
+            output = self.run_script(data_file=self.temp_file,
+                                     env_options=f"PARAGRAPH_MODE=1 SHUFFLE_MEMORY_BUDGET={budget}")
+            assert sorted(output.split("\n\n")) == sorted(paragraphs)
+
+    def test_partial_shuffle(self):
+        """Ensure partial_shuffle returns sample of distinct units"""
+        debug.trace(4, f"TestIt.test_partial_shuffle(); self={self}")
+        sample = THE_MODULE.partial_shuffle(list(range(100)), 10)
+        assert len(sample) == len(set(sample)) == 10
+        assert all((0 <= n < 100) for n in sample)
+        assert sorted(THE_MODULE.partial_shuffle(list(range(5)), 5)) == [0, 1, 2, 3, 4]
+        unit = "a\\b\nc\\n"
+        assert "\n" not in THE_MODULE.encode_unit(unit)
+        assert THE_MODULE.decode_unit(THE_MODULE.encode_unit(unit)) == unit
+
 
 if __name__ == '__main__':
     debug.trace_current_context()
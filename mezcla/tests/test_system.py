@@ -169,6 +169,44 @@ class TestSystem(TestWrapper):
         assert THE_MODULE.getenv_int('TEST_NUMBER', default=20) == 9
         assert THE_MODULE.getenv_int("REALLY FUBAR", 123) == 123
 
+    def test_getenv_value_cache(self):
+        """Ensure cached getenv_xyz values reflect environment changes and default types"""
+        debug.trace(4, "test_getenv_value_cache()")
+        self.monkeypatch.setenv('TEST_CACHED_NUMBER', '5', prepend=False)
+        assert THE_MODULE.getenv_int('TEST_CACHED_NUMBER', 1) == 5
+        assert THE_MODULE.getenv_int('TEST_CACHED_NUMBER', 1) == 5
+        self.monkeypatch.setenv('TEST_CACHED_NUMBER', '7', prepend=False)
+        assert THE_MODULE.getenv_int('TEST_CACHED_NUMBER', 1) == 7
+        self.monkeypatch.delenv('TEST_CACHED_NUMBER')
+        assert THE_MODULE.getenv_bool('TEST_CACHED_NUMBER', 1) == 1
+        assert THE_MODULE.getenv_bool('TEST_CACHED_NUMBER', True) is True
+        assert isinstance(THE_MODULE.getenv_number('TEST_CACHED_NUMBER', 2), int)
+        assert isinstance(THE_MODULE.getenv_number('TEST_CACHED_NUMBER', 2.0), float)
+
+    def test_freeze_env_options(self):
+        """Ensure freeze_env_options snapshot and frozen values work as expected"""
+        debug.trace(4, "test_freeze_env_options()")
+        self.monkeypatch.setattr(THE_MODULE, "env_options", {})
+        self.monkeypatch.setattr(THE_MODULE, "env_defaults", {})
+        self.monkeypatch.setattr(THE_MODULE, "env_option_snapshot", None)
+        self.monkeypatch.setenv('TEST_FROZEN_FLAG', '1', prepend=False)
+        assert THE_MODULE.getenv_bool('TEST_FROZEN_FLAG', False, desc="frozen flag")
+        try:
+            snapshot = THE_MODULE.freeze_env_options()
+            assert snapshot['TEST_FROZEN_FLAG'] == ("frozen flag", False)
+            assert 'frozen flag' in THE_MODULE.formatted_environment_option_descriptions(sort=True)
+            # note: cached value used until changed via setenv
+            self.monkeypatch.setenv('TEST_FROZEN_FLAG', '0', prepend=False)
+            assert THE_MODULE.getenv_bool('TEST_FROZEN_FLAG', False, desc="frozen flag")
+            THE_MODULE.setenv('TEST_FROZEN_FLAG', '0')
+            assert not THE_MODULE.getenv_bool('TEST_FROZEN_FLAG', False, desc="frozen flag")
+            # note: new option invalidates the snapshot and descriptions
+            THE_MODULE.getenv_text('TEST_FROZEN_TEXT', "n/a", desc="frozen text")
+            assert THE_MODULE.env_option_snapshot is None
+            assert 'frozen text' in THE_MODULE.formatted_environment_option_descriptions(sort=True)
+        finally:
+            THE_MODULE.freeze_env_options(frozen=False)
+
     def test_get_exception(self):
         """Ensure get_exception works as expected"""
         debug.trace(4, "test_get_exception()")
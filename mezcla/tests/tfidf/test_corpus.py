@@ -25,7 +25,128 @@ import mezcla.tfidf.corpus as THE_MODULE
 class TestTfidfCorpus:
     """Class for testcase definition"""
 
-    ## TODO: TESTS WORK-IN-PROGRESS
+    def new_corpus(self):
+        """Return bigram corpus with three simple documents"""
+        corpus = THE_MODULE.Corpus(gramsize=2)
+        corpus['doc1'] = 'Mary had a little lamb.'
+        corpus['doc2'] = 'Hannible is not a lamb.'
+        corpus['doc3'] = 'The shark sleeps a little.'
+        return corpus
+
+    def test_doc_occurrence_index(self):
+        """Make sure document frequency comes from incremental index"""
+        debug.trace(4, "test_doc_occurrence_index()")
+        corpus = self.new_corpus()
+        assert corpus.raw_doc_occurrences('a little') == 2
+        assert corpus.raw_doc_occurrences('little lamb') == 1
+        assert corpus.raw_doc_occurrences('not in corpus') == 0
+        assert corpus.max_raw_doc_occurrences == 2
+        assert round(corpus.max_rel_doc_frequency, 3) == 0.667
+
+    def test_document_replacement(self):
+        """Make sure index is updated when document replaced"""
+        debug.trace(4, "test_document_replacement()")
+        corpus = self.new_corpus()
+        corpus['doc3'] = 'The shark sleeps.'
+        assert corpus.raw_doc_occurrences('a little') == 1
+        assert corpus.raw_doc_occurrences('shark sleeps') == 1
+        assert corpus.max_raw_doc_occurrences == 1
+        corpus['doc4'] = 'A little shark sleeps.'
+        assert corpus.raw_doc_occurrences('shark sleeps') == 2
+        assert corpus.max_raw_doc_occurrences == 2
+
+    def test_keyword_cache(self):
+        """Make sure get_keywords cache is per-instance and invalidated upon change"""
+        debug.trace(4, "test_keyword_cache()")
+        corpus = self.new_corpus()
+        other_corpus = self.new_corpus()
+        keywords = corpus.get_keywords(document_id='doc1', limit=3)
+        assert corpus.get_keywords(document_id='doc1', limit=3) is keywords
+        assert corpus.cache.cache_info().hits == 1
+        assert corpus.cache.cache_info().misses == 1
+        assert other_corpus.cache.cache_info().currsize == 0
+        corpus['doc4'] = 'Mary had a little shark.'
+        assert corpus.cache.cache_info().currsize == 0
+        new_keywords = corpus.get_keywords(document_id='doc1', limit=3)
+        assert new_keywords is not keywords
+        assert [k.ngram for k in new_keywords][0] != [k.ngram for k in keywords][0]
+
+    def test_cache_size(self):
+        """Make sure cache_size limits entries (with LRU eviction)"""
+        debug.trace(4, "test_cache_size()")
+        corpus = THE_MODULE.Corpus(gramsize=1, cache_size=2)
+        for d in range(3):
+            corpus[f"doc{d + 1}"] = f"text for document {d + 1}"
+        for d in range(3):
+            corpus.get_keywords(document_id=f"doc{d + 1}")
+        assert corpus.cache.cache_info().currsize == 2
+        corpus.get_keywords(document_id="doc1")
+        assert corpus.cache.cache_info().misses == 4
+
+    @pytest.mark.parametrize("tf_weight, idf_weight", [("basic", "basic"), ("freq", "smooth"), ("norm_50", "max")])
+    def test_top_keywords(self, tf_weight, idf_weight):
+        """Make sure limited keywords (with and without score bound) agree with full ranking"""
+        debug.trace(4, f"test_top_keywords({tf_weight}, {idf_weight})")
+        corpus = THE_MODULE.Corpus(gramsize=1)
+        for d in range(6):
+            corpus[f"doc{d}"] = " ".join(f"w{(d * i) % 7} v{i % (d + 2)}" for i in range(12))
+        for doc_id in corpus.keys():
+            full = [(k.ngram, k.score) for k in corpus.get_keywords(document_id=doc_id, limit=None,
+                                                                    tf_weight=tf_weight, idf_weight=idf_weight)]
+            for limit in (1, 3, 5, 50):
+                for score_bound in (False, True):
+                    keywords = corpus.get_keywords(document_id=doc_id, limit=limit, score_bound=score_bound,
+                                                   tf_weight=tf_weight, idf_weight=idf_weight)
+                    assert [(k.ngram, k.score) for k in keywords] == full[:limit]
+
+    def test_undefined_idf_bound(self, monkeypatch):
+        """Make sure IDF bound is skipped when singleton count is zero (e.g., no epsilon)"""
+        debug.trace(4, "test_undefined_idf_bound()")
+        monkeypatch.setattr(THE_MODULE, "NGRAM_EPSILON", 0)
+        monkeypatch.setattr(THE_MODULE, "PENALIZE_SINGLETONS", True)
+        corpus = self.new_corpus()
+        for idf_weight in ["basic", "freq", "smooth", "max", "prob"]:
+            assert corpus.idf_upper_bound(idf_weight) is None
+
+    @pytest.mark.parametrize("keep_offsets", [False, True])
+    def test_compact_documents(self, keep_offsets):
+        """Make sure compact documents give same results as regular ones"""
+        debug.trace(4, f"test_compact_documents({keep_offsets})")
+        expected = self.new_corpus()
+        actual = THE_MODULE.Corpus(gramsize=2, compact=True, keep_offsets=keep_offsets)
+        for doc_id in expected.keys():
+            actual[doc_id] = expected[doc_id].text
+        assert actual.doc_occurrence_counts() == expected.doc_occurrence_counts()
+        for doc_id in expected.keys():
+            doc, expected_doc = actual[doc_id], expected[doc_id]
+            assert list(doc.ngram_counts()) == list(expected_doc.ngram_counts())
+            assert (len(doc), doc.max_raw_frequency) == (len(expected_doc), expected_doc.max_raw_frequency)
+            assert ([(k.ngram, k.score) for k in actual.get_keywords(document_id=doc_id)]
+                    == [(k.ngram, k.score) for k in expected.get_keywords(document_id=doc_id)])
+        assert 'little lamb' in actual['doc1']
+        assert 'lamb little' not in actual['doc1']
+        original_texts = actual['doc1']['little lamb'].original_texts
+        assert original_texts == (['little lamb'] if keep_offsets else [])
+        assert len(actual.vocabulary) == len(expected.doc_occurrence_counts())
+
+    def test_add_documents(self):
+        """Make sure bulk parallel ingestion agrees with adding documents one at a time"""
+        debug.trace(4, "test_add_documents()")
+        texts = [(f"doc{d % 5}", f"Mary had a little lamb number {d}. The lamb had {d % 3} sheep.")
+                 for d in range(12)]
+        expected = THE_MODULE.Corpus(gramsize=2)
+        for doc_id, text in texts:
+            expected[doc_id] = text
+        actual = THE_MODULE.Corpus(gramsize=2)
+        assert actual.add_documents(texts, workers=2, chunk_size=3) == len(texts)
+        assert list(actual.keys()) == list(expected.keys())
+        assert actual.doc_occurrence_counts() == expected.doc_occurrence_counts()
+        for doc_id in expected.keys():
+            assert actual[doc_id].text == expected[doc_id].text
+            assert ({k: sorted((l.start, l.end) for l in v.locations) for (k, v) in actual[doc_id].keywordset.items()}
+                    == {k: sorted((l.start, l.end) for l in v.locations) for (k, v) in expected[doc_id].keywordset.items()})
+            assert ([(k.ngram, k.score) for k in actual.get_keywords(document_id=doc_id)]
+                    == [(k.ngram, k.score) for k in expected.get_keywords(document_id=doc_id)])
 
 
 if __name__ == '__main__':
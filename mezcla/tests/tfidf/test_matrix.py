@@ -0,0 +1,96 @@
+#! /usr/bin/env python
+#
+# Tests for tfidf/matrix module
+#
+# Notes:
+# - This can be run as follows:
+#   $ PYTHONPATH=".:$PYTHONPATH" python ./mezcla/tests/tfidf/test_matrix.py
+#
+
+"""Tests for tfidf/matrix module"""
+
+# Standard modules
+import math
+
+# Installed modules
+import pytest
+
+# Local modules
+from mezcla import debug
+from mezcla.tfidf.corpus import Corpus
+
+# Note: Rreference are used for the module to be tested:
+#    THE_MODULE:	    global module object
+import mezcla.tfidf.matrix as THE_MODULE
+
+# Constants
+DOCUMENT_DATA = [
+    "Mary had a little lamb, its fleece was white as snow.",
+    "Everywhere that Mary went, the lamb was sure to go.",
+    "It followed her to school one day, which was against the rule.",
+    "It made the children laugh and play to see a lamb at school.",
+    "Mary had a little lamb, a little lamb, a little lamb.",
+    ]
+
+
+class TestTfidfMatrix:
+    """Class for testcase definition"""
+
+    def new_corpus(self):
+        """Return corpus for unigrams through trigrams over DOCUMENT_DATA"""
+        corpus = Corpus(min_ngram_size=1, max_ngram_size=3)
+        for d, doc_text in enumerate(DOCUMENT_DATA):
+            corpus[f"doc{d + 1}"] = doc_text
+        return corpus
+
+    def test_counts(self):
+        """Make sure compiled counts agree with per-document frequencies"""
+        debug.trace(4, "test_counts()")
+        corpus = self.new_corpus()
+        matrix = THE_MODULE.CorpusMatrix(corpus)
+        assert matrix.counts.shape == (len(DOCUMENT_DATA), len(matrix.vocabulary))
+        row = matrix.counts.getrow(matrix.document_ids.index("doc5")).toarray()[0]
+        col = list(matrix.vocabulary).index("little lamb")
+        assert row[col] == corpus["doc5"].tf_freq("little lamb") == 3
+        assert list(matrix.doc_frequencies()[[col]]) == [corpus.raw_doc_occurrences("little lamb")]
+
+    @pytest.mark.parametrize("tf_weight", ["basic", "log", "binary", "norm_50", "freq"])
+    @pytest.mark.parametrize("idf_weight", ["basic", "freq", "smooth", "max"])
+    def test_keywords_match(self, tf_weight, idf_weight):
+        """Make sure vectorized keywords match the per-ngram ones"""
+        debug.trace(4, f"test_keywords_match({tf_weight}, {idf_weight})")
+        corpus = self.new_corpus()
+        all_keywords = corpus.get_all_keywords(idf_weight=idf_weight, tf_weight=tf_weight, limit=10)
+        for doc_id in corpus.keys():
+            expected = corpus.get_keywords(document_id=doc_id, idf_weight=idf_weight,
+                                           tf_weight=tf_weight, limit=10)
+            actual = all_keywords[doc_id]
+            assert [k.ngram for k in actual] == [k.ngram for k in expected]
+            assert all(math.isclose(a.score, e.score) for (a, e) in zip(actual, expected))
+            assert all(a.term is e.term for (a, e) in zip(actual, expected))
+
+    def test_domain_error(self):
+        """Make sure math domain errors are raised as with per-ngram path"""
+        debug.trace(4, "test_domain_error()")
+        corpus = Corpus(gramsize=1)
+        corpus["doc1"] = "lamb"
+        corpus["doc2"] = "little lamb"
+        with pytest.raises(ValueError):
+            corpus.get_keywords(document_id="doc1", idf_weight="prob")
+        with pytest.raises(ValueError):
+            corpus.compile_matrix().get_keywords("doc1", idf_weight="prob")
+
+    def test_recompile(self):
+        """Make sure matrix recompiled after corpus changes"""
+        debug.trace(4, "test_recompile()")
+        corpus = self.new_corpus()
+        matrix = corpus.compile_matrix()
+        assert corpus.compile_matrix() is matrix
+        corpus["doc6"] = "The lamb"
+        assert corpus.compile_matrix() is not matrix
+        assert len(corpus.compile_matrix()) == len(DOCUMENT_DATA) + 1
+
+
+if __name__ == '__main__':
+    debug.trace_current_context()
+    pytest.main([__file__])
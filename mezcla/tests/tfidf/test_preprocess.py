@@ -28,6 +28,23 @@ class TestTfidfPreprocess:
 
     ## TODO: TESTS WORK-IN-PROGRESS
 
+    texts = ["My man Fran is not a man, but he's a dog-lover.",
+             "Although he saw the car, he ran across the street; U.S.A. isn't $5 (or 5%)!",
+             "running runners ran quickly: the quick brown fox jumps over the lazy dog"]
+
+    @pytest.mark.parametrize("allow_punct", [False, True])
+    @pytest.mark.parametrize("min_size, max_size", [(1, 1), (2, 2), (1, 3), (2, 4)])
+    def test_compiled_yield_keywords(self, monkeypatch, allow_punct, min_size, max_size):
+        """Make sure compiled keyword generation matches the original version"""
+        debug.trace(4, f"test_compiled_yield_keywords({allow_punct}, {min_size}, {max_size})")
+        monkeypatch.setattr(THE_MODULE, "TFIDF_ALLOW_PUNCT", allow_punct)
+        pp = THE_MODULE.Preprocessor(language='english', min_ngram_size=min_size, max_ngram_size=max_size)
+        for text in self.texts:
+            text = THE_MODULE.clean_text(text)
+            expected = [(k.text, k.locations) for k in pp.full_yield_keywords(text)]
+            actual = [(k.text, k.locations) for k in pp.compiled_yield_keywords(text)]
+            assert actual == expected
+
 
 if __name__ == '__main__':
     debug.trace_current_context()
@@ -0,0 +1,92 @@
+#! /usr/bin/env python
+#
+# Tests for tfidf/stats module
+#
+# Notes:
+# - This can be run as follows:
+#   $ PYTHONPATH=".:$PYTHONPATH" python ./mezcla/tests/tfidf/test_stats.py
+#
+
+"""Tests for tfidf/stats module"""
+
+# Standard modules
+import math
+
+# Installed modules
+import pytest
+
+# Local modules
+from mezcla import debug
+from mezcla.tfidf.corpus import Corpus
+
+# Note: Rreference are used for the module to be tested:
+#    THE_MODULE:	    global module object
+import mezcla.tfidf.stats as THE_MODULE
+
+# Constants
+REFERENCE_DATA = [
+    "Mary had a little lamb, its fleece was white as snow.",
+    "Everywhere that Mary went, the lamb was sure to go.",
+    "It followed her to school one day, which was against the rule.",
+    "Ça ne fait rien: the lamb was très petit.",
+    ]
+NEW_DOCUMENT = "It made the children laugh and play to see a lamb at school."
+
+
+class TestTfidfStats:
+    """Class for testcase definition"""
+
+    def new_corpus(self, **kwargs):
+        """Return bigram corpus over REFERENCE_DATA, passing along KWARGS"""
+        corpus = Corpus(min_ngram_size=1, max_ngram_size=2, **kwargs)
+        for d, doc_text in enumerate(REFERENCE_DATA):
+            corpus[f"ref{d + 1}"] = doc_text
+        return corpus
+
+    def test_round_trip(self, tmp_path):
+        """Make sure saved statistics agree with corpus"""
+        debug.trace(4, "test_round_trip()")
+        corpus = self.new_corpus()
+        stats_file = str(tmp_path / "corpus.stats")
+        THE_MODULE.save_corpus_stats(corpus, stats_file)
+        stats = THE_MODULE.CorpusStats(stats_file)
+        assert stats.num_docs == len(REFERENCE_DATA)
+        assert stats.max_raw_frequency == corpus.max_raw_frequency
+        assert stats.max_doc_occurrences == corpus.max_raw_doc_occurrences
+        assert dict(stats.items()) == corpus.doc_occurrence_counts()
+        assert stats.raw_doc_occurrences("fait rien") == 1
+        assert "not an ngram" not in stats
+        assert list(stats.doc_lengths) == [len(corpus[doc_id]) for doc_id in corpus.keys()]
+
+    def test_background_scoring(self, tmp_path):
+        """Make sure scoring against background matches scoring with full corpus"""
+        debug.trace(4, "test_background_scoring()")
+        stats_file = str(tmp_path / "corpus.stats")
+        THE_MODULE.save_corpus_stats(self.new_corpus(), stats_file)
+        full_corpus = self.new_corpus()
+        full_corpus["new"] = NEW_DOCUMENT
+        background_corpus = Corpus(min_ngram_size=1, max_ngram_size=2,
+                                   background=THE_MODULE.CorpusStats(stats_file))
+        background_corpus["new"] = NEW_DOCUMENT
+        assert background_corpus.num_documents == len(full_corpus)
+        assert background_corpus.max_raw_doc_occurrences == full_corpus.max_raw_doc_occurrences
+        for idf_weight in ["basic", "smooth", "max"]:
+            expected = full_corpus.get_keywords(document_id="new", idf_weight=idf_weight)
+            actual = background_corpus.get_keywords(document_id="new", idf_weight=idf_weight)
+            assert [k.ngram for k in actual] == [k.ngram for k in expected]
+            assert all(math.isclose(a.score, e.score) for (a, e) in zip(actual, expected))
+            batch = background_corpus.get_all_keywords(idf_weight=idf_weight)["new"]
+            assert [k.ngram for k in batch] == [k.ngram for k in expected]
+
+    def test_bad_file(self, tmp_path):
+        """Make sure non-statistics files are rejected"""
+        debug.trace(4, "test_bad_file()")
+        bad_file = tmp_path / "bad.stats"
+        bad_file.write_bytes(b"not a statistics file")
+        with pytest.raises(ValueError):
+            THE_MODULE.CorpusStats(str(bad_file))
+
+
+if __name__ == '__main__':
+    debug.trace_current_context()
+    pytest.main([__file__])
@@ -33,9 +33,9 @@ import re
 import sys
 
 # Installed packages
-import cherrypy
+# note: cherrypy and pandas are imported when used (i.e., to reduce startup time);
+# sklearn.base is needed for ClassifierWrapper (and it loads most of sklearn anyway).
 import numpy
-import pandas
 from sklearn.base import BaseEstimator, ClassifierMixin
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.feature_extraction.text import _document_frequency
@@ -275,6 +275,7 @@ class ClassifierWrapper(BaseEstimator, ClassifierMixin):
             system.save_object(basename + ".x.csv.pickle", x)
             system.save_object(basename + ".y.csv.pickle", y)
         ##
+        import pandas                   # pylint: disable=import-outside-toplevel
         df_x = pandas.DataFrame(x.toarray())
         df_y = pandas.DataFrame(y)
         
@@ -682,6 +683,12 @@ def format_index_html(base_url=None):
 #................................................................................
 # Main class
 
+def expose(function):
+    """Mark FUNCTION as accessible via web (as with cherrypy.expose but without importing cherrypy)"""
+    function.exposed = True
+    return function
+
+
 class web_controller(object):
     """Controller for CherryPy web server with embedded text categorizer"""
     
@@ -693,24 +700,25 @@ class web_controller(object):
         self.text_cat.load(model_filename)
         return
 
-    @cherrypy.expose
+    @expose
     def index(self, **kwargs):
         """Website root page (e.g., web site overview and link to search)"""
         # TODO: add way to override URL (e.g., to force use of known local hostname instead of "localhost")
         debug.trace_fmtd(5, "wc.index(s:{s}, kw:{kw})", s=self, kw=kwargs)
+        import cherrypy                 # pylint: disable=import-outside-toplevel
         base_url = cherrypy.url('/')
         debug.trace_fmt(4, "base_url={b}", b=base_url)
         index_html = format_index_html(base_url)
         debug.trace_fmt(6, "html={{\n{h}\n}}", h=index_html)
         return index_html
 
-    @cherrypy.expose
+    @expose
     def categorize(self, text, **kwargs):
         """Infer category for TEXT"""
         debug.trace_fmtd(5, "wc.categorize(s:{s}, _, kw:{kw})", s=self, kw=kwargs)
         return self.text_cat.categorize(text)
 
-    @cherrypy.expose
+    @expose
     def class_probabilities(self, text, **kwargs):
         """Get category probability distribution for TEXT"""
         debug.trace_fmtd(5, "wc.class_probabilities(s:{s}, _, kw:{kw})", s=self, kw=kwargs)
@@ -718,7 +726,7 @@ class web_controller(object):
     #
     probs = class_probabilities
 
-    @cherrypy.expose
+    @expose
     def stop(self, **kwargs):
         """Stops the web search server and saves cached data to disk.
         Note: The command is ignored if not debugging and on a production server."""
@@ -729,6 +737,7 @@ class web_controller(object):
         # TODO: Straighten out shutdown quirk (seems like two invocations required).
         # NOTE: Putting exit before stop seems to do the trick. However, it might be
         # the case that the server shutdown.
+        import cherrypy                 # pylint: disable=import-outside-toplevel
         cherrypy.engine.exit()
         cherrypy.engine.stop()
         # TODO: Use HTML so shutdown shown in title.
@@ -744,6 +753,7 @@ def start_web_controller(model_filename, nonblocking=False):
     Note:
     - The function blocks until server is shutdown unless NONBLOCKING specified.    """
     debug.trace(5, "start_web_controller()")
+    import cherrypy                     # pylint: disable=import-outside-toplevel
 
     # Load in CherryPy configuration
     # TODO: use external configuration file
@@ -39,15 +39,19 @@ Vocabulary:
 from __future__ import absolute_import, division
 
 # Standard modules
+from collections import defaultdict, deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import heapq
+from itertools import islice
 import math
-from collections import namedtuple
+import multiprocessing
+import operator
 ## TODO
 ## import os
 import sys
 
 # Installed modules
-## TEST: from cachetools import LRUCache, cached
-from functools import lru_cache
+from cachetools import LRUCache, cachedmethod
 from mezcla import debug
 from mezcla import system
 from mezcla import misc_utils
@@ -59,10 +63,12 @@ from mezcla import misc_utils
 
 # Local modules
 from mezcla.tfidf.config import BASE_DEBUG_LEVEL as BDL
-from mezcla.tfidf.document import Document, PENALIZE_SINGLETONS
+from mezcla.tfidf.dockeyword import Vocabulary
+from mezcla.tfidf.document import Document, PENALIZE_SINGLETONS, make_ngram_table
 from mezcla.tfidf.preprocess import Preprocessor, clean_text
 
 CorpusKeyword = namedtuple('CorpusKeyword', ['term', 'ngram', 'score'])
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
 
 SKIP_NORMALIZATION = system.getenv_bool("SKIP_NORMALIZATION", False,
                                         "Skip term/ngram normalization")
@@ -72,6 +78,77 @@ NGRAM_EPSILON = system.getenv_bool(
 TFIDF_NGRAM_LEN_WEIGHT = system.getenv_float(
     "TFIDF_NGRAM_LEN_WEIGHT", 0,
     description="Length factor for ngram token length")
+TFIDF_MATRIX_SCORING = system.getenv_bool(
+    "TFIDF_MATRIX_SCORING", False,
+    description="Score corpus documents via vectorized term-document matrix")
+TFIDF_CACHE_SIZE = system.getenv_int(
+    "TFIDF_CACHE_SIZE", 1024,
+    description="Max entries in per-corpus keyword cache (0 to disable)")
+TFIDF_WORKERS = system.getenv_int(
+    "TFIDF_WORKERS", 1,
+    description="Number of processes for bulk document ingestion via add_documents")
+TFIDF_CHUNK_SIZE = system.getenv_int(
+    "TFIDF_CHUNK_SIZE", 64,
+    description="Number of documents per worker task in add_documents")
+TFIDF_SCORE_BOUND = system.getenv_bool(
+    "TFIDF_SCORE_BOUND", False,
+    description="Skip ngrams in get_keywords whose TF-IDF upper bound cannot make the top limit")
+TFIDF_COMPACT = system.getenv_bool(
+    "TFIDF_COMPACT", False,
+    description="Use compact documents with interned ngram IDs and array-based counts")
+
+
+class CorpusCache(LRUCache):
+    """LRU cache with hit/miss counts, used for per-instance memoization of Corpus methods.
+    Note: This is cleared whenever the corpus is modified.
+    """
+
+    def __init__(self, maxsize):
+        super().__init__(maxsize)
+        self.hits = 0
+        self.misses = 0
+
+    def __getitem__(self, key):
+        try:
+            value = super().__getitem__(key)
+        except KeyError:
+            self.misses += 1
+            raise
+        self.hits += 1
+        return value
+
+    def cache_info(self):
+        """Return CacheInfo tuple with statistics (as with functools.lru_cache)"""
+        return CacheInfo(self.hits, self.misses, self.maxsize, self.currsize)
+
+
+def preprocess_documents(preprocessor, documents):
+    """Return list of (document_id, text, ngram_table) for (document_id, raw_text) pairs in DOCUMENTS.
+    Note: The text is cleaned as with Corpus.__setitem__, and ngram_table maps each ngram from
+    PREPROCESSOR to a list of (start, end) offsets (see Document.__init__).
+    """
+    result = []
+    for document_id, raw_text in documents:
+        # note: cleaned twice as with Corpus.__setitem__ and Document.__init__
+        text = clean_text(clean_text(raw_text))
+        result.append((document_id, text, make_ngram_table(preprocessor.yield_keywords(text))))
+    return result
+
+
+# Preprocessor for use in worker processes (see add_documents)
+worker_preprocessor = None
+
+
+def init_worker(preprocessor):
+    """Initialize worker process for add_documents with PREPROCESSOR"""
+    global worker_preprocessor
+    worker_preprocessor = preprocessor
+
+
+def preprocess_worker_documents(documents):
+    """Worker process version of preprocess_documents"""
+    return preprocess_documents(worker_preprocessor, documents)
+
 
 class Corpus(object):
     """A corpus is made up of Documents, and performs TF-IDF calculations on them.
@@ -103,7 +180,8 @@ class Corpus(object):
 
     def __init__(self, min_ngram_size=None, max_ngram_size=None,
                  language=None, preprocessor=None,
-                 gramsize=None, all_ngrams=None):
+                 gramsize=None, all_ngrams=None, cache_size=None, background=None,
+                 compact=None, keep_offsets=None):
         """Initalize.
 
         Parameters:
@@ -124,15 +202,29 @@ class Corpus(object):
                 Note: deprecated (use min_ngram_size instead).
             gramsize (int): number of words in a keyword
                 deprecated: use max_ngram_size instead
+            cache_size (int-or-None):
+                max entries in cache for get_keywords results (defaults to TFIDF_CACHE_SIZE)
+            background (CorpusStats-or-None):
+                frozen statistics for reference collection to include in DF and IDF (see stats.py)
+            compact (bool-or-None):
+                use compact documents with ngrams interned in a shared Vocabulary (defaults to TFIDF_COMPACT)
+            keep_offsets (bool-or-None):
+                keep ngram offsets for compact documents (defaults to TFIDF_KEEP_OFFSETS)
         """
         debug.assertion(not (gramsize and max_ngram_size))
         debug.assertion(not (all_ngrams and min_ngram_size))
         self.__documents = {}
-        self.__document_occurrences = {}
+        # note: inverted index from ngram to number of documents containing it
+        self.__document_occurrences = defaultdict(int)
         self.__gramsize = (max_ngram_size or gramsize)
         self.__max_raw_frequency = None
-        self.__max_rel_doc_frequency = None
-        self.__max_doc_frequency = None
+        self.__max_doc_occurrences = 0
+        self.__max_doc_occurrences_stale = False
+        self.__max_combined_doc_occurrences = None
+        self.__matrix = None
+        if cache_size is None:
+            cache_size = TFIDF_CACHE_SIZE
+        self.cache = CorpusCache(maxsize=cache_size)
         if preprocessor:
             self.preprocessor = preprocessor
         else:
@@ -140,6 +232,13 @@ class Corpus(object):
                 language=language, min_ngram_size=min_ngram_size, max_ngram_size=max_ngram_size,
                 ## TODO: remove deprecated
                 gramsize=gramsize, all_ngrams=all_ngrams)
+        self.background = background
+        if background is not None:
+            background.check_compatible(self.preprocessor)
+        if compact is None:
+            compact = TFIDF_COMPACT
+        self.vocabulary = (Vocabulary() if compact else None)
+        self.keep_offsets = keep_offsets
 
     def __contains__(self, document_id):
         """A Corpus contains Document ids."""
@@ -154,9 +253,102 @@ class Corpus(object):
         return self.__documents[document_id]
 
     def __setitem__(self, document_id, text):
-        """Add a Document to the Corpus using a unique id key."""
+        """Add a Document to the Corpus using a unique id key.
+        Note: The document-frequency index is updated incrementally, including
+        removal of the ngrams for any document being replaced.
+        """
         text = clean_text(text)
-        self.__documents[document_id] = Document(text, self.preprocessor)
+        self._add_document(document_id, self.new_document(text))
+
+    def new_document(self, text, ngram_table=None):
+        """Return Document for TEXT using corpus settings (e.g., compact vocabulary)"""
+        return Document(text, self.preprocessor, ngram_table=ngram_table,
+                        vocabulary=self.vocabulary, keep_offsets=self.keep_offsets)
+
+    def _add_document(self, document_id, document):
+        """Add DOCUMENT under DOCUMENT_ID, replacing any existing one and updating the index"""
+        if document_id in self.__documents:
+            self._unindex_document(self.__documents[document_id])
+        self.__documents[document_id] = document
+        self._index_document(document)
+        self.__max_combined_doc_occurrences = None
+        self.__matrix = None
+        self.cache.clear()
+
+    def _index_document(self, document):
+        """Add DOCUMENT's ngrams to the document-occurrence index"""
+        occurrences = self.__document_occurrences
+        max_count = self.__max_doc_occurrences
+        for ngram in document.keywordset:
+            count = occurrences[ngram] + 1
+            occurrences[ngram] = count
+            if count > max_count:
+                max_count = count
+        self.__max_doc_occurrences = max_count
+        if self.__max_raw_frequency is not None:
+            self.__max_raw_frequency = max(self.__max_raw_frequency, document.max_raw_frequency)
+
+    def _unindex_document(self, document):
+        """Remove DOCUMENT's ngrams from the document-occurrence index"""
+        occurrences = self.__document_occurrences
+        for ngram in document.keywordset:
+            count = occurrences[ngram] - 1
+            debug.assertion(count >= 0)
+            if count > 0:
+                occurrences[ngram] = count
+            else:
+                del occurrences[ngram]
+        # note: maxima are recomputed lazily (n.b., over vocabulary not documents)
+        self.__max_doc_occurrences_stale = True
+        self.__max_raw_frequency = None
+
+    def add_documents(self, documents, workers=None, chunk_size=None):
+        """Add DOCUMENTS given as (document_id, text) pairs or a dict, returning the number added.
+        Note: With more than one worker, the preprocessing is done in a pool of WORKERS
+        processes, each handling CHUNK_SIZE documents at a time. The results are the same
+        as adding the documents one at a time (e.g., later ids replace earlier ones).
+        """
+        if workers is None:
+            workers = TFIDF_WORKERS
+        if chunk_size is None:
+            chunk_size = TFIDF_CHUNK_SIZE
+        if hasattr(documents, "items"):
+            documents = documents.items()
+        num_added = 0
+        if workers <= 1:
+            for document_id, text in documents:
+                self[document_id] = text
+                num_added += 1
+            return num_added
+
+        # Farm out preprocessing, merging results in order as they become available
+        # note: fork is used if available so that the preprocessor need not be picklable
+        # (e.g., lambda stemmers); pending tasks are limited to keep memory bounded
+        mp_context = None
+        if "fork" in multiprocessing.get_all_start_methods():
+            mp_context = multiprocessing.get_context("fork")
+        document_iter = iter(documents)
+        chunks = iter(lambda: list(islice(document_iter, chunk_size)), [])
+        pending = deque()
+        #
+        def merge_results(future):
+            """Add documents from the FUTURE result of preprocess_worker_documents"""
+            num = 0
+            for (document_id, text, ngram_table) in future.result():
+                self._add_document(document_id, self.new_document(text, ngram_table=ngram_table))
+                num += 1
+            return num
+        #
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context,
+                                 initializer=init_worker, initargs=(self.preprocessor,)) as executor:
+            for chunk in chunks:
+                pending.append(executor.submit(preprocess_worker_documents, chunk))
+                if len(pending) >= (2 * workers):
+                    num_added += merge_results(pending.popleft())
+            while pending:
+                num_added += merge_results(pending.popleft())
+        debug.trace(BDL, f"add_documents(workers={workers}) added {num_added} documents")
+        return num_added
 
     @property
     def gramsize(self):
@@ -167,46 +359,99 @@ class Corpus(object):
         """The document ids in the corpus."""
         return self.__documents.keys()
 
+    @property
+    def num_documents(self):
+        """Number of documents for IDF, including those in background statistics"""
+        num = len(self.__documents)
+        if self.background is not None:
+            num += self.background.num_docs
+        return num
+
     @property
     def max_raw_frequency(self):
         """Highest frequency across all Documents in the Corpus."""
         ## TPO: caches value
         if self.__max_raw_frequency is None:
-            self.__max_raw_frequency = max(_.max_raw_frequency for _ in self.__documents.values())
+            frequencies = [_.max_raw_frequency for _ in self.__documents.values()]
+            if self.background is not None:
+                frequencies.append(self.background.max_raw_frequency)
+            self.__max_raw_frequency = max(frequencies)
         return self.__max_raw_frequency
 
-    @lru_cache()
+    def raw_doc_occurrences(self, ngram):
+        """Number of documents in corpus containing NGRAM (via inverted index)"""
+        # note: uses get to avoid adding entries to the defaultdict
+        count = self.__document_occurrences.get(ngram, 0)
+        if self.background is not None:
+            count += self.background.raw_doc_occurrences(ngram)
+        return count
+
+    def doc_occurrence_counts(self):
+        """Return dict from ngram to number of documents containing it (including background)"""
+        counts = dict(self.__document_occurrences)
+        if self.background is not None:
+            for ngram, count in self.background.items():
+                counts[ngram] = counts.get(ngram, 0) + count
+        return counts
+
     def count_doc_occurrences(self, ngram):
         """Count the number of documents the corpus has with the matching ngram."""
-        # Note: caches the values as called multiple times for TFIDF calculation
-        if ngram in self.__document_occurrences:
-            count = self.__document_occurrences[ngram]
-        else:
-            count = sum((1 + NGRAM_EPSILON) if ngram in doc else 0 for doc in self.__documents.values())
+        # Note: O(1) lookup given the index maintained by __setitem__
+        return self.adjust_doc_count(self.raw_doc_occurrences(ngram))
+
+    @staticmethod
+    def adjust_doc_count(num_docs):
+        """Convert raw document count NUM_DOCS into the value used for DF (e.g., with epsilon smoothing)"""
+        count = (num_docs * (1 + NGRAM_EPSILON))
         if ((count == 1) and PENALIZE_SINGLETONS):
             count = 0
         if (count == 0):
             count = NGRAM_EPSILON
         return count
 
+    @property
+    def max_raw_doc_occurrences(self):
+        """Highest raw document occurrence count for all ngrams in the corpus"""
+        if self.__max_doc_occurrences_stale:
+            self.__max_doc_occurrences = max(self.__document_occurrences.values(), default=0)
+            self.__max_doc_occurrences_stale = False
+        if self.background is None:
+            return self.__max_doc_occurrences
+        if self.__max_combined_doc_occurrences is None:
+            self.__max_combined_doc_occurrences = max(
+                (self.raw_doc_occurrences(ngram) for ngram in self.__document_occurrences),
+                default=0)
+            self.__max_combined_doc_occurrences = max(self.__max_combined_doc_occurrences,
+                                                      self.background.max_doc_occurrences)
+        return self.__max_combined_doc_occurrences
+
     ## TPO
     @property
     def max_rel_doc_frequency(self):
         """"Highest relative document frequency for all ngrams in the corpus"""
-        if self.__max_rel_doc_frequency is None:
-            max_doc_frequency = max(self.count_doc_occurrences(ngram) for doc in self.__documents.values() for ngram in doc.keywordset)
-            self.__max_rel_doc_frequency = max_doc_frequency / float(len(self))
-        return self.__max_rel_doc_frequency
+        return self.max_doc_frequency / float(self.num_documents)
     
     ## TPO
     @property
     def max_doc_frequency(self):
         """"Highest relative document frequency for all ngrams in the corpus"""
-        if self.__max_doc_frequency is None:
-            max_doc_frequency = max(self.count_doc_occurrences(ngram) for doc in self.__documents.values() for ngram in doc.keywordset)
-            self.__max_doc_frequency = max_doc_frequency
-        return self.__max_doc_frequency
+        # note: adjust_doc_count is monotonic, so it can be applied to the max raw count
+        return self.adjust_doc_count(self.max_raw_doc_occurrences)
     
+    def compile_matrix(self):
+        """Return CorpusMatrix for vectorized scoring (see matrix.py), compiling if stale"""
+        if self.__matrix is None:
+            from mezcla.tfidf.matrix import CorpusMatrix        # pylint: disable=import-outside-toplevel
+            self.__matrix = CorpusMatrix(self)
+        return self.__matrix
+
+    def get_all_keywords(self, idf_weight='basic', tf_weight='basic', limit=100):
+        """Return dict from document id to list of keywords with TF-IDF scores.
+        Note: All documents are scored in a single batch via compile_matrix.
+        """
+        return self.compile_matrix().get_all_keywords(idf_weight=idf_weight, tf_weight=tf_weight,
+                                                      limit=limit)
+
     def df_freq(self, ngram):
         """Return document frequency (DF) count for NGRAM"""
         return self.count_doc_occurrences(ngram)
@@ -234,7 +479,7 @@ class Corpus(object):
         ## # HACK: give singletons a max DF to lower IDF score
         ## if (num_occurrences == 1) and PENALIZE_SINGLETONS:
         ##     num_occurrences = len(self.__documents)
-        idf = math.log(float(len(self)) / num_occurrences)
+        idf = math.log(float(self.num_documents) / num_occurrences)
         debug.trace_fmt(BDL + 2, "idf_basic({ng} len(self)={l} max_doc_occ={mdo} num_occ={no} idf={idf})\n",
                         ng=ngram, l=len(self), mdo=self.max_doc_frequency, no=num_occurrences, idf={idf})
         return idf
@@ -253,7 +498,7 @@ class Corpus(object):
     def idf_smooth(self, ngram):
         """Returns IDF using simple smoothing with add-1 relative frequency (prior to log)"""
         debug.assertion(self.count_doc_occurrences(ngram) >= 1)
-        idf = math.log(1 + (float(len(self)) / self.count_doc_occurrences(ngram)))
+        idf = math.log(1 + (float(self.num_documents) / self.count_doc_occurrences(ngram)))
         debug.trace_fmt(BDL + 2, "idf_smooth({ng} len(self)={l} doc_occ={do} idf={idf})\n",
                         ng=ngram, l=len(self), do=self.count_doc_occurrences(ngram), idf={idf})
         return idf
@@ -272,7 +517,7 @@ class Corpus(object):
         debug.assertion(self.count_doc_occurrences(ngram) >= 1)
         ## TODO: shouldn't this be (float(len(self) / num_doc_occurrences))
         num_doc_occurrences = self.count_doc_occurrences(ngram)
-        idf = math.log(float(len(self) - num_doc_occurrences) / num_doc_occurrences)
+        idf = math.log(float(self.num_documents - num_doc_occurrences) / num_doc_occurrences)
         debug.trace_fmt(BDL + 2, "idf_smooth({ng} len(self)={l} doc_occ={do} idf={idf})\n",
                         ng=ngram, l=len(self), do=num_doc_occurrences, idf={idf})
         return idf
@@ -299,6 +544,29 @@ class Corpus(object):
                         ng=ngram, l=len(self), idfw=idf_weight, r=result)
         return result
 
+    def idf_upper_bound(self, idf_weight='basic'):
+        """Upper bound on IDF for ngrams occurring in the corpus (i.e., IDF for a single document)
+        Note: All the IDF weightings decrease as the document count increases; None is
+        returned if the bound is not defined (e.g., math domain error).
+        """
+        num_occurrences = self.adjust_doc_count(1)
+        num_docs = float(self.num_documents)
+        result = None
+        try:
+            if idf_weight == 'basic':
+                result = math.log(num_docs / num_occurrences)
+            elif idf_weight == 'freq':
+                result = 1 / num_occurrences
+            elif idf_weight == 'smooth':
+                result = math.log(1 + (num_docs / num_occurrences))
+            elif idf_weight == 'max':
+                result = math.log(1 + self.max_raw_frequency / num_occurrences)
+            elif idf_weight == 'prob':
+                result = math.log((num_docs - num_occurrences) / num_occurrences)
+        except (ValueError, ZeroDivisionError):
+            debug.trace(BDL + 1, f"Warning: no IDF upper bound for {idf_weight!r}")
+        return result
+
     def tf_idf(self, ngram, document_id=None, text=None, idf_weight='basic', tf_weight='basic',
                normalize_term=None):
         """TF-IDF score. Must specify a document id (within corpus) or pass text body."""
@@ -322,13 +590,22 @@ class Corpus(object):
                         ng=ngram, id=document_id, t=text, idfw=idf_weight, tfw=tf_weight, n=normalize_term, r=result)
         return result
 
-    @lru_cache()
+    @cachedmethod(operator.attrgetter('cache'))
     def get_keywords(self, document_id=None, text=None, idf_weight='basic',
-                     tf_weight='basic', limit=100):
-        """Return a list of keywords with TF-IDF scores. Defaults to the top 100."""
+                     tf_weight='basic', limit=100, score_bound=None):
+        """Return a list of keywords with TF-IDF scores. Defaults to the top 100.
+        Notes:
+        - Results are cached per corpus until it is modified (see CorpusCache).
+        - With a positive LIMIT, only the top keywords are kept (via a bounded heap).
+        - With SCORE_BOUND, ngrams are skipped if TF times the IDF upper bound cannot
+          make the top LIMIT (e.g., singletons with PENALIZE_SINGLETONS); defaults to TFIDF_SCORE_BOUND.
+        """
         debug.trace(BDL + 2, f"in get_keywords(); self={self}")
         debug.trace_expr(BDL + 2, document_id, text, idf_weight, tf_weight, limit)
         assert document_id or text
+        if TFIDF_MATRIX_SCORING and document_id and not text:
+            return self.compile_matrix().get_keywords(document_id, idf_weight=idf_weight,
+                                                      tf_weight=tf_weight, limit=limit)
         document = None
         if document_id:
             document = self[document_id]
@@ -336,18 +613,50 @@ class Corpus(object):
             debug.assertion(document is None)
             text = clean_text(text)
             document = Document(text, self.preprocessor)
+        if score_bound is None:
+            score_bound = TFIDF_SCORE_BOUND
+        use_heap = ((limit is not None) and (limit > 0))
+        idf_bound = None
+        if (score_bound and use_heap and document_id and not text and (TFIDF_NGRAM_LEN_WEIGHT >= 0)):
+            idf_bound = self.idf_upper_bound(idf_weight)
+
+        # Score the ngrams, keeping top ones in min-heap of (score, -position, ngram) if limited
+        # note: ties are resolved by position, so the result is the same as with a stable sort
         out = []
-        for ngram, kw in document.keywordset.items():
+        heap = []
+        num_skipped = 0
+        for pos, ngram in enumerate(document.keywordset):
             ## TODO3: use tf_idf
-            score = document.tf(ngram, tf_weight=tf_weight) * \
-                self.idf(ngram, idf_weight=idf_weight)
+            tf = document.tf(ngram, tf_weight=tf_weight)
+            len_weight = None
             if TFIDF_NGRAM_LEN_WEIGHT:
                 len_weight = TFIDF_NGRAM_LEN_WEIGHT ** len(ngram.split())
+            if (idf_bound is not None) and (len(heap) == limit) and (tf >= 0):
+                # note: multiplication by non-negative value preserves order, so bound >= score
+                bound = tf * idf_bound
+                if len_weight:
+                    bound *= len_weight
+                if bound <= heap[0][0]:
+                    num_skipped += 1
+                    continue
+            score = tf * self.idf(ngram, idf_weight=idf_weight)
+            if len_weight:
                 debug.trace(BDL + 3, f"Factoring in ngram weight of {round(len_weight, 3)} into score {round(score, 3)} for {ngram!r}")
                 score *= len_weight
-            out.append(CorpusKeyword(kw, ngram, score))
-        out.sort(key=lambda x: x.score, reverse=True)
-        result = out[:limit]
+            if not use_heap:
+                out.append((ngram, score))
+            elif len(heap) < limit:
+                heapq.heappush(heap, (score, -pos, ngram))
+            elif score > heap[0][0]:
+                heapq.heapreplace(heap, (score, -pos, ngram))
+        if use_heap:
+            out = [(ngram, score) for (score, _neg_pos, ngram) in sorted(heap, key=lambda e: (-e[0], -e[1]))]
+        else:
+            out.sort(key=lambda x: x[1], reverse=True)
+            out = out[:limit]
+        keywordset = document.keywordset
+        result = [CorpusKeyword(keywordset[ngram], ngram, score) for (ngram, score) in out]
+        debug.trace_expr(BDL + 3, num_skipped)
         debug.trace(BDL + 3, f"get_keywords() => {result}")
         return result
 
@@ -89,6 +89,65 @@ class DocKeyword(object):
     def __str__(self):
         return 'Stem:%s, Instances:%s, Count:%d' % (self.text, str(self.original_texts), len(self))
 
+
+class CountedKeyword(DocKeyword):
+    """DocKeyword with an occurrence count but no locations (e.g., for compact documents without offsets)"""
+
+    def __init__(self, text, count=0):
+        super().__init__(text)
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def __add__(self, other):
+        assert self.text == other.text
+        return CountedKeyword(self.text, len(self) + len(other))
+
+    def get_first_text(self):
+        """Return the first original text (n.b., not available)"""
+        return ''
+
+
+class Vocabulary(object):
+    """Interns ngram strings as consecutive integer IDs (e.g., shared by the documents in a corpus)
+
+    Example:
+        >>> import mezcla.tfidf.dockeyword as mtk
+        >>> v = mtk.Vocabulary()
+        >>> (v.intern('a b'), v.intern('c'), v.intern('a b'), v.get('d'))
+        (0, 1, 0, None)
+        >>> v[1]
+        'c'
+    """
+
+    def __init__(self):
+        self.__ids = {}
+        self.__ngrams = []
+
+    def intern(self, ngram):
+        """Return ID for NGRAM, adding it if new"""
+        ngram_id = self.__ids.get(ngram)
+        if ngram_id is None:
+            ngram_id = len(self.__ngrams)
+            self.__ids[ngram] = ngram_id
+            self.__ngrams.append(ngram)
+        return ngram_id
+
+    def get(self, ngram, default=None):
+        """Return ID for NGRAM or DEFAULT if not present"""
+        return self.__ids.get(ngram, default)
+
+    def __getitem__(self, ngram_id):
+        """Return ngram for NGRAM_ID"""
+        return self.__ngrams[ngram_id]
+
+    def __contains__(self, ngram):
+        return ngram in self.__ids
+
+    def __len__(self):
+        return len(self.__ngrams)
+
 #-------------------------------------------------------------------------------
     
 if __name__ == '__main__':
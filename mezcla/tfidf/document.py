@@ -23,7 +23,10 @@ Example:
 from __future__ import absolute_import, division
 
 # Standard packages
+from array import array
+from bisect import bisect_left
 from collections import defaultdict
+from collections.abc import Mapping
 import math
 import random
 
@@ -33,6 +36,7 @@ from mezcla import system
 
 # Local packages
 from mezcla.tfidf.config import BASE_DEBUG_LEVEL as BDL
+from mezcla.tfidf.dockeyword import CountedKeyword, DocKeyword, Location
 from mezcla.tfidf.preprocess import clean_text, Preprocessor
 
 # TPO: environment option for weight singleton occurrences low
@@ -40,6 +44,45 @@ PENALIZE_SINGLETONS = system.getenv_boolean("PENALIZE_SINGLETONS", False,
                                             "Ignore singleton ngrams")
 if PENALIZE_SINGLETONS:
     system.print_stderr("FYI: Penalizing singleton ngrams")
+TFIDF_KEEP_OFFSETS = system.getenv_bool(
+    "TFIDF_KEEP_OFFSETS", False,
+    description="Keep ngram offsets for compact documents (e.g., for DocKeyword.original_texts)")
+
+# Array type codes for compact documents
+ID_TYPECODE = 'I'
+OFFSET_TYPECODE = 'q'
+
+
+def make_ngram_table(keywords):
+    """Return dict from ngram to list of (start, end) offsets for KEYWORDS (e.g., from Preprocessor.yield_keywords)"""
+    ngram_table = {}
+    for keyword in keywords:
+        ngram_table.setdefault(keyword.text, []).extend(
+            (location.start, location.end) for location in keyword.locations)
+    return ngram_table
+
+
+class CompactKeywordSet(Mapping):
+    """Read-only view of the keyword set for a compact Document (see Document.keywordset)
+    Note: DocKeyword objects are created on demand; as with the defaultdict used for
+    regular documents, the empty string is returned for unknown ngrams.
+    """
+
+    def __init__(self, document):
+        self.document = document
+
+    def __getitem__(self, ngram):
+        return self.document.get_keyword(ngram)
+
+    def __contains__(self, ngram):
+        # pylint: disable=protected-access
+        return (self.document._compact_position(ngram) >= 0)
+
+    def __iter__(self):
+        return (ngram for (ngram, _count) in self.document.ngram_counts())
+
+    def __len__(self):
+        return self.document.num_ngrams
 
 
 class Document(object):
@@ -49,18 +92,45 @@ class Document(object):
         text (list): cleaned text, set on init
     """
 
-    def __init__(self, raw_text, preprocessor=None):
+    def __init__(self, raw_text, preprocessor=None, ngram_table=None, vocabulary=None, keep_offsets=None):
         """All you need is the text body and gramsize (number words in ngram).
 
         raw_text
             text string input. Will be run through text preprocessing
         preprocessor
             initalized instance of a preprocessor
+        ngram_table
+            optional dict from ngram to list of (start, end) offsets, such as
+            from preprocess_documents; raw_text is then assumed already cleaned
+        vocabulary
+            optional Vocabulary for compact representation: ngrams are interned
+            as integers with counts stored in arrays (rather than DocKeyword objects)
+        keep_offsets
+            whether compact representation keeps offsets (defaults to TFIDF_KEEP_OFFSETS)
         """
         ## TODO2: fix gramsize reference (in preprocessor)
         self.id = None
-        self.text = clean_text(raw_text)
         self.__keywordset = None
+        self.vocabulary = vocabulary
+        if keep_offsets is None:
+            keep_offsets = TFIDF_KEEP_OFFSETS
+        self.keep_offsets = keep_offsets
+        # Compact representation: arrays for ngram IDs and counts in keyword order,
+        # along with sorted IDs for lookup and optional flattened offsets
+        self.__ngram_ids = None
+        self.__counts = None
+        self.__sorted_ids = None
+        self.__sorted_positions = None
+        self.__offset_index = None
+        self.__offsets = None
+        if ngram_table is None:
+            self.text = clean_text(raw_text)
+        else:
+            self.text = raw_text
+            if self.compact:
+                self.load_ngram_table(ngram_table)
+            else:
+                self.__keywordset = self.keywordset_from_table(ngram_table)
         self.__max_raw_frequency = None
         self.__length = None
         if (preprocessor is None):
@@ -101,9 +171,102 @@ class Document(object):
         """
         return set(self.keywordset)
 
+    @property
+    def compact(self):
+        """Whether compact representation used (see __init__)"""
+        return (self.vocabulary is not None)
+
+    @property
+    def num_ngrams(self):
+        """Number of distinct ngrams"""
+        if self.compact:
+            self.compile_compact()
+            return len(self.__ngram_ids)
+        return len(self.keywordset)
+
+    def load_ngram_table(self, ngram_table):
+        """Set compact representation from NGRAM_TABLE (see __init__)"""
+        debug.assertion(self.compact)
+        vocabulary = self.vocabulary
+        ngram_ids = array(ID_TYPECODE)
+        counts = array(ID_TYPECODE)
+        offset_index = array(OFFSET_TYPECODE, [0]) if self.keep_offsets else None
+        offsets = array(OFFSET_TYPECODE) if self.keep_offsets else None
+        for ngram, ngram_offsets in ngram_table.items():
+            # note: duplicate offsets are dropped as with the DocKeyword location sets
+            unique_offsets = set(ngram_offsets)
+            ngram_ids.append(vocabulary.intern(ngram))
+            counts.append(len(unique_offsets))
+            if self.keep_offsets:
+                for (start, end) in sorted(unique_offsets):
+                    offsets.append(start)
+                    offsets.append(end)
+                offset_index.append(len(offsets) // 2)
+        sorted_positions = sorted(range(len(ngram_ids)), key=ngram_ids.__getitem__)
+        self.__ngram_ids = ngram_ids
+        self.__counts = counts
+        self.__sorted_ids = array(ID_TYPECODE, (ngram_ids[p] for p in sorted_positions))
+        self.__sorted_positions = array(ID_TYPECODE, sorted_positions)
+        self.__offset_index = offset_index
+        self.__offsets = offsets
+
+    def compile_compact(self):
+        """Derive the compact representation from the text, unless already done"""
+        if self.__ngram_ids is None:
+            self.load_ngram_table(make_ngram_table(self.keywords))
+
+    def _compact_position(self, ngram):
+        """Return position of NGRAM in compact arrays or -1 if not present"""
+        self.compile_compact()
+        ngram_id = self.vocabulary.get(ngram)
+        if ngram_id is None:
+            return -1
+        i = bisect_left(self.__sorted_ids, ngram_id)
+        if (i < len(self.__sorted_ids)) and (self.__sorted_ids[i] == ngram_id):
+            return self.__sorted_positions[i]
+        return -1
+
+    def count(self, ngram):
+        """Number of occurrences of NGRAM"""
+        if self.compact:
+            pos = self._compact_position(ngram)
+            return (self.__counts[pos] if (pos >= 0) else 0)
+        return (len(self.keywordset[ngram]) if (ngram in self.keywordset) else 0)
+
+    def ngram_counts(self):
+        """Yield (ngram, count) pairs in keyword set order"""
+        if self.compact:
+            self.compile_compact()
+            vocabulary = self.vocabulary
+            for (ngram_id, count) in zip(self.__ngram_ids, self.__counts):
+                yield (vocabulary[ngram_id], count)
+        else:
+            for (ngram, keyword) in self.keywordset.items():
+                yield (ngram, len(keyword))
+
+    def get_keyword(self, ngram):
+        """Return DocKeyword for NGRAM, using CountedKeyword if compact without offsets
+        Note: returns empty string if not present (as with keywordset defaultdict)"""
+        if not self.compact:
+            return self.keywordset[ngram]
+        pos = self._compact_position(ngram)
+        if pos < 0:
+            return ''
+        if not self.keep_offsets:
+            return CountedKeyword(ngram, self.__counts[pos])
+        keyword = DocKeyword(ngram)
+        offsets = self.__offsets
+        keyword.locations = {Location(self, offsets[2 * i], offsets[2 * i + 1])
+                             for i in range(self.__offset_index[pos], self.__offset_index[pos + 1])}
+        return keyword
+
     @property
     def keywordset(self):
-        """Return a set of keywords in the document with all their locations."""
+        """Return a set of keywords in the document with all their locations.
+        Note: For compact documents, this is a read-only view (see CompactKeywordSet).
+        """
+        if self.compact:
+            return CompactKeywordSet(self)
         if not self.__keywordset:
             ## OLD: self.__keywordset = {}
             self.__keywordset = defaultdict(str)
@@ -114,10 +277,19 @@ class Document(object):
                     self.__keywordset[kw.text] += kw
         return self.__keywordset
 
+    def keywordset_from_table(self, ngram_table):
+        """Return keyword set for NGRAM_TABLE (see __init__), with locations for this document"""
+        keywordset = defaultdict(str)
+        for ngram, offsets in ngram_table.items():
+            keyword = DocKeyword(ngram)
+            keyword.locations = {Location(self, start, end) for (start, end) in offsets}
+            keywordset[ngram] = keyword
+        return keywordset
+
     # Term Frequency weighting functions:
     def tf_raw(self, ngram):
         """The (relative) frequency of an ngram in a document."""
-        num_occurrences = len(self[ngram]) if ngram in self else 0
+        num_occurrences = self.count(ngram)
         # HACK: give singletons a max DF to lower IDF score
         if (num_occurrences == 1) and PENALIZE_SINGLETONS:
             num_occurrences = 0
@@ -144,7 +316,7 @@ class Document(object):
 
     def tf_freq(self, ngram):
         """Returns frequency count for NGRAM"""
-        num_occurrences = len(self[ngram]) if ngram in self else 0
+        num_occurrences = self.count(ngram)
         debug.trace_fmt(BDL + 1, "tf_freq({ng}): num_occ={no} len(self)={l} result={r}",
                         ng=ngram, no=num_occurrences, l=len(self), r=num_occurrences)
         return num_occurrences
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+
+"""Vectorized TF-IDF scoring over a compiled term-document matrix.
+
+A CorpusMatrix compiles the documents of a Corpus into a sparse CSR matrix of
+ngram counts (one row per document) along with a vocabulary array. The TF and
+IDF weighting schemes of Document.tf and Corpus.idf are then computed as NumPy
+vector operations, so that all documents can be scored in a single batch.
+
+Example:
+    >>> import mezcla.tfidf.corpus as mtc
+    >>> import mezcla.tfidf.matrix as mtm
+    >>> c = mtc.Corpus(gramsize=2)
+    >>> c['doc1'] = 'Mary had a little lamb.'
+    >>> c['doc2'] = 'Hannible is not a lamb.'
+    >>> c['doc3'] = 'The shark sleeps a little.'
+    >>> m = mtm.CorpusMatrix(c)
+    >>> m.counts.shape
+    (3, 11)
+    >>> [(k.ngram, round(k.score, 3)) for k in m.get_keywords('doc1', limit=2)]
+    [('mary had', 0.034), ('had a', 0.034)]
+"""
+
+# Note:
+# - The ngram entries for each row are kept in the order of Document.keywordset,
+#   so that ties are broken the same way as the (stable) sort in Corpus.get_keywords.
+# - Scores should match the per-ngram path up to floating point rounding.
+
+# Standard modules
+import math
+
+# Installed modules
+import numpy as np
+from scipy.sparse import csr_matrix
+
+# Local modules
+from mezcla import debug
+from mezcla import system
+from mezcla.tfidf.config import BASE_DEBUG_LEVEL as BDL
+from mezcla.tfidf.corpus import Corpus, CorpusKeyword, NGRAM_EPSILON, TFIDF_NGRAM_LEN_WEIGHT
+from mezcla.tfidf.document import PENALIZE_SINGLETONS
+
+# Constants
+TF_WEIGHTS = ('basic', 'log', 'binary', 'norm_50', 'freq', 'norm')
+IDF_WEIGHTS = ('basic', 'freq', 'smooth', 'max', 'prob')
+
+
+def masked_log(values):
+    """Return np.log of VALUES, using NaN where not positive (i.e., math.log domain error)"""
+    result = np.full(len(values), np.nan)
+    np.log(values, out=result, where=(values > 0))
+    return result
+
+
+class CorpusMatrix(object):
+    """Compiled term-document count matrix for a Corpus
+
+    Attributes:
+        document_ids (list): document ID for each row
+        vocabulary (ndarray): ngram for each column
+        counts (csr_matrix): ngram occurrence counts (documents x vocabulary)
+    """
+
+    def __init__(self, corpus):
+        """Compile the documents in CORPUS (n.b., a snapshot: later additions are not reflected)"""
+        debug.trace(BDL + 1, f"CorpusMatrix.__init__({corpus})")
+        self.corpus = corpus
+        self.document_ids = list(corpus.keys())
+        self.__row = {doc_id: r for (r, doc_id) in enumerate(self.document_ids)}
+        vocab_index = {}
+        indptr = [0]
+        indices = []
+        data = []
+        doc_lengths = []
+        doc_max_freqs = []
+        for doc_id in self.document_ids:
+            document = corpus[doc_id]
+            for ngram, count in document.ngram_counts():
+                indices.append(vocab_index.setdefault(ngram, len(vocab_index)))
+                data.append(count)
+            indptr.append(len(indices))
+            doc_lengths.append(len(document))
+            doc_max_freqs.append(document.max_raw_frequency)
+        self.vocabulary = np.array(list(vocab_index), dtype=object)
+        self.counts = csr_matrix((np.array(data, dtype=np.int64),
+                                  np.array(indices, dtype=np.int64),
+                                  np.array(indptr, dtype=np.int64)),
+                                 shape=(len(self.document_ids), len(vocab_index)))
+        self.__doc_lengths = np.array(doc_lengths, dtype=np.float64)
+        self.__doc_max_freqs = np.array(doc_max_freqs, dtype=np.float64)
+        self.__ngram_sizes = np.array([len(ngram.split()) for ngram in vocab_index], dtype=np.float64)
+        self.__scores = {}
+        debug.trace_expr(BDL + 1, self.counts.shape, self.counts.nnz)
+
+    def __len__(self):
+        """Number of documents (i.e., rows)"""
+        return len(self.document_ids)
+
+    def _row_ids(self):
+        """Return row number for each non-zero entry"""
+        return np.repeat(np.arange(len(self.document_ids)), np.diff(self.counts.indptr))
+
+    def doc_frequencies(self):
+        """Raw document occurrence count for each vocabulary ngram (including corpus background)"""
+        result = np.bincount(self.counts.indices, minlength=len(self.vocabulary))
+        background = self.corpus.background
+        if background is not None:
+            result += np.array([background.raw_doc_occurrences(ngram) for ngram in self.vocabulary],
+                               dtype=result.dtype)
+        return result
+
+    def tf(self, tf_weight='basic'):
+        """Return CSR matrix of term frequency using TF_WEIGHT (as with Document.tf)"""
+        if tf_weight == 'norm':
+            tf_weight = 'basic'
+        counts = self.counts.data.astype(np.float64)
+        if tf_weight == 'freq':
+            values = counts
+        elif tf_weight == 'binary':
+            values = np.ones(len(counts))
+        elif tf_weight in ('basic', 'log', 'norm_50'):
+            if PENALIZE_SINGLETONS:
+                counts[counts == 1] = 0
+            row_ids = self._row_ids()
+            values = counts / self.__doc_lengths[row_ids]
+            if tf_weight == 'norm_50':
+                values = 0.5 + (0.5 * (values / self.__doc_max_freqs[row_ids]))
+            elif tf_weight == 'log':
+                values = 1 + masked_log(values)
+        else:
+            raise ValueError("Invalid tf_weight: " + tf_weight)
+        return self._with_data(values)
+
+    def idf(self, idf_weight='basic'):
+        """Return array of inverse document frequency for each vocabulary ngram using IDF_WEIGHT (as with Corpus.idf)
+        Note: NaN is used for math domain errors (e.g., prob weighting for ngrams in most documents)
+        """
+        # note: same adjustments as Corpus.adjust_doc_count
+        num_occurrences = self.doc_frequencies() * (1 + NGRAM_EPSILON)
+        if PENALIZE_SINGLETONS:
+            num_occurrences[num_occurrences == 1] = 0
+        num_occurrences[num_occurrences == 0] = NGRAM_EPSILON
+        num_docs = float(self.corpus.num_documents)
+        if idf_weight == 'basic':
+            result = masked_log(num_docs / num_occurrences)
+        elif idf_weight == 'freq':
+            result = 1 / num_occurrences
+        elif idf_weight == 'smooth':
+            result = np.log(1 + (num_docs / num_occurrences))
+        elif idf_weight == 'max':
+            result = np.log(1 + self.corpus.max_raw_frequency / num_occurrences)
+        elif idf_weight == 'prob':
+            result = masked_log((num_docs - num_occurrences) / num_occurrences)
+        else:
+            raise ValueError("Invalid idf_weight: " + idf_weight)
+        return result
+
+    def tf_idf(self, idf_weight='basic', tf_weight='basic'):
+        """Return CSR matrix of TF-IDF scores using TF_WEIGHT and IDF_WEIGHT
+        Note: The result is cached for each combination of weights.
+        """
+        key = (idf_weight, tf_weight)
+        if key not in self.__scores:
+            indices = self.counts.indices
+            scores = self.tf(tf_weight).data * self.idf(idf_weight)[indices]
+            if TFIDF_NGRAM_LEN_WEIGHT:
+                scores = scores * (TFIDF_NGRAM_LEN_WEIGHT ** self.__ngram_sizes[indices])
+            self.__scores[key] = self._with_data(scores)
+        return self.__scores[key]
+
+    def _with_data(self, values):
+        """Return CSR matrix with same structure as counts but using VALUES"""
+        return csr_matrix((values, self.counts.indices, self.counts.indptr),
+                          shape=self.counts.shape, copy=False)
+
+    def _top_keywords(self, row, scores, limit):
+        """Return CorpusKeyword list for top LIMIT SCORES in ROW (n.b., scores over row entries)"""
+        if np.isnan(scores).any():
+            raise ValueError("math domain error")
+        num = len(scores)
+        if (limit is not None) and (limit < num):
+            if limit <= 0:
+                return []
+            # Get candidates via partial sort, including all ties for kth score
+            kth_score = scores[np.argpartition(-scores, limit - 1)[limit - 1]]
+            candidates = np.flatnonzero(scores >= kth_score)
+        else:
+            candidates = np.arange(num)
+        # note: stable sort so that ties stay in keywordset order
+        order = candidates[np.argsort(-scores[candidates], kind='stable')][:limit]
+        start = self.counts.indptr[row]
+        document = self.corpus[self.document_ids[row]]
+        result = []
+        for pos in order:
+            ngram = self.vocabulary[self.counts.indices[start + pos]]
+            result.append(CorpusKeyword(document.keywordset[ngram], ngram, float(scores[pos])))
+        return result
+
+    def get_keywords(self, document_id, idf_weight='basic', tf_weight='basic', limit=100):
+        """Return list of top LIMIT keywords for DOCUMENT_ID with TF-IDF scores (as with Corpus.get_keywords)"""
+        row = self.__row[document_id]
+        scores = self.tf_idf(idf_weight=idf_weight, tf_weight=tf_weight)
+        start, end = scores.indptr[row], scores.indptr[row + 1]
+        result = self._top_keywords(row, scores.data[start:end], limit)
+        debug.trace(BDL + 3, f"CorpusMatrix.get_keywords({document_id!r}) => {result}")
+        return result
+
+    def get_all_keywords(self, idf_weight='basic', tf_weight='basic', limit=100):
+        """Return dict from document ID to list of top LIMIT keywords, scoring all documents in one batch"""
+        scores = self.tf_idf(idf_weight=idf_weight, tf_weight=tf_weight)
+        result = {}
+        for row, doc_id in enumerate(self.document_ids):
+            start, end = scores.indptr[row], scores.indptr[row + 1]
+            result[doc_id] = self._top_keywords(row, scores.data[start:end], limit)
+        return result
+
+#-------------------------------------------------------------------------------
+
+def main():
+    """Entry point for script: just runs a simple test"""
+    corpus = Corpus(min_ngram_size=2, max_ngram_size=2)
+    corpus["doc1"] = "abc def ghi"
+    corpus["doc2"] = "abc def jkl"
+    matrix = CorpusMatrix(corpus)
+    for tf_weight in ('basic', 'freq'):
+        for idf_weight in ('basic', 'smooth'):
+            expected = corpus.get_keywords(document_id="doc1", idf_weight=idf_weight, tf_weight=tf_weight)
+            actual = matrix.get_keywords("doc1", idf_weight=idf_weight, tf_weight=tf_weight)
+            debug.assertion([k.ngram for k in expected] == [k.ngram for k in actual])
+            debug.assertion(all(math.isclose(e.score, a.score) for (e, a) in zip(expected, actual)))
+    print(matrix.get_all_keywords(limit=1))
+
+#-------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+    system.print_stderr(f"Warning: {__file__} is not intended to be run standalone. A simple test will be run.")
+    main()
@@ -71,6 +71,9 @@ TFIDF_PRESERVE_CASE = system.getenv_bool(
 TFIDF_LANGUAGE = system.getenv_value(
     "TFIDF_LANGUAGE", None,
     description="Language for text preprocessing")
+TFIDF_LEGACY_NGRAMS = system.getenv_bool(
+    "TFIDF_LEGACY_NGRAMS", False,
+    description="Use original full_yield_keywords rather than compiled version")
 
 if SPLIT_WORDS:
     debug.trace(2, "FYI: Splitting by word token (not whitespace)\n")
@@ -345,8 +348,10 @@ class Preprocessor(object):
         ## TODO: yield_method = self.slow_yield_keywords if not USE_SKLEARN_COUNTER else self.yield_sklearn_keywords
         if USE_SKLEARN_COUNTER:
             result = self.quick_yield_keywords(raw_text, document=document)
-        else:
+        elif TFIDF_LEGACY_NGRAMS:
             result = self.full_yield_keywords(raw_text, document=document)
+        else:
+            result = self.compiled_yield_keywords(raw_text, document=document)
         return result
 
     def re_search(self, regex, text):
@@ -355,11 +360,8 @@ class Preprocessor(object):
         TRACE_LEVEL = (REGEX_TRACE_LEVEL + 1)
         return my_re.search(regex, text, base_trace_level=TRACE_LEVEL)
     
-    def full_yield_keywords(self, raw_text, document=None):
-        """Full-featured version of keyword generation, including support for offsets"""
-        if sys.version_info[0] < 3:  # python2 support
-            if isinstance(raw_text, str):
-                raw_text = raw_text.decode('utf-8', 'ignore')
+    def get_gramlist(self):
+        """Return list of ngram sizes to generate"""
         ## TPO: HACK: support min ngram size
         gramlist = None
         if self.all_ngrams:
@@ -372,11 +374,23 @@ class Preprocessor(object):
         if not gramlist:
             gramlist = [self.gramsize]
         debug.trace_fmt(BDL + 2, "gramlist={gl}", gl=gramlist)
+        return gramlist
+
+    def full_yield_keywords(self, raw_text, document=None):
+        """Full-featured version of keyword generation, including support for offsets"""
+        if sys.version_info[0] < 3:  # python2 support
+            if isinstance(raw_text, str):
+                raw_text = raw_text.decode('utf-8', 'ignore')
+        gramlist = self.get_gramlist()
+        # note: level checks done once rather than per sentence or ngram
+        trace_sentences = debug.debugging(BDL + 2)
+        trace_ignored = debug.debugging(BDL + 3)
 
         sentence_split = (positional_splitter(self.negative_gram_breaks, raw_text)
                           if USE_SIMPLE_SENT_SPLITTER else nltk_sent_splitter(raw_text))
         for sentence in sentence_split:
-            debug.trace_expr(BDL + 2, sentence.text)
+            if trace_sentences:
+                debug.trace_expr(BDL + 2, sentence.text)
             words = positional_splitter(WORD_REGEX, sentence.text)
             # Remove all stopwords
             words_no_stopwords = []
@@ -385,7 +399,7 @@ class Preprocessor(object):
                 check_me = re.sub(self.contractions, '', w.text)
                 if check_me not in self.stopwords:
                     words_no_stopwords.append(w)
-            if debug.debugging(BDL + 2):
+            if trace_sentences:
                 words_text_no_stopwords = [w.text for w in words_no_stopwords]
                 debug.trace_expr(BDL + 2, words_text_no_stopwords)
 
@@ -413,7 +427,45 @@ class Preprocessor(object):
                             word_global_start = sentence.start + word_list[0].start
                             word_global_end = sentence.start + word_list[-1].end
                             yield DocKeyword(word_text, document=document, start=word_global_start, end=word_global_end)
-                        else:
+                        elif trace_ignored:
+                            debug.trace(BDL + 3, f"Ignoring {gramsize}-gram {word_text!r}")
+        return
+
+    def compiled_yield_keywords(self, raw_text, document=None):
+        """Faster version of full_yield_keywords yielding the same keywords in the same order
+        Note: Each sentence is tokenized and stemmed once, with the ngrams taken from a
+        window over the word list; the regex checks are precompiled and bypass my_re tracing.
+        """
+        gramlist = self.get_gramlist()
+        contractions_regex = re.compile(self.contractions)
+        # note: when punctuation is allowed, it must not start or end the text or follow a space
+        bad_punct_regex = re.compile(BAD_WORD_PUNCT_REGEX)
+        if TFIDF_ALLOW_PUNCT:
+            bad_punct_regex = re.compile(f"^(?:{BAD_WORD_PUNCT_REGEX})|(?:{BAD_WORD_PUNCT_REGEX})$| (?:{BAD_WORD_PUNCT_REGEX})")
+        stem = self._stem
+        # note: stopwords is usually a list (e.g., from get_stop_words)
+        stopwords = frozenset(self.stopwords)
+        trace_ignored = debug.debugging(BDL + 3)
+
+        sentence_split = (positional_splitter(self.negative_gram_breaks, raw_text)
+                          if USE_SIMPLE_SENT_SPLITTER else nltk_sent_splitter(raw_text))
+        for sentence in sentence_split:
+            words = [w for w in positional_splitter(WORD_REGEX, sentence.text)
+                     if contractions_regex.sub('', w.text) not in stopwords]
+            stems = [stem(w.text) for w in words]
+            num_words = len(words)
+
+            # Make the ngrams, using same order as full_yield_keywords
+            # (i.e., by gram size, then by start offset modulo gram size)
+            for gramsize in gramlist:
+                for offset in range(0, gramsize):
+                    for pos in range(offset, num_words - gramsize + 1, gramsize):
+                        word_text = ' '.join(stems[pos:pos + gramsize])
+                        if not bad_punct_regex.search(word_text):
+                            yield DocKeyword(word_text, document=document,
+                                             start=(sentence.start + words[pos].start),
+                                             end=(sentence.start + words[pos + gramsize - 1].end))
+                        elif trace_ignored:
                             debug.trace(BDL + 3, f"Ignoring {gramsize}-gram {word_text!r}")
         return
 
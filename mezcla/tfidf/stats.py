@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+
+"""Persistent corpus statistics for scoring against a frozen background collection.
+
+The statistics needed for IDF are saved in a compact, versioned binary file:
+the vocabulary (sorted UTF-8 ngrams), the document frequency (DF) for each ngram,
+and the per-document length and max frequency. The file is memory-mapped when
+loaded, so opening it is fast regardless of the size of the reference collection.
+
+Example:
+    >>> import os, tempfile
+    >>> import mezcla.tfidf.corpus as mtc
+    >>> import mezcla.tfidf.stats as mts
+    >>> c = mtc.Corpus(gramsize=1)
+    >>> c['doc1'] = 'Mary had a little lamb.'
+    >>> c['doc2'] = 'Hannible is not a lamb.'
+    >>> stats_file = os.path.join(tempfile.mkdtemp(), 'corpus.stats')
+    >>> mts.save_corpus_stats(c, stats_file)
+    >>> stats = mts.CorpusStats(stats_file)
+    >>> (stats.num_docs, stats.raw_doc_occurrences('lamb'), stats.raw_doc_occurrences('shark'))
+    (2, 2, 0)
+    >>> bc = mtc.Corpus(gramsize=1, background=stats)
+    >>> bc['doc3'] = 'The shark sleeps a little.'
+    >>> (bc.num_documents, bc.raw_doc_occurrences('little'))
+    (3, 2)
+"""
+
+# Note:
+# - File layout (all integers little endian):
+#     magic (8 bytes)  version (uint32)  header length (uint32)  JSON header
+#     ... arrays aligned on 8-byte boundaries (see header "sections")
+# - The vocabulary is stored as concatenated UTF-8 bytes with an offset array,
+#   sorted bytewise so that lookups can use binary search over the mapping.
+
+# Standard modules
+import bisect
+import json
+import mmap
+import struct
+
+# Installed modules
+import numpy as np
+
+# Local modules
+from mezcla import debug
+from mezcla import system
+from mezcla.tfidf.config import BASE_DEBUG_LEVEL as BDL
+
+# Constants
+MAGIC = b"MZTFSTAT"
+FORMAT_VERSION = 1
+PREAMBLE = struct.Struct("<8sII")
+ALIGNMENT = 8
+INT_DTYPE = "<i8"
+BYTE_DTYPE = "u1"
+
+
+def aligned(offset):
+    """Round OFFSET up to multiple of ALIGNMENT"""
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def save_corpus_stats(corpus, filename):
+    """Save statistics for CORPUS to FILENAME (including any background statistics)"""
+    debug.trace(BDL + -2, f"save_corpus_stats({corpus}, {filename!r})")
+    vocab_items = sorted((ngram.encode("UTF-8"), count)
+                         for (ngram, count) in corpus.doc_occurrence_counts().items())
+    vocab_bytes = b"".join(ngram for (ngram, _count) in vocab_items)
+    vocab_offsets = np.cumsum([0] + [len(ngram) for (ngram, _count) in vocab_items], dtype=np.int64)
+    doc_lengths = [len(corpus[doc_id]) for doc_id in corpus.keys()]
+    doc_max_freqs = [corpus[doc_id].max_raw_frequency for doc_id in corpus.keys()]
+    background = corpus.background
+    if background is not None:
+        doc_lengths = list(background.doc_lengths) + doc_lengths
+        doc_max_freqs = list(background.doc_max_freqs) + doc_max_freqs
+    arrays = {
+        "df": np.array([count for (_ngram, count) in vocab_items], dtype=INT_DTYPE),
+        "vocab_offsets": vocab_offsets.astype(INT_DTYPE),
+        "vocab": np.frombuffer(vocab_bytes, dtype=BYTE_DTYPE),
+        "doc_lengths": np.array(doc_lengths, dtype=INT_DTYPE),
+        "doc_max_freqs": np.array(doc_max_freqs, dtype=INT_DTYPE),
+    }
+
+    # Derive header with section offsets relative to start of data
+    sections = {}
+    offset = 0
+    for name, array in arrays.items():
+        offset = aligned(offset)
+        sections[name] = {"dtype": array.dtype.str, "offset": offset, "count": len(array)}
+        offset += array.nbytes
+    header = {
+        "num_docs": len(doc_lengths),
+        "max_raw_frequency": int(max(doc_max_freqs, default=0)),
+        "max_doc_occurrences": int(arrays["df"].max(initial=0)),
+        "min_ngram_size": corpus.preprocessor.min_ngram_size,
+        "max_ngram_size": corpus.preprocessor.gramsize,
+        "sections": sections,
+    }
+    header_bytes = json.dumps(header).encode("UTF-8")
+
+    # Write preamble, header, and then the arrays
+    with open(filename, "wb") as f:
+        f.write(PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        data_start = aligned(PREAMBLE.size + len(header_bytes))
+        for name, array in arrays.items():
+            f.write(b"\0" * (data_start + sections[name]["offset"] - f.tell()))
+            f.write(array.tobytes())
+    debug.trace(BDL + -1, f"saved {len(vocab_items)} ngrams for {header['num_docs']} documents to {filename}")
+
+
+class _EncodedVocabulary(object):
+    """Read-only sequence of UTF-8 ngram bytes over memory-mapped DATA (for use with bisect)"""
+
+    def __init__(self, data, start, offsets):
+        self.data = data
+        self.start = start
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if not (0 <= i < len(self)):
+            raise IndexError(i)
+        return self.data[self.start + self.offsets[i]: self.start + self.offsets[i + 1]]
+
+
+class CorpusStats(object):
+    """Frozen corpus statistics loaded from file created via save_corpus_stats
+
+    Attributes:
+        num_docs (int): number of documents in reference collection
+        max_raw_frequency (int): highest Document.max_raw_frequency
+        max_doc_occurrences (int): highest document frequency for any ngram
+        df (ndarray): document frequency for each ngram (in vocabulary order)
+        doc_lengths (ndarray): length of each document (see Document.__len__)
+        doc_max_freqs (ndarray): max ngram frequency for each document
+    """
+
+    def __init__(self, filename):
+        """Load statistics from FILENAME via memory mapping"""
+        debug.trace(BDL + -1, f"CorpusStats.__init__({filename!r})")
+        self.filename = filename
+        with open(filename, "rb") as f:
+            # note: the mapping remains valid after the file is closed
+            self.__mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, header_len = PREAMBLE.unpack_from(self.__mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Not a corpus statistics file: {filename}")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported corpus statistics version {version} (vs. {FORMAT_VERSION}): {filename}")
+        self.header = json.loads(self.__mmap[PREAMBLE.size: PREAMBLE.size + header_len])
+        data_start = aligned(PREAMBLE.size + header_len)
+        arrays = {}
+        for name, spec in self.header["sections"].items():
+            arrays[name] = np.frombuffer(self.__mmap, dtype=spec["dtype"], count=spec["count"],
+                                         offset=(data_start + spec["offset"]))
+        self.num_docs = self.header["num_docs"]
+        self.max_raw_frequency = self.header["max_raw_frequency"]
+        self.max_doc_occurrences = self.header["max_doc_occurrences"]
+        self.df = arrays["df"]
+        self.doc_lengths = arrays["doc_lengths"]
+        self.doc_max_freqs = arrays["doc_max_freqs"]
+        self.__vocabulary = _EncodedVocabulary(
+            self.__mmap, (data_start + self.header["sections"]["vocab"]["offset"]),
+            arrays["vocab_offsets"])
+        debug.trace_expr(BDL, self.num_docs, len(self.df))
+
+    def __len__(self):
+        """Number of ngrams in the vocabulary"""
+        return len(self.df)
+
+    def index(self, ngram):
+        """Return vocabulary position of NGRAM or -1 if not present"""
+        key = ngram.encode("UTF-8")
+        pos = bisect.bisect_left(self.__vocabulary, key)
+        if (pos < len(self.__vocabulary)) and (self.__vocabulary[pos] == key):
+            return pos
+        return -1
+
+    def __contains__(self, ngram):
+        """Whether NGRAM in vocabulary"""
+        return (self.index(ngram) >= 0)
+
+    def raw_doc_occurrences(self, ngram):
+        """Number of reference documents containing NGRAM"""
+        pos = self.index(ngram)
+        return (int(self.df[pos]) if (pos >= 0) else 0)
+
+    def items(self):
+        """Iterate over (ngram, document frequency) pairs"""
+        for i, ngram in enumerate(self.__vocabulary):
+            yield (ngram.decode("UTF-8"), int(self.df[i]))
+
+    def check_compatible(self, preprocessor):
+        """Make sure ngram sizes for PREPROCESSOR agree with the ones used for the statistics"""
+        ok = ((self.header["min_ngram_size"] == preprocessor.min_ngram_size)
+              and (self.header["max_ngram_size"] == preprocessor.gramsize))
+        if not ok:
+            system.print_stderr(f"Warning: ngram sizes differ from background statistics in {self.filename}")
+        return ok
+
+#-------------------------------------------------------------------------------
+
+def main():
+    """Entry point for script: show summary of statistics file(s)"""
+    for filename in system.get_args()[1:]:
+        stats = CorpusStats(filename)
+        print(f"{filename}: {stats.num_docs} documents; {len(stats)} ngrams; header={stats.header}")
+
+#-------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+    main()
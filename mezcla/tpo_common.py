@@ -53,10 +53,8 @@ import sys
 import os
 import re
 # - Others
-import inspect
-import logging
-import pickle
-from six import string_types
+# note: logging and pickle are imported when used (i.e., to reduce startup time)
+string_types = (str,)                   # note: same as six.string_types under Python 3
 ## OLD: import time
 ## OLD: import types
 
@@ -705,16 +703,18 @@ def getenv(var):
     return value
 
 
-env_options = {}
-env_defaults = {}
+# Note: the registry is shared with system.py (e.g., so options registered here are included in system.formatted_environment_option_descriptions).
+env_options = system.env_options
+env_defaults = system.env_defaults
 #
 def register_env_option(var, description, default):
     """Register environment VAR as option with DESCRIPTION and DEFAULT"""
-    debug_format("register_env_option({v}, {d})", 7, v=var, d=description)
-    global env_options
-    global env_defaults
-    env_options[var] = (description or "")
-    env_defaults[var] = default
+    if (env_options is system.env_options) and (env_defaults is system.env_defaults):
+        system.register_env_option(var, description, default)
+    else:
+        debug_format("register_env_option({v}, {d})", 7, v=var, d=description)
+        env_options[var] = (description or "")
+        env_defaults[var] = default
     return
 
 
@@ -739,7 +739,7 @@ def get_environment_option_descriptions(include_all=None, include_default=None,
     def _format_env_option(opt):
         """Returns OPT description and optionally default value (if INCLUDE_DEFAULT)"""
         debug_format("_format_env_option({opt})", 7)
-        desc_spec = env_options.get(opt, "_")
+        desc_spec = env_options.get(opt, "_") or ""
         default_spec = ""
         if include_default:
             default_value = env_defaults.get(opt, None)
@@ -935,7 +935,7 @@ def format(text, indirect_caller=False, ignore_exception=False, **namespace):
     result = ""
     try:
         if not namespace:
-            frame = inspect.currentframe().f_back
+            frame = sys._getframe(1)    # pylint: disable=protected-access
             if indirect_caller:
                 frame = frame.f_back
             if not skip_format_warning:
@@ -990,6 +990,7 @@ def format(text, indirect_caller=False, ignore_exception=False, **namespace):
 def init_logging():
     """Enable logging with INFO level by default or with DEBUG if detailed debugging"""
     debug_print("init_logging", 4)
+    import logging                      # pylint: disable=import-outside-toplevel
     # TODO: use mapping from symbolic LEVEL user option (e.g., via getenv)
     level = logging.DEBUG if detailed_debugging() else logging.INFO
     logging.basicConfig(format='%(asctime)s : %(levelname)s : %(message)s', level=level)
@@ -1003,6 +1004,7 @@ def load_object(filename):
     object_data = None
     f = system.open_file(filename, 'rb')
     if f:
+        import pickle                   # pylint: disable=import-outside-toplevel
         object_data = pickle.load(f)
         f.close()
     return object_data
@@ -1013,6 +1015,7 @@ def store_object(filename, object_data):
     debug_print("Saving object to %s" % filename, 3)
     f = system.open_file(filename, 'wb')
     if f:
+        import pickle                   # pylint: disable=import-outside-toplevel
         pickle.dump(object_data, f)
         f.close()
     return
@@ -1390,9 +1393,11 @@ if __debug__:
         ## debug_level = int(env_debug_level) if env_debug_level else ERROR
     
         # Show trace level in effect
-        debug_format("starting tpo_common.py at {ts}: "
-                     + "debug_level={lvl}; args={args}", level=DETAILED,
-                     ts=debug_timestamp(), lvl=debugging_level(), args=sys.argv)
+        # note: level checked first to avoid timestamp overhead
+        if (debugging_level() >= DETAILED):
+            debug_format("starting tpo_common.py at {ts}: "
+                         + "debug_level={lvl}; args={args}", level=DETAILED,
+                         ts=debug_timestamp(), lvl=debugging_level(), args=sys.argv)
 
         ## OLD
         ## # Register DEBUG_LEVEL for sake of new users